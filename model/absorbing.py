@@ -0,0 +1,56 @@
+import numpy as np  # for fixation seasons of stored trajectories
+from model.consts import *
+
+# genotype classes that only ever reproduce themselves: every cross and selfing
+# within RR gives RR seed, and within SS_i and SS_u gives SS seed
+CLOSED_CLASSES = [['RR'], ['SS_i', 'SS_u']]
+
+
+def absorbing(plant_populations):
+    # True if no other genotype can appear again: the population is extinct
+    # or holds a single closed genotype class
+    present = set([x for x in PLANTTYPES if plant_populations[x] > 0])
+    return any([present <= set(members) for members in CLOSED_CLASSES])
+
+
+def fixedState(previous, current):
+    # True once a population can no longer change at all: it is absorbing and
+    # either extinct or already reproduced exactly by the last season
+    return absorbing(current) and (not sum(current.values()) or previous == current)
+
+
+def fixationSeason(run):
+    # first season from which a replicate stayed absorbing, or None if it had
+    # not fixed by its last season
+    season = None
+    for j in range(len(run) - 1, -1, -1):
+        if not absorbing(run[j]):
+            break
+        season = j
+    return season
+
+
+def fixationColumns(fixations, seasons):
+    # share of replicates fixed by every season from 0 to seasons, and the
+    # mean fixation season of those that fixed (nan if none), from the
+    # fixation season of every replicate (None or -1 if it had not fixed)
+    fixations = np.array([-1 if x is None else x for x in fixations], dtype=float)
+    fixed = fixations[fixations >= 0]
+    if not len(fixations):
+        return np.full(seasons + 1, np.nan), np.nan
+    shares = (fixed[:, None] <= np.arange(seasons + 1)).sum(axis=0) / float(len(fixations))
+    return shares, fixed.mean() if len(fixed) else np.nan
+
+
+def fixationSeasons(trajectory):
+    # fixationSeason of every replicate of a (replicates, seasons + 1,
+    # genotypes) array, -1 for replicates that had not fixed
+    trajectory = np.asarray(trajectory)
+    present = trajectory > 0
+    fixed = np.zeros(trajectory.shape[:2], dtype=bool)
+    for members in CLOSED_CLASSES:
+        others = [k for k, x in enumerate(PLANTTYPES) if x not in members]
+        fixed |= ~present[:, :, others].any(axis=2)
+    # seasons from each one to the end that are all fixed
+    tail = np.cumprod(fixed[:, ::-1], axis=1)[:, ::-1].astype(bool)
+    return np.where(tail.any(axis=1), tail.argmax(axis=1), -1)
@@ -0,0 +1,111 @@
+import numpy as np  # for per-bee state arrays and whole-hour steps
+from model.pollination import LANDING_ORDER
+from model.vectorpollination import VectorPollinationSeason
+
+
+class AgentPollinationSeason(VectorPollinationSeason):
+    # Pollination season in which every bee carries pollen only between its
+    # own visits, so crosses pair each visit with the same bee's last visit
+    # rather than with whoever visited before it. Bee state is one array
+    # entry per bee: the genotypes of its last two visits (-1 for none), kept
+    # across hours. Each hour all bees' visits are drawn as one (bees,
+    # visit rate) array, and the per-bee chains are followed with cumulative
+    # index arithmetic rather than a loop over bees or visits.
+    #
+    # Optionally, with probability constancy a bee returns to the genotype it
+    # last visited instead of choosing afresh (flower constancy), finding no
+    # flower once that genotype has none left, and with
+    # probability carryover the pollen it leaves comes from the visit before
+    # its last (pollen carryover).
+    __slots__ = ['last', 'previous', 'constancy', 'carryover']
+
+    def __init__(self, plant_populations, constancy=0, carryover=0, **kwargs):
+        VectorPollinationSeason.__init__(self, plant_populations, **kwargs)
+        self.last = np.full(self.number_of_bees, -1, dtype=int)
+        self.previous = np.full(self.number_of_bees, -1, dtype=int)
+        self.constancy = constancy
+        self.carryover = carryover
+
+    def runOneHour(self):
+        # run one iteration of the model, returning False once no visits are possible
+        profile = self.profile
+        # release the bees!
+        num_visits = self.visit_rate * self.number_of_bees
+        if not num_visits:
+            # no flowers left to visit this season
+            if profile is not None:
+                profile.countHour(0, 0)
+            return False
+        if profile is not None:
+            start = profile.clock()
+        nbees = self.number_of_bees
+        rows = np.arange(nbees)[:, None]
+        # same ladder as foragingChoice: index of the first threshold above the draw
+        draws = self.rng.random_sample((nbees, self.visit_rate))
+        choices = np.take(LANDING_ORDER, np.searchsorted(self.thresholds, draws, side='right'))
+        available = np.array(self.flowers) > 0
+        # every bee's visits, after the two it carries over from earlier hours;
+        # choices of genotypes with no flowers left are null and carry no pollen
+        sequence = np.hstack([self.previous[:, None], self.last[:, None], choices])
+        valid = np.hstack([self.previous[:, None] >= 0, self.last[:, None] >= 0, available[choices]])
+        positions = np.arange(sequence.shape[1])
+        if self.constancy:
+            stay = self.rng.random_sample(choices.shape) < self.constancy
+            stay = np.hstack([np.zeros((nbees, 2), dtype=bool), stay])
+            # a bee that has visited a flower before stays on its genotype, so
+            # only fresh choices are anchors that later stays copy
+            visited = np.hstack([np.zeros((nbees, 1), dtype=bool),
+                                 np.maximum.accumulate(valid, axis=1)[:, :-1]])
+            staying = stay & visited
+            anchors = valid & ~staying
+            lastanchor = np.maximum.accumulate(np.where(anchors, positions, -1), axis=1)
+            sequence = np.where(staying, sequence[rows, lastanchor], sequence)
+            # a stay on a genotype with no flowers left is null, like a fresh
+            # choice of it, and stays take no more flowers than are left
+            valid = anchors | (staying & available[sequence])
+            valid &= ~(staying & self.overvisited(sequence, valid))
+        # index of each bee's last valid visit at or before, and before, each visit
+        upto = np.maximum.accumulate(np.where(valid, positions, -1), axis=1)
+        before = np.hstack([np.full((nbees, 1), -1, dtype=int), upto[:, :-1]])
+        fathers = before
+        if self.carryover:
+            earlier = np.where(before >= 0, before[rows, np.maximum(before, 0)], -1)
+            carried = (self.rng.random_sample(before.shape) < self.carryover) & (earlier >= 0)
+            fathers = np.where(carried, earlier, before)
+        thishour = valid & (positions >= 2)
+        pairs = thishour & (fathers >= 0)
+        if profile is not None:
+            start = profile.time('foraging', start)
+        visitation = np.bincount(sequence[thishour], minlength=len(self.flowers)).tolist()
+        self.storePairs(sequence[rows, np.maximum(fathers, 0)][pairs], sequence[pairs])
+        # carry each bee's last two visits over to the next hour
+        self.last = np.where(upto[:, -1] >= 0, sequence[rows[:, 0], np.maximum(upto[:, -1], 0)], -1)
+        last_before = before[rows[:, 0], np.maximum(upto[:, -1], 0)]
+        self.previous = np.where((upto[:, -1] >= 0) & (last_before >= 0),
+                                 sequence[rows[:, 0], np.maximum(last_before, 0)], -1)
+        if profile is not None:
+            start = profile.time('crosses', start)
+        self.updateSeasonalVisitation(visitation)
+        self.killFlowers(visitation)
+        if profile is not None:
+            profile.time('killing', start)
+            profile.countHour(num_visits, int(thishour.sum()))
+        return True
+
+    def overvisited(self, sequence, valid):
+        # this hour's visits beyond the flowers left of their genotype, taking
+        # every bee's k-th visit of the hour as coming before any (k+1)-th
+        thishour = valid.copy()
+        thishour[:, :2] = False
+        over = np.zeros(valid.shape, dtype=bool)
+        for genotype, left in enumerate(self.flowers):
+            visits = thishour & (sequence == genotype)
+            over |= visits & (np.cumsum(visits.T.ravel()).reshape(visits.T.shape).T > left)
+        return over
+
+    def storePairs(self, males, females):
+        # update cross counts for every (male, female) pair of visits
+        n = len(self.flowers)
+        pairs = np.bincount(males * n + females, minlength=n * n)
+        for i in np.flatnonzero(pairs):
+            self.crosses[i // n][i % n] += int(pairs[i])
@@ -0,0 +1,179 @@
+import numpy as np  # for holding many simulations as arrays
+from scipy import stats  # for summary statistics in data output
+from model.consts import *
+from model.pollination import LANDING_ORDER, RR, RS, SR, SS_I, SS_U, flowerDensity
+from model.reproduction import INFECTED_MOTHER, SELFING, fairRound, allocateSeeds, germinate
+from model.streams import RowStreams
+
+
+def halfUp(x):
+    # python 2 style round() (halves away from zero) for non-negative arrays
+    return np.floor(x + 0.5)
+
+
+class BatchSimulation(object):
+    # Many independent pollination/reproduction chains advanced in lockstep.
+    # Populations are held as an (N, 5) array in PLANTTYPES order and every
+    # parameter may be given per row (length N) or as a single value. rng
+    # is one numpy RandomState for every row, or RowStreams for a stream per row.
+    def __init__(self, plant_populations,
+                 number_of_bees=NUMBER_OF_BEES,
+                 attraction=DEFAULT_ATTRACTION_INFECTED,
+                 infected_penalty=INF_PENALTY,
+                 non_buzz_penalty=NON_BUZZ_PENALTY,
+                 non_buzz_infected_penalty=NON_BUZZ_INF_PENALTY,
+                 flowers_per_plant=STARTING_FLOWERS,
+                 max_visit_rate=DEFAULT_MAX_VISIT_RATE,
+                 pollination_season=FLOWERING_WINDOW,
+                 rng=None,
+                 seeds_sown=SEEDS_SOWN,
+                 infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+        self.plant_populations = np.array(plant_populations, dtype=np.int64)
+        n = len(self.plant_populations)
+        self.number_of_bees = self.perRow(number_of_bees, n).astype(np.int64)
+        self.attraction = self.perRow(attraction, n)
+        self.infected_penalty = self.perRow(infected_penalty, n)
+        self.non_buzz_penalty = self.perRow(non_buzz_penalty, n)
+        self.non_buzz_infected_penalty = self.perRow(non_buzz_infected_penalty, n)
+        self.flowers_per_plant = flowers_per_plant
+        self.max_visit_rate = max_visit_rate
+        self.pollination_season = pollination_season
+        self.rng = np.random if rng is None else rng
+        self.seeds_sown = seeds_sown
+        self.infection_rate = infection_rate
+        self.season = 0
+        # flower visits made by every simulation so far
+        self.visits = np.zeros(n, dtype=np.int64)
+
+    @staticmethod
+    def perRow(value, n):
+        # broadcast a scalar or per-row parameter to a float array of length n
+        return np.array(np.broadcast_to(np.asarray(value, dtype=float), (n,)))
+
+    def runOneHour(self):
+        # run one hour of foraging for every simulation
+        flowers = self.flower_populations
+        n = len(flowers)
+        total = flowers.sum(axis=1)
+        # visit rate from flower density as in PollinationSeason (self.season
+        # counts the seasons finished)
+        density = flowerDensity(total, GREENHOUSE_SIZE, self.season + 1)
+        v = (self.max_visit_rate * density ** 2) / (100 ** 2 + density ** 2)
+        num_visits = halfUp(v).astype(np.int64) * self.number_of_bees
+        if not num_visits.any():
+            # no flowers left to visit this season
+            return False
+        # landing probabilities as in PollinationSeason.updateLandingProbs
+        with np.errstate(divide='ignore', invalid='ignore'):
+            infected = flowers[:, SS_I]
+            infected_prop = np.where(infected != 0, infected / total.astype(float), 0)
+            adjust_infected = infected_prop * self.attraction
+            adjust_uninfected = (1 - infected_prop) * (1 - self.attraction)
+            infected_prob = adjust_infected / (adjust_infected + adjust_uninfected)
+            noninfected = (total - infected).astype(float)[:, None]
+            props = np.where(flowers[:, [RR, RS, SR]] != 0, flowers[:, [RR, RS, SR]] / noninfected, 0)
+        thresholds = infected_prob[:, None] + (1 - infected_prob)[:, None] * np.cumsum(props, axis=1)
+        thresholds = np.column_stack([infected_prob, thresholds])
+        # draw every visit of the hour for every simulation
+        if isinstance(self.rng, RowStreams):
+            draws = self.rng.ragged(num_visits)
+        else:
+            draws = self.rng.random_sample((n, num_visits.max()))
+        choices = np.zeros(draws.shape, dtype=np.int64)
+        for k in range(4):
+            choices += draws >= thresholds[:, k:k + 1]
+        choices = np.take(LANDING_ORDER, choices)
+        # drop padding beyond each row's visits and null choices of empty genotypes
+        rows = np.repeat(np.arange(n)[:, None], draws.shape[1], axis=1)
+        valid = np.arange(draws.shape[1])[None, :] < num_visits[:, None]
+        valid &= (flowers > 0)[rows, choices]
+        rows, choices = rows[valid], choices[valid]
+        visitation = np.bincount(rows * 5 + choices, minlength=n * 5).reshape(n, 5)
+        # consecutive visits within the same simulation transfer pollen
+        same = rows[1:] == rows[:-1]
+        pairs = rows[:-1][same] * 25 + choices[:-1][same] * 5 + choices[1:][same]
+        self.cross_list += np.bincount(pairs, minlength=n * 25).reshape(n, 5, 5)
+        self.flower_populations -= visitation
+        self.seasonal_visitation += visitation
+        self.visits += visitation.sum(axis=1)
+        return True
+
+    def runOneSeason(self):
+        # run pollination for a season followed by reproduction
+        self.flower_populations = self.plant_populations * self.flowers_per_plant
+        self.seasonal_visitation = np.zeros_like(self.flower_populations)
+        self.cross_list = np.zeros((len(self.flower_populations), 5, 5), dtype=np.int64)
+        self.hour = 1
+        while self.hour <= self.pollination_season:
+            if not self.runOneHour():
+                break
+            self.hour += 1
+        self.plant_populations = self.generatePlantPop()
+        self.season += 1
+        return self.plant_populations
+
+    def run(self, seasons):
+        # run several seasons and return the (seasons + 1, N, 5) trajectory
+        trajectory = np.zeros((seasons + 1,) + self.plant_populations.shape, dtype=np.int64)
+        trajectory[0] = self.plant_populations
+        for j in range(1, seasons + 1):
+            trajectory[j] = self.runOneSeason()
+        return trajectory
+
+    def seedCounts(self):
+        # (N, crosses) seeds of every cross in CROSSES order, as Reproduction.seedCounts
+        n = len(self.flower_populations)
+        counts = np.column_stack([self.cross_list.reshape(n, -1),
+                                  np.maximum(self.flower_populations, 0)]).astype(float)
+        # seed counts are modified for infected mothers
+        buzzed = INFECTED_MOTHER & ~SELFING
+        counts[:, buzzed] = halfUp(counts[:, buzzed] * (1 - self.infected_penalty[:, None]))
+        # selfing seeds are modified for non-buzzing and infected mothers
+        counts[:, SELFING] *= self.non_buzz_penalty[:, None]
+        counts[:, INFECTED_MOTHER & SELFING] *= self.non_buzz_infected_penalty[:, None]
+        return fairRound(counts, self.rng)
+
+    def generatePlantPop(self):
+        # germinate seeds_sown seeds in proportion to the seed populations
+        return germinate(allocateSeeds(self.seedCounts(), self.rng), self.seeds_sown, self.infection_rate)
+
+
+def batchTrajectory(paramsets, seasons=500, repeats=3, plantpops=None, rng=None,
+                    seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # run every (nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty)
+    # parameter set with several repeats in one batch, sowing seeds_sown seeds
+    # a season, returning the (seasons + 1, sets, repeats, 5) trajectories and
+    # the visits of each set
+    if plantpops is None:
+        plantpops = STARTING_POPULATION
+    paramsets = np.array(paramsets, dtype=float).reshape(-1, 5)
+    rows = np.repeat(paramsets, repeats, axis=0)
+    batch = BatchSimulation(np.tile([plantpops[x] for x in PLANTTYPES], (len(rows), 1)),
+                            number_of_bees=rows[:, 0],
+                            attraction=rows[:, 1],
+                            infected_penalty=rows[:, 2],
+                            non_buzz_penalty=rows[:, 3],
+                            non_buzz_infected_penalty=rows[:, 4],
+                            rng=rng,
+                            seeds_sown=seeds_sown,
+                            infection_rate=infection_rate)
+    trajectory = batch.run(seasons).reshape(seasons + 1, len(paramsets), repeats, 5)
+    return trajectory, batch.visits.reshape(len(paramsets), repeats).sum(axis=1)
+
+
+def runbatch(paramsets, seasons=500, repeats=3, plantpops=None, rng=None,
+             seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # run parameter sets in one batch (see batchTrajectory), returning the
+    # summary rows of runmodel and the (seasons + 1, sets, repeats, 5) trajectories
+    paramsets = np.array(paramsets, dtype=float).reshape(-1, 5)
+    trajectory, visits = batchTrajectory(paramsets, seasons, repeats, plantpops, rng, seeds_sown, infection_rate)
+    # aggregate susceptible and resistant
+    s = trajectory[..., [SS_I, SS_U]].sum(axis=-1)
+    r = trajectory[..., [RR, RS, SR]].sum(axis=-1)
+    outputdata = []
+    for i, params in enumerate(paramsets.tolist()):
+        for season in range(seasons + 1):
+            for name, counts in [('susceptible', s[season, i]), ('resistant', r[season, i])]:
+                stderr = 0 if season == 0 else stats.sem(counts)
+                outputdata.append(params + [season, name, np.mean(counts), np.std(counts), stderr])
+    return outputdata, trajectory
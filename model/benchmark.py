@@ -0,0 +1,113 @@
+import json  # for machine-readable results
+import platform  # for recording the machine benchmarks ran on
+import random  # for seeded foraging
+from timeit import default_timer as timer  # for wall clock timings
+import numpy as np  # for seeded reproduction
+from model.pollination import PollinationSeason
+from model.reproduction import Reproduction
+from model.simulation import runmodel
+from model.consts import *
+
+# grids benchmarked: bee counts, population sizes (as multiples of
+# STARTING_POPULATION) and runmodel season counts
+BENCHMARK_BEES = [1, 10, 101, 201]
+BENCHMARK_SCALES = [0.5, 1, 2]
+BENCHMARK_SEASONS = [10, 50]
+BENCHMARK_SEED = 0
+
+
+def scaledPopulation(scale):
+    return dict([(x, int(round(STARTING_POPULATION[x] * scale))) for x in PLANTTYPES])
+
+
+def timed(function, repeats):
+    # fastest of repeats calls of function, and its result
+    best = None
+    for i in range(repeats):
+        start = timer()
+        result = function()
+        seconds = timer() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def benchHours(nbees, scale, hours=20, repeats=3):
+    # the first hours of a season, hour by hour
+    def run():
+        p = PollinationSeason(scaledPopulation(scale), number_of_bees=nbees, rng=random.Random(BENCHMARK_SEED))
+        for hour in range(hours):
+            if not p.runOneHour():
+                break
+        return sum(p.visits)
+    seconds, visits = timed(run, repeats)
+    return {'seconds': seconds, 'visits': visits, 'visits_per_second': visits / seconds}
+
+
+def benchSeason(nbees, scale, repeats=3):
+    def run():
+        p = PollinationSeason(scaledPopulation(scale), number_of_bees=nbees, rng=random.Random(BENCHMARK_SEED))
+        p.runOneSeason()
+        return sum(p.visits)
+    seconds, visits = timed(run, repeats)
+    return {'seconds': seconds, 'visits': visits, 'visits_per_second': visits / seconds,
+            'seasons_per_second': 1 / seconds}
+
+
+def benchReproduction(nbees, scale, calls=20, repeats=3):
+    # reproduction following one pollination season
+    p = PollinationSeason(scaledPopulation(scale), number_of_bees=nbees, rng=random.Random(BENCHMARK_SEED))
+    pres = p.runOneSeason()
+
+    def run():
+        rng = np.random.RandomState(BENCHMARK_SEED)
+        for i in range(calls):
+            Reproduction(*pres, rng=rng).generatePlantPop()
+    seconds, result = timed(run, repeats)
+    return {'seconds': seconds, 'calls': calls, 'calls_per_second': calls / seconds}
+
+
+def benchRunmodel(nbees, seasons, repeats=3):
+    # a whole parameter set, once as it takes longest
+    params = [nbees, DEFAULT_ATTRACTION_INFECTED, INF_PENALTY, NON_BUZZ_PENALTY, NON_BUZZ_INF_PENALTY]
+    seconds, result = timed(lambda: runmodel(*params, seasons=seasons, repeats=repeats, seed=BENCHMARK_SEED), 1)
+    return {'seconds': seconds, 'seasons_per_second': seasons * repeats / seconds,
+            # at the 500 seasons and 3 repeats of a sweep
+            'parameter_sets_per_hour': 3600 / (seconds * 500.0 / seasons * 3.0 / repeats)}
+
+
+def runBenchmarks(bees=BENCHMARK_BEES, scales=BENCHMARK_SCALES, seasons=BENCHMARK_SEASONS):
+    # results of every benchmark by name
+    results = {}
+    for nbees in bees:
+        for scale in scales:
+            suffix = '/bees=%d/scale=%g' % (nbees, scale)
+            results['runOneHour' + suffix] = benchHours(nbees, scale)
+            results['runOneSeason' + suffix] = benchSeason(nbees, scale)
+            results['generatePlantPop' + suffix] = benchReproduction(nbees, scale)
+        for n in seasons:
+            results['runmodel/bees=%d/seasons=%d' % (nbees, n)] = benchRunmodel(nbees, n)
+    return results
+
+
+def writeResults(results, filename):
+    with open(filename, 'w') as outfile:
+        json.dump({'python': platform.python_version(),
+                   'numpy': np.__version__,
+                   'machine': platform.platform(),
+                   'version': MODEL_VERSION,
+                   'results': results}, outfile, indent=1, sort_keys=True)
+
+
+def readResults(filename):
+    with open(filename) as infile:
+        return json.load(infile)['results']
+
+
+def compareResults(results, baseline, threshold=0.2):
+    # (name, baseline seconds, seconds) of benchmarks more than threshold
+    # slower than the baseline
+    regressions = []
+    for name in sorted(results):
+        if name in baseline and results[name]['seconds'] > baseline[name]['seconds'] * (1 + threshold):
+            regressions.append((name, baseline[name]['seconds'], results[name]['seconds']))
+    return regressions
@@ -11,3 +11,9 @@ NON_BUZZ_PENALTY = 0.74  # *** (0:1, step 0.5, n=3) increase of seed death rate
 NON_BUZZ_INF_PENALTY = 0.09  # *** (0:0.5, step 0.25, n=3)
 SEEDS_SOWN = 1000  # number of seeds the farmer sows each year
 SUSCEPTIBLE_PLANT_INFECTION_RATE = 0.5
+STARTING_POPULATION = {'RR': 500, 'RS': 0, 'SR': 0, 'SS_i': 250, 'SS_u': 250}  # plants of each genotype in the first season
+# model parameters, in the order runmodel takes them, and their defaults
+PARAMETER_NAMES = ['nbees', 'attr_inf', 'inf_penalty', 'nb_penalty', 'nb_inf_penalty']
+DEFAULT_PARAMS = {'nbees': NUMBER_OF_BEES, 'attr_inf': DEFAULT_ATTRACTION_INFECTED, 'inf_penalty': INF_PENALTY,
+                  'nb_penalty': NON_BUZZ_PENALTY, 'nb_inf_penalty': NON_BUZZ_INF_PENALTY}
+MODEL_VERSION = 4  # increase whenever a change alters simulation results, invalidating cached sweeps
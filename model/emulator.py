@@ -0,0 +1,155 @@
+import numpy as np  # for the gaussian process algebra
+from scipy import linalg, optimize  # for cholesky solves and fitting hyperparameters
+from model.sensitivity import SENSITIVITY_RANGES, sobolSequence, scaleDesign
+from model.store import TrajectoryStore
+from model.consts import *
+
+# hyperparameter bounds, on the log scale: length scales over the unit
+# parameter cube, signal and noise variance of standardised outputs
+LOG_LENGTH_BOUNDS = (np.log(0.02), np.log(50.0))
+LOG_SIGNAL_BOUNDS = (np.log(0.01), np.log(100.0))
+LOG_NOISE_BOUNDS = (np.log(1e-8), np.log(1.0))
+
+
+def unitParams(params, ranges=SENSITIVITY_RANGES):
+    # parameter sets scaled to the unit cube of ranges
+    lows = np.array([low for name, low, high in ranges], dtype=float)
+    highs = np.array([high for name, low, high in ranges], dtype=float)
+    return (np.atleast_2d(np.asarray(params, dtype=float)) - lows) / (highs - lows)
+
+
+def squaredExponential(a, b, lengths, signal):
+    # ARD squared exponential covariance between rows of a and of b
+    d = (a[:, None, :] - b[None, :, :]) / lengths
+    return signal * np.exp(-0.5 * (d ** 2).sum(axis=2))
+
+
+class GaussianProcessEmulator(object):
+    """Gaussian process emulator of the mean susceptible and resistant plant
+    counts of every season, fitted to finished parameter sets of a sweep over
+    the parameters marked *** in consts. Every output (group and season)
+    shares one ARD squared exponential covariance, fitted by maximum
+    marginal likelihood over standardised outputs with a noise term for
+    replicate noise, so predicting any number of outputs takes one
+    covariance vector and one matrix product."""
+    def __init__(self, params, outputs, ranges=SENSITIVITY_RANGES):
+        # params: (sets, parameters) array; outputs: (sets, seasons + 1, groups) means
+        self.ranges = ranges
+        self.params = np.asarray(params, dtype=float)
+        self.x = unitParams(self.params, ranges)
+        outputs = np.asarray(outputs, dtype=float)
+        self.shape = outputs.shape[1:]
+        y = outputs.reshape(len(outputs), -1)
+        self.offset = y.mean(axis=0)
+        self.scale = y.std(axis=0)
+        self.scale[self.scale == 0] = 1
+        self.y = (y - self.offset) / self.scale
+        self.lengths = np.full(len(ranges), 0.5)
+        self.signal = 1.0
+        self.noise = 1e-2
+        self.chol = None
+        self.alpha = None
+
+    @classmethod
+    def fromStore(cls, store, ranges=SENSITIVITY_RANGES):
+        # emulator of the finished parameter sets of a TrajectoryStore
+        slots = np.flatnonzero(store.complete)
+        return cls(store.params[slots], store.summaries[slots, :, :, 0], ranges)
+
+    def unpack(self, theta):
+        d = len(self.ranges)
+        return np.exp(theta[:d]), np.exp(theta[d]), np.exp(theta[d + 1])
+
+    def negativeLogLikelihood(self, theta):
+        # minus the log marginal likelihood of every standardised output
+        lengths, signal, noise = self.unpack(theta)
+        k = squaredExponential(self.x, self.x, lengths, signal) + noise * np.eye(len(self.x))
+        try:
+            chol = linalg.cho_factor(k, lower=True)
+        except linalg.LinAlgError:
+            return 1e25
+        alpha = linalg.cho_solve(chol, self.y)
+        outputs = self.y.shape[1]
+        return (0.5 * (self.y * alpha).sum() + outputs * np.log(np.diag(chol[0])).sum()
+                + 0.5 * outputs * len(self.x) * np.log(2 * np.pi))
+
+    def fit(self, restarts=(0.2, 0.5, 2.0)):
+        # fit hyperparameters, starting from each of the given length scales
+        d = len(self.ranges)
+        bounds = [LOG_LENGTH_BOUNDS] * d + [LOG_SIGNAL_BOUNDS, LOG_NOISE_BOUNDS]
+        best = None
+        for length in restarts:
+            start = np.array([np.log(length)] * d + [0.0, np.log(1e-2)])
+            result = optimize.minimize(self.negativeLogLikelihood, start, method='L-BFGS-B', bounds=bounds)
+            if best is None or result.fun < best.fun:
+                best = result
+        self.lengths, self.signal, self.noise = self.unpack(best.x)
+        return self.condition()
+
+    def condition(self):
+        # factorise the covariance of the training sets under the current hyperparameters
+        k = squaredExponential(self.x, self.x, self.lengths, self.signal) + self.noise * np.eye(len(self.x))
+        self.chol = linalg.cho_factor(k, lower=True)
+        self.alpha = linalg.cho_solve(self.chol, self.y)
+        return self
+
+    def latent(self, params):
+        # covariance vectors of parameter sets with the training sets, and
+        # their standardised predictive variances
+        kstar = squaredExponential(unitParams(params, self.ranges), self.x, self.lengths, self.signal)
+        v = linalg.solve_triangular(self.chol[0], kstar.T, lower=True)
+        return kstar, np.maximum(self.signal - (v ** 2).sum(axis=0), 0)
+
+    def predict(self, params):
+        # predicted mean and standard deviation of the mean populations of
+        # parameter sets, as (sets, seasons + 1, groups) arrays
+        kstar, variance = self.latent(params)
+        mean = kstar.dot(self.alpha) * self.scale + self.offset
+        sd = np.sqrt(variance)[:, None] * self.scale
+        return mean.reshape((-1,) + self.shape), sd.reshape((-1,) + self.shape)
+
+    def crossValidation(self):
+        # leave-one-out predictions of every training set (closed form),
+        # as (sets, seasons + 1, groups) means and standard deviations
+        kinv = linalg.cho_solve(self.chol, np.eye(len(self.x)))
+        diagonal = np.diag(kinv)
+        mean = (self.y - self.alpha / diagonal[:, None]) * self.scale + self.offset
+        sd = np.sqrt(1 / diagonal)[:, None] * self.scale
+        return mean.reshape((-1,) + self.shape), sd.reshape((-1,) + self.shape)
+
+    def suggest(self, n, candidates=1024):
+        # n parameter sets (whole bees) where the emulator is least certain,
+        # picked in turn from a Sobol set of candidates: each pick is treated
+        # as simulated before the next, so the variance it removes around
+        # itself is accounted for (the variance does not depend on results)
+        unit = sobolSequence(candidates, len(self.ranges))
+        points = scaleDesign(unit, self.ranges)
+        kstar, variance = self.latent(points)
+        # posterior covariance of the candidates with each pick so far
+        v = linalg.solve_triangular(self.chol[0], kstar.T, lower=True)
+        picks = []
+        columns = []
+        for i in range(min(n, candidates)):
+            best = int(np.argmax(variance))
+            picks.append(best)
+            x = unitParams(points[best], self.ranges)
+            column = (squaredExponential(unitParams(points, self.ranges), x, self.lengths, self.signal)[:, 0]
+                      - v.T.dot(v[:, best]))
+            for previous in columns:
+                column -= previous * previous[best]
+            column /= np.sqrt(variance[best] + self.noise)
+            columns.append(column)
+            variance = np.maximum(variance - column ** 2, 0)
+            variance[picks] = 0
+        return points[picks]
+
+    def rows(self, params):
+        # runmodel-style (parameters, season, population, mean, sd) rows of
+        # predictions for parameter sets
+        mean, sd = self.predict(params)
+        rows = []
+        for p, m, s in zip(np.atleast_2d(params).tolist(), mean.tolist(), sd.tolist()):
+            for season in range(self.shape[0]):
+                for g, (name, members) in enumerate(TrajectoryStore.GROUPS):
+                    rows.append(p + [season, name, m[season][g], s[season][g]])
+        return rows
@@ -0,0 +1,208 @@
+import hashlib  # for stable keys of cached kernels
+import json  # for canonical key serialisation
+from multiprocessing import Pool  # for simulating states in parallel
+import numpy as np  # for projecting population distributions
+from scipy import sparse  # for the transition matrix
+from model.simulation import runreplicate, replicateSeeds
+from model.reproduction import SEEDTYPES, germinate
+from model.absorbing import absorbing
+from model.consts import *
+
+# season number kernel transitions are simulated as: flower density is only
+# floored in the first season (see flowerDensity), and every transition but
+# the first is from a season after it
+KERNEL_SEASON = 2
+
+
+def kernelKey(params, step, samples, seed,
+              seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # stable hash of everything that determines the kernel of a parameter set
+    key = {'params': [repr(float(x)) for x in params],
+           'step': int(step),
+           'samples': int(samples),
+           'seed': seed,
+           'season': KERNEL_SEASON,
+           'version': MODEL_VERSION,
+           'format': 'kernel'}
+    if (seeds_sown, infection_rate) != (SEEDS_SOWN, SUSCEPTIBLE_PLANT_INFECTION_RATE):
+        # as in resultKey, only a different sowing changes the key
+        key['sowing'] = {'seeds_sown': int(seeds_sown), 'infection_rate': repr(float(infection_rate))}
+    canonical = json.dumps(key, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def seedVector(plant_populations):
+    # plants by seed genotype (SEEDTYPES order), infected and uninfected SS together
+    return [plant_populations['RR'], plant_populations['RS'], plant_populations['SR'],
+            plant_populations['SS_i'] + plant_populations['SS_u']]
+
+
+def compositions(units, parts):
+    # every way of splitting units between parts, in lexicographic order
+    if parts == 1:
+        return [(units,)]
+    return [(k,) + rest for k in range(units + 1) for rest in compositions(units - k, parts - 1)]
+
+
+def kernelRow(job):
+    # next-season plant populations of one state, for a process pool
+    params, plantpops, seeds, seeds_sown, infection_rate = job
+    return [runreplicate(*params, seasons=1, seed=s, plantpops=plantpops, start_season=KERNEL_SEASON,
+                         seeds_sown=seeds_sown, infection_rate=infection_rate)[1] for s in seeds]
+
+
+class SeasonKernel(object):
+    """Monte Carlo estimate of the season to season transition matrix of one
+    parameter set sowing seeds_sown seeds a season, over plant populations
+    rounded to multiples of step plants of each seed genotype (the SS_i / SS_u split follows from germination),
+    plus an extinct state. Simulated populations are shared between the
+    nearest states so that expected populations are kept, which matters when
+    a season moves the population by less than a step. Multi-season
+    trajectories, fixation probabilities and stationary distributions then
+    come from matrix-vector products."""
+    def __init__(self, params, step=50, samples=10, seed=None,
+                 seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+        if seeds_sown % step:
+            raise ValueError('step must divide the seeds sown (%d)' % seeds_sown)
+        self.params = [float(x) for x in params]
+        self.step = step
+        self.samples = samples
+        self.seed = seed
+        self.seeds_sown = seeds_sown
+        self.infection_rate = infection_rate
+        self.units = seeds_sown // step
+        self.grid = compositions(self.units, len(SEEDTYPES))
+        self.index = dict([(x, i) for i, x in enumerate(self.grid)])
+        self.extinct = len(self.grid)
+        # plant populations of every state (PLANTTYPES order), extinct last
+        self.populations = np.vstack([germinate(np.array(self.grid) * step, seeds_sown, infection_rate), np.zeros(len(PLANTTYPES), dtype=int)])
+        self.absorbing = np.array([absorbing(dict(zip(PLANTTYPES, x))) for x in self.populations.tolist()])
+        self.matrix = None
+
+    def key(self):
+        return kernelKey(self.params, self.step, self.samples, self.seed, self.seeds_sown, self.infection_rate)
+
+    def state(self, plant_populations):
+        # index of the state nearest a plant population
+        return max(self.spread(plant_populations), key=lambda x: x[1])[0]
+
+    def spread(self, plant_populations):
+        # (state, weight) pairs of the states either side of a plant
+        # population, weighted so that its expected seed genotype counts are
+        # kept: leftover units go to genotypes by systematic rounding of the
+        # fractional parts, integrated over the rounding offset
+        seeds = np.array(seedVector(plant_populations), dtype=float)
+        total = seeds.sum()
+        if total <= 0:
+            return [(self.extinct, 1.0)]
+        x = seeds * self.units / total
+        units = np.floor(x)
+        upper = np.cumsum(x - units)
+        lower = upper - (x - units)
+        offsets = sorted(set([0.0, 1.0] + (upper % 1).tolist()))
+        spread = {}
+        for a, b in zip(offsets[:-1], offsets[1:]):
+            if b - a < 1e-12:
+                continue
+            u = (a + b) / 2
+            extra = np.ceil(upper - u) - np.ceil(lower - u)
+            state = self.index[tuple((units + extra).astype(int).tolist())]
+            spread[state] = spread.get(state, 0) + b - a
+        return list(spread.items())
+
+    def build(self, processes=1, cache=None):
+        # simulate samples seasons from every state, or load the kernel from
+        # the cache (a ResultCache) if it has already been built
+        if cache is not None:
+            self.matrix = cache.get(self.key())
+            if self.matrix is not None:
+                return self
+        seeds = replicateSeeds(self.seed, len(self.grid) * self.samples)
+        rows, cols = [], []
+        jobs, jobstates = [], []
+        for i in range(len(self.grid)):
+            if self.absorbing[i]:
+                # single seed genotype populations always reproduce themselves
+                rows.append(i)
+                cols.append(i)
+            else:
+                plantpops = dict(zip(PLANTTYPES, self.populations[i].tolist()))
+                jobs.append((self.params, plantpops, seeds[i * self.samples:(i + 1) * self.samples],
+                             self.seeds_sown, self.infection_rate))
+                jobstates.append(i)
+        if processes > 1:
+            pool = Pool(processes)
+            results = pool.map(kernelRow, jobs, chunksize=max(1, len(jobs) // (4 * processes)))
+            pool.close()
+            pool.join()
+        else:
+            results = [kernelRow(job) for job in jobs]
+        weights = [1.0] * len(rows)
+        for i, nextpops in zip(jobstates, results):
+            for plantpops in nextpops:
+                for state, weight in self.spread(plantpops):
+                    rows.append(i)
+                    cols.append(state)
+                    weights.append(weight / self.samples)
+        rows.append(self.extinct)
+        cols.append(self.extinct)
+        weights.append(1.0)
+        size = self.extinct + 1
+        # duplicate entries are summed, giving the share of samples per next state
+        self.matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(size, size))
+        if cache is not None:
+            cache.put(self.key(), self.matrix)
+        return self
+
+    def start(self, plantpops=None):
+        # distribution over the states either side of a starting population
+        p = np.zeros(self.matrix.shape[0])
+        for state, weight in self.spread(STARTING_POPULATION if plantpops is None else plantpops):
+            p[state] = weight
+        return p
+
+    def project(self, plantpops=None, seasons=500):
+        # (seasons + 1, states) probability of every state in each season
+        transposed = self.matrix.T.tocsr()
+        distributions = [self.start(plantpops)]
+        for j in range(seasons):
+            distributions.append(transposed.dot(distributions[-1]))
+        return np.array(distributions)
+
+    def moments(self, distributions, members=None):
+        # mean and standard deviation by season of every genotype, or of the
+        # total of the given genotypes
+        populations = self.populations.astype(float)
+        if members is not None:
+            populations = populations[:, [PLANTTYPES.index(x) for x in members]].sum(axis=1)
+        mean = distributions.dot(populations)
+        var = distributions.dot(populations ** 2) - mean ** 2
+        return mean, np.sqrt(np.maximum(var, 0))
+
+    def fixation(self, distributions):
+        # probability by season that the population has fixed or died out
+        return distributions[:, self.absorbing].sum(axis=1)
+
+    def stationary(self, plantpops=None, tolerance=1e-12, max_seasons=100000):
+        # long run distribution reached from a starting population (the
+        # kernel has several absorbing states, so this depends on the start)
+        transposed = self.matrix.T.tocsr()
+        p = self.start(plantpops)
+        for j in range(max_seasons):
+            nextp = transposed.dot(p)
+            if np.abs(nextp - p).max() < tolerance:
+                return nextp
+            p = nextp
+        return p
+
+    def rows(self, plantpops=None, seasons=500):
+        # runmodel style summary rows of the projected trajectory (the
+        # standard error is zero as the projection is an expectation)
+        distributions = self.project(plantpops, seasons)
+        groups = [('susceptible', ['SS_i', 'SS_u']), ('resistant', ['RR', 'RS', 'SR'])]
+        stats = [self.moments(distributions, members) for name, members in groups]
+        outputdata = []
+        for season in range(seasons + 1):
+            for (name, members), (mean, std) in zip(groups, stats):
+                outputdata.append(self.params + [season, name, mean[season], std[season], 0])
+        return outputdata
@@ -0,0 +1,349 @@
+from multiprocessing import Pool  # for screening many parameter sets
+import numpy as np  # for the expected offspring of every cross
+from model.consts import *
+from model.reproduction import SEEDTYPES, CROSSES, OFFSPRING, NOFFSPRING, SELFING, INFECTED_MOTHER
+from model.pollination import flowerDensity, RR, RS, SR, SS_I, SS_U
+from model.batch import BatchSimulation, halfUp
+
+# uninfected genotypes, which bees do not tell apart when foraging
+UNINFECTED = ['RR', 'RS', 'SR', 'SS_u']
+UNINFECTED_INDEX = [RR, RS, SR, SS_U]
+# parameter sets screened together from which MeanFieldBatch is faster than
+# a MeanFieldModel per set: its hours cost about as much as 30 sets' hours
+MEANFIELD_BATCH_MIN = 32
+
+
+class MeanFieldModel(object):
+    # Deterministic (expected-value) counterpart of PollinationSeason followed
+    # by Reproduction: visitation, crosses, seed counts and germination are
+    # propagated as expectations, with no random draws and no rounding.
+    #
+    # Bees choose between uninfected genotypes in proportion to their flowers,
+    # so every uninfected genotype is depleted by the same factor each hour and
+    # their mix is fixed for the season. Only the infected and uninfected
+    # flower totals need to be followed hour by hour.
+    #
+    # The hourly recurrence is a Python loop, as each hour's visit rate and
+    # landing probabilities follow from the flowers left, so a season takes
+    # about 2 ms (about a second for 500 seasons) against some 35 ms for one
+    # stochastic replicate at the default 10 bees. MeanFieldBatch runs the
+    # same recurrence for many parameter sets at once, to screen sweeps.
+    def __init__(self,
+                 attraction=DEFAULT_ATTRACTION_INFECTED,
+                 number_of_bees=NUMBER_OF_BEES,
+                 infected_penalty=INF_PENALTY,
+                 non_buzz_penalty=NON_BUZZ_PENALTY,
+                 non_buzz_infected_penalty=NON_BUZZ_INF_PENALTY,
+                 flowers_per_plant=STARTING_FLOWERS,
+                 max_visit_rate=DEFAULT_MAX_VISIT_RATE,
+                 pollination_season=FLOWERING_WINDOW,
+                 seeds_sown=SEEDS_SOWN,
+                 infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+        self.attraction = attraction
+        self.number_of_bees = number_of_bees
+        self.infected_penalty = infected_penalty
+        self.non_buzz_penalty = non_buzz_penalty
+        self.non_buzz_infected_penalty = non_buzz_infected_penalty
+        self.flowers_per_plant = flowers_per_plant
+        self.max_visit_rate = max_visit_rate
+        self.pollination_season = pollination_season
+        self.seeds_sown = seeds_sown
+        self.infection_rate = infection_rate
+
+    def visitRate(self, total, season):
+        # bee visit rate from flower density in a season of a run (see
+        # PollinationSeason.updateDensity and updateVisitRate)
+        density = flowerDensity(total, GREENHOUSE_SIZE, season)
+        v = (self.max_visit_rate * density ** 2) / (100 ** 2 + density ** 2)
+        return int(round(v))
+
+    def runPollination(self, plant_populations, season=1):
+        # expected flowers left and crosses made over one pollination season
+        infected = plant_populations['SS_i'] * float(self.flowers_per_plant)
+        uninfected = sum([plant_populations[x] for x in UNINFECTED]) * float(self.flowers_per_plant)
+        mix = dict([[x, plant_populations[x] * self.flowers_per_plant / uninfected if uninfected else 0]
+                    for x in UNINFECTED])
+        a = self.attraction
+        # expected consecutive infected:infected, infected:uninfected and uninfected:uninfected pairs
+        ii = iu = uu = 0.0
+        hour = 1
+        while hour <= self.pollination_season:
+            num_visits = self.visitRate(infected + uninfected, season) * self.number_of_bees
+            if not num_visits:
+                # no flowers left to visit this season
+                break
+            # landing probabilities as in PollinationSeason.updateInfectedProb
+            total = infected + uninfected
+            infected_prop = infected / total if infected else 0
+            adjust_infected = infected_prop * a
+            adjust_uninfected = (1 - infected_prop) * (1 - a)
+            infected_prob = adjust_infected / (adjust_infected + adjust_uninfected)
+            # choices of genotypes with no flowers left are null
+            qi = infected_prob if infected > 0 else 0
+            qu = 1 - infected_prob if uninfected > 0 else 0
+            q = qi + qu
+            if q:
+                # E[max(K - 1, 0)] pollen transfers for K ~ Binomial(num_visits, q) non-null choices
+                pairs = (num_visits * q - 1 + (1 - q) ** num_visits) / (q * q)
+                ii += pairs * qi * qi
+                iu += pairs * qi * qu
+                uu += pairs * qu * qu
+            infected -= num_visits * qi
+            uninfected -= num_visits * qu
+            hour += 1
+        flower_populations = dict([[x, uninfected * mix[x]] for x in UNINFECTED])
+        flower_populations['SS_i'] = infected
+        cross_list = {}
+        for father in PLANTTYPES:
+            for mother in PLANTTYPES:
+                if father == 'SS_i':
+                    count = ii if mother == 'SS_i' else iu * mix[mother]
+                else:
+                    count = iu * mix[father] if mother == 'SS_i' else uu * mix[father] * mix[mother]
+                cross_list[':'.join([father, mother])] = count
+        return flower_populations, cross_list
+
+    def generatePlantPop(self, flower_populations, cross_list):
+        # expected seeds of every cross in CROSSES order
+        counts = np.array([cross_list[':'.join([f, m])] for f, m in CROSSES[:len(PLANTTYPES) ** 2]] +
+                          [max(flower_populations[x], 0) for x in PLANTTYPES])
+        mothers = np.array([m for f, m in CROSSES])
+        counts[(mothers == 'SS_i') & ~SELFING] *= 1 - self.infected_penalty
+        # selfing of the flowers left unvisited
+        counts[SELFING] *= self.non_buzz_penalty
+        counts[(mothers == 'SS_i') & SELFING] *= self.non_buzz_infected_penalty
+        # shared equally between the offspring of each cross
+        seeds = np.dot(counts / NOFFSPRING, OFFSPRING)
+        # expected germination of seeds_sown seeds in proportion to the seed populations
+        total = seeds.sum()
+        seed_populations = dict(zip(SEEDTYPES, (self.seeds_sown * seeds / total if total else seeds).tolist()))
+        plant_populations = dict([[x, seed_populations[x]] for x in ['RR', 'RS', 'SR']])
+        plant_populations['SS_i'] = seed_populations['SS'] * self.infection_rate
+        plant_populations['SS_u'] = seed_populations['SS'] - plant_populations['SS_i']
+        return plant_populations
+
+    def runOneSeason(self, plant_populations, season=1):
+        # expected plant populations after a season of a run
+        return self.generatePlantPop(*self.runPollination(plant_populations, season))
+
+
+class MeanFieldBatch(object):
+    # MeanFieldModel for many parameter sets advanced in lockstep, as
+    # BatchSimulation is for PollinationSeason: populations are held as an
+    # (N, 5) array in PLANTTYPES order and every parameter may be given per
+    # row (length N) or as a single value. An hour costs about as much as
+    # a MeanFieldModel hour for 30 sets, and little more for hundreds (see
+    # MEANFIELD_BATCH_MIN).
+    def __init__(self, n,
+                 attraction=DEFAULT_ATTRACTION_INFECTED,
+                 number_of_bees=NUMBER_OF_BEES,
+                 infected_penalty=INF_PENALTY,
+                 non_buzz_penalty=NON_BUZZ_PENALTY,
+                 non_buzz_infected_penalty=NON_BUZZ_INF_PENALTY,
+                 flowers_per_plant=STARTING_FLOWERS,
+                 max_visit_rate=DEFAULT_MAX_VISIT_RATE,
+                 pollination_season=FLOWERING_WINDOW,
+                 seeds_sown=SEEDS_SOWN,
+                 infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+        perRow = BatchSimulation.perRow
+        self.attraction = perRow(attraction, n)
+        self.number_of_bees = perRow(number_of_bees, n)
+        self.infected_penalty = perRow(infected_penalty, n)
+        self.non_buzz_penalty = perRow(non_buzz_penalty, n)
+        self.non_buzz_infected_penalty = perRow(non_buzz_infected_penalty, n)
+        self.flowers_per_plant = flowers_per_plant
+        self.max_visit_rate = max_visit_rate
+        self.pollination_season = pollination_season
+        self.seeds_sown = seeds_sown
+        self.infection_rate = infection_rate
+
+    def visitRate(self, total, season):
+        # bee visit rate of every row, as MeanFieldModel.visitRate
+        density = flowerDensity(total, GREENHOUSE_SIZE, season)
+        return halfUp((self.max_visit_rate * density ** 2) / (100 ** 2 + density ** 2))
+
+    def runPollination(self, plant_populations, season=1):
+        # expected (N, 5) flowers left and (N, 5, 5) crosses (father, mother)
+        # made over one pollination season, as MeanFieldModel.runPollination.
+        # Rows are dropped from the hourly loop once they have no visits left
+        flowers = np.asarray(plant_populations, dtype=float) * self.flowers_per_plant
+        n = len(flowers)
+        uninfected = flowers[:, UNINFECTED_INDEX].sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mix = np.where(uninfected[:, None] != 0, flowers[:, UNINFECTED_INDEX] / uninfected[:, None], 0)
+        # (infected, uninfected, ii, iu, uu) of every row, where ii, iu and uu
+        # are the expected consecutive infected:infected, infected:uninfected
+        # and uninfected:uninfected pairs
+        state = np.vstack([flowers[:, SS_I], uninfected, np.zeros((3, n))])
+        live = np.arange(n)
+        infected, uninfected, ii, iu, uu = state
+        a, bees = self.attraction, self.number_of_bees
+        hour = 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            while hour <= self.pollination_season and len(live):
+                total = infected + uninfected
+                num_visits = self.visitRate(total, season) * bees
+                if not num_visits.all():
+                    # rows with no flowers left to visit are done for the season
+                    state[:, live] = [infected, uninfected, ii, iu, uu]
+                    keep = num_visits != 0
+                    live, num_visits, total = live[keep], num_visits[keep], total[keep]
+                    infected, uninfected, ii, iu, uu = state[:, live]
+                    a, bees = self.attraction[live], self.number_of_bees[live]
+                    if not len(live):
+                        break
+                # landing probabilities as in PollinationSeason.updateInfectedProb
+                infected_prop = np.where(infected != 0, infected / total, 0)
+                adjust_infected = infected_prop * a
+                adjust_uninfected = (1 - infected_prop) * (1 - a)
+                infected_prob = adjust_infected / (adjust_infected + adjust_uninfected)
+                # choices of genotypes with no flowers left are null
+                qi = np.where(infected > 0, infected_prob, 0)
+                qu = np.where(uninfected > 0, 1 - infected_prob, 0)
+                q = qi + qu
+                pairs = np.where(q != 0, (num_visits * q - 1 + (1 - q) ** num_visits) / (q * q), 0)
+                ii = ii + pairs * qi * qi
+                iu = iu + pairs * qi * qu
+                uu = uu + pairs * qu * qu
+                infected = infected - num_visits * qi
+                uninfected = uninfected - num_visits * qu
+                hour += 1
+        state[:, live] = [infected, uninfected, ii, iu, uu]
+        infected, uninfected, ii, iu, uu = state
+        flower_populations = np.zeros(flowers.shape)
+        flower_populations[:, UNINFECTED_INDEX] = uninfected[:, None] * mix
+        flower_populations[:, SS_I] = infected
+        # infected:infected, infected:uninfected and uninfected:uninfected
+        # pairs, shared between uninfected genotypes by their mix
+        share = np.ones(flowers.shape)
+        share[:, UNINFECTED_INDEX] = mix
+        isinfected = np.arange(len(PLANTTYPES)) == SS_I
+        both = isinfected[:, None] & isinfected[None, :]
+        either = isinfected[:, None] | isinfected[None, :]
+        pairs = np.where(both, ii[:, None, None], np.where(either, iu[:, None, None], uu[:, None, None]))
+        return flower_populations, pairs * share[:, :, None] * share[:, None, :]
+
+    def generatePlantPop(self, flower_populations, cross_list):
+        # expected (N, 5) plant populations, as MeanFieldModel.generatePlantPop
+        n = len(flower_populations)
+        counts = np.column_stack([cross_list.reshape(n, -1), np.maximum(flower_populations, 0)])
+        counts[:, INFECTED_MOTHER & ~SELFING] *= 1 - self.infected_penalty[:, None]
+        counts[:, SELFING] *= self.non_buzz_penalty[:, None]
+        counts[:, INFECTED_MOTHER & SELFING] *= self.non_buzz_infected_penalty[:, None]
+        seeds = np.dot(counts / NOFFSPRING, OFFSPRING)
+        total = seeds.sum(axis=1)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seeds = np.where(total != 0, self.seeds_sown * seeds / total, seeds)
+        infected = seeds[:, 3] * self.infection_rate
+        return np.column_stack([seeds[:, :3], infected, seeds[:, 3] - infected])
+
+    def runOneSeason(self, plant_populations, season=1):
+        # expected (N, 5) plant populations after a season of a run
+        return self.generatePlantPop(*self.runPollination(plant_populations, season))
+
+
+def meanfieldRows(params, counts):
+    # runmodel style summary rows of one expected trajectory, from its plant
+    # populations (PLANTTYPES order) by season
+    outputdata = []
+    for season, pops in enumerate(counts):
+        # aggregate susceptible and resistant
+        s = pops[SS_I] + pops[SS_U]
+        r = pops[RR] + pops[RS] + pops[SR]
+        outputdata.append(list(params) + [season, 'susceptible', s, 0, 0, 0, np.nan])
+        outputdata.append(list(params) + [season, 'resistant', r, 0, 0, 0, np.nan])
+    return outputdata
+
+
+def meanfieldTrajectory(paramsets, seasons=500, plantpops=None, tolerance=1e-9,
+                        seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # (seasons + 1, sets, 5) expected trajectories of every (nbees, attr_inf,
+    # inf_penalty, nb_penalty, nb_inf_penalty) parameter set, as runmeanfield
+    if plantpops is None:
+        plantpops = STARTING_POPULATION
+    paramsets = np.array(paramsets, dtype=float).reshape(-1, 5)
+    trajectory = np.zeros((seasons + 1, len(paramsets), len(PLANTTYPES)))
+    trajectory[0] = [plantpops[x] for x in PLANTTYPES]
+    # sets still moving; those at their fixed point (see runmeanfield) stay there
+    live = np.arange(len(paramsets))
+    for j in range(1, seasons + 1):
+        m = MeanFieldBatch(len(live),
+                           number_of_bees=np.floor(paramsets[live, 0]),
+                           attraction=paramsets[live, 1],
+                           infected_penalty=paramsets[live, 2],
+                           non_buzz_penalty=paramsets[live, 3],
+                           non_buzz_infected_penalty=paramsets[live, 4],
+                           seeds_sown=int(seeds_sown),
+                           infection_rate=float(infection_rate))
+        trajectory[j, live] = m.runOneSeason(trajectory[j - 1, live], j)
+        if j > 1:
+            fixed = np.abs(trajectory[j, live] - trajectory[j - 1, live]).max(axis=1) < tolerance
+            trajectory[j + 1:, live[fixed]] = trajectory[j, live[fixed]]
+            live = live[~fixed]
+            if not len(live):
+                break
+    return trajectory
+
+
+def runmeanfield(nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty,
+                 seasons=500, plantpops=None, tolerance=1e-9,
+                 seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # deterministic counterpart of runmodel, returning the same summary rows
+    # (with zero spread, and no replicate ever fixed) and the single expected
+    # trajectory
+    if plantpops is None:
+        plantpops = STARTING_POPULATION
+    m = MeanFieldModel(attraction=float(attr_inf),
+                       number_of_bees=int(nbees),
+                       infected_penalty=float(inf_penalty),
+                       non_buzz_penalty=float(nb_penalty),
+                       non_buzz_infected_penalty=float(nb_inf_penalty),
+                       seeds_sown=int(seeds_sown),
+                       infection_rate=float(infection_rate))
+    manyruns = [[plantpops]]
+    while len(manyruns) <= seasons:
+        last = manyruns[-1][0]
+        nextpops = m.runOneSeason(last, len(manyruns))
+        manyruns.append([nextpops])
+        if len(manyruns) > 2 and max([abs(nextpops[x] - last[x]) for x in PLANTTYPES]) < tolerance:
+            # fixed point reached (past the first season, whose density
+            # differs), every later season is the same
+            manyruns.extend([[nextpops] for i in range(seasons + 1 - len(manyruns))])
+    params = [nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty]
+    outputdata = meanfieldRows(params, [[counts[0][x] for x in PLANTTYPES] for counts in manyruns])
+    return outputdata, manyruns
+
+
+def meanfieldjob(job):
+    # summary rows of every set of a (paramsets, seasons, seeds_sown,
+    # infection_rate) job, run as one MeanFieldBatch if there are enough of
+    # them, for a process pool
+    paramsets, seasons, seeds_sown, infection_rate = job
+    if len(paramsets) < MEANFIELD_BATCH_MIN:
+        return [runmeanfield(*params, seasons=seasons, seeds_sown=seeds_sown, infection_rate=infection_rate)[0]
+                for params in paramsets]
+    trajectory = meanfieldTrajectory(paramsets, seasons, seeds_sown=seeds_sown, infection_rate=infection_rate)
+    return [meanfieldRows(params, trajectory[:, i]) for i, params in enumerate(paramsets)]
+
+
+def screenmeanfield(paramsets, seasons=500, processes=1,
+                    seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # runmeanfield summary rows of every parameter set, in order, for
+    # screening a sweep before any stochastic runs: sets are dealt out
+    # between processes, each running its share as one MeanFieldBatch
+    paramsets = [list(params) for params in paramsets]
+    if not paramsets:
+        return []
+    blocks = [paramsets[k::processes] for k in range(min(processes, len(paramsets)))]
+    jobs = [(block, seasons, seeds_sown, infection_rate) for block in blocks]
+    if len(jobs) > 1:
+        pool = Pool(len(jobs))
+        try:
+            results = pool.map(meanfieldjob, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [meanfieldjob(job) for job in jobs]
+    # back into the order of paramsets from the blocks they were dealt into
+    return [results[k % len(jobs)][k // len(jobs)] for k in range(len(paramsets))]
@@ -0,0 +1,162 @@
+import random  # for independent foraging streams per greenhouse and season
+from multiprocessing import Pool  # for running greenhouse seasons in parallel
+import numpy as np  # for exchanges between greenhouses
+from model.pollination import PollinationSeason
+from model.reproduction import Reproduction, SEEDTYPES, germinate
+from model.consts import *
+
+
+class Greenhouse(object):
+    """Size, bees, sowing and starting plants of one house of a metapopulation"""
+    def __init__(self, size=GREENHOUSE_SIZE, number_of_bees=NUMBER_OF_BEES, plant_populations=None,
+                 seeds_sown=SEEDS_SOWN):
+        self.size = size
+        self.number_of_bees = number_of_bees
+        self.plant_populations = dict(STARTING_POPULATION if plant_populations is None else plant_populations)
+        self.seeds_sown = seeds_sown
+
+
+def exchangeMatrix(exchange, n):
+    # (from, to) shares of n houses' seeds or pollen: a matrix as given, or an
+    # island model where a share exchange leaves each house, split equally
+    # between the others
+    if np.ndim(exchange) == 2:
+        return np.asarray(exchange, dtype=float)
+    if n == 1:
+        return np.ones((1, 1))
+    return np.full((n, n), exchange / (n - 1.0)) + np.eye(n) * (1 - exchange - exchange / (n - 1.0))
+
+
+def wholeShares(x, total):
+    # round non-negative x to integers adding up to total, largest remainders first
+    whole = np.floor(x).astype(int)
+    for k in np.argsort(-(x - whole), kind='mergesort')[:total - whole.sum()]:
+        whole[k] += 1
+    return whole
+
+
+def moveBees(bees, flowers, exchange):
+    # bees foraging in each house this season: a share exchange of every
+    # house's bees forages in the other houses, in proportion to their flowers
+    bees = np.asarray(bees, dtype=float)
+    flowers = np.asarray(flowers, dtype=float)
+    moved = bees * (1 - exchange)
+    for j in range(len(bees)):
+        others = flowers.copy()
+        others[j] = 0
+        if others.sum() > 0:
+            moved += bees[j] * exchange * others / others.sum()
+        else:
+            moved[j] += bees[j] * exchange
+    return wholeShares(moved, int(round(bees.sum())))
+
+
+def patchSeason(job):
+    # pollination season of one greenhouse, for a process pool: returns its
+    # visitation, flowers and crosses by genotype index
+    plantpops, nbees, attraction, size, seed, season = job
+    p = PollinationSeason(plantpops, attraction=attraction, number_of_bees=nbees, greenhouse_size=size,
+                          rng=random.Random(seed), season=season)
+    p.runOneSeason()
+    return p.visits, p.flowers, p.crosses
+
+
+class Metapopulation(object):
+    """Greenhouses pollinated separately each season, in parallel, and coupled
+    only at the end of the season: pollen carried between houses replaces
+    the fathers of a share of each house's crosses, seed stock is pooled
+    between houses before sowing, and a share of every house's bees forages
+    in the other houses next season"""
+    def __init__(self, greenhouses,
+                 attraction=DEFAULT_ATTRACTION_INFECTED,
+                 infected_penalty=INF_PENALTY,
+                 non_buzz_penalty=NON_BUZZ_PENALTY,
+                 non_buzz_infected_penalty=NON_BUZZ_INF_PENALTY,
+                 seed_exchange=0,
+                 pollen_exchange=0,
+                 bee_exchange=0,
+                 seed=None,
+                 processes=1):
+        self.greenhouses = greenhouses
+        self.attraction = attraction
+        self.infected_penalty = infected_penalty
+        self.non_buzz_penalty = non_buzz_penalty
+        self.non_buzz_infected_penalty = non_buzz_infected_penalty
+        n = len(greenhouses)
+        self.seed_exchange = exchangeMatrix(seed_exchange, n)
+        self.pollen_exchange = exchangeMatrix(pollen_exchange, n)
+        self.bee_exchange = bee_exchange
+        # foraging seeds for every house and season, and a stream for reproduction
+        self.rng = random.Random(seed)
+        self.reproduction_rng = np.random.RandomState(self.rng.getrandbits(32))
+        self.processes = processes
+        self.pool = None
+        self.plant_populations = [dict(g.plant_populations) for g in greenhouses]
+        # seasons run so far
+        self.season = 0
+
+    def exchangePollen(self, visits, crosses):
+        # (house, male, female) crosses once a share of each house's crosses
+        # is fathered by pollen from other houses, with fathers in proportion
+        # to the flowers visited there
+        visits = np.asarray(visits, dtype=float)
+        crosses = np.asarray(crosses, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            donors = np.nan_to_num(visits / visits.sum(axis=1)[:, None])
+        mothers = crosses.sum(axis=1)
+        exchanged = np.empty_like(crosses)
+        for k in range(len(crosses)):
+            foreign = [j for j in range(len(crosses)) if j != k]
+            weights = self.pollen_exchange[foreign, k]
+            pollen = weights.dot(donors[foreign]) if foreign else np.zeros(len(PLANTTYPES))
+            kept = 1 - weights.sum()
+            exchanged[k] = kept * crosses[k] + pollen[:, None] * mothers[k][None, :]
+        return exchanged
+
+    def runOneSeason(self):
+        # pollinate every house, exchange pollen, seed and bees, and sow
+        bees = moveBees([g.number_of_bees for g in self.greenhouses],
+                        [sum(p.values()) * STARTING_FLOWERS for p in self.plant_populations], self.bee_exchange)
+        self.season += 1
+        jobs = [(p, int(b), float(self.attraction), g.size, self.rng.getrandbits(32), self.season)
+                for p, b, g in zip(self.plant_populations, bees, self.greenhouses)]
+        if self.pool is not None:
+            results = self.pool.map(patchSeason, jobs)
+        else:
+            results = [patchSeason(job) for job in jobs]
+        # synchronise at the end of the season
+        visits = [v for v, f, c in results]
+        crosses = self.exchangePollen(visits, [c for v, f, c in results])
+        seeds = []
+        for (v, f, c), cross in zip(results, crosses):
+            r = Reproduction(dict(zip(PLANTTYPES, v)),
+                             dict(zip(PLANTTYPES, f)),
+                             dict([[':'.join([male, female]), cross[i][j]]
+                                   for i, male in enumerate(PLANTTYPES)
+                                   for j, female in enumerate(PLANTTYPES)]),
+                             infected_penalty=float(self.infected_penalty),
+                             non_buzz_penalty=float(self.non_buzz_penalty),
+                             non_buzz_infected_penalty=float(self.non_buzz_infected_penalty),
+                             rng=self.reproduction_rng)
+            r.updateSeedPop()
+            seeds.append([r.seed_populations[x] for x in SEEDTYPES])
+        # seed stock shared between houses before each house sows its own
+        seeds = self.seed_exchange.T.dot(np.array(seeds, dtype=float))
+        self.plant_populations = [dict(zip(PLANTTYPES, germinate(s, g.seeds_sown).tolist()))
+                                  for s, g in zip(seeds, self.greenhouses)]
+        return self.plant_populations
+
+    def run(self, seasons=500):
+        # plant populations of every house (a list) for every season,
+        # season 0 included
+        self.pool = Pool(self.processes) if self.processes > 1 else None
+        try:
+            run = [[dict(p) for p in self.plant_populations]]
+            for j in range(seasons):
+                run.append(self.runOneSeason())
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+            self.pool = None
+        return run
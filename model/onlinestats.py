@@ -0,0 +1,125 @@
+import numpy as np  # for per-season running statistics
+from model.absorbing import fixationSeason, fixationColumns
+from model.consts import *
+
+# population groups summarised for every season: aggregates and single genotypes
+GROUPS = [('susceptible', ['SS_i', 'SS_u']), ('resistant', ['RR', 'RS', 'SR'])] + [(x, [x]) for x in PLANTTYPES]
+
+
+class P2Quantile(object):
+    # streaming estimate of a single quantile in constant memory
+    # (the P-square algorithm of Jain and Chlamtac, 1985)
+    def __init__(self, p):
+        self.p = p
+        self.q = []  # marker heights (the first five observations until initialised)
+        self.n = [0, 1, 2, 3, 4]  # marker positions
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]  # desired marker positions
+        self.dn = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(float(x))
+            q.sort()
+            return
+        # find the cell x falls in, extending the extremes if needed
+        if x < q[0]:
+            q[0] = float(x)
+            k = 0
+        elif x >= q[4]:
+            q[4] = float(x)
+            k = 3
+        else:
+            k = max([i for i in range(4) if q[i] <= x])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.dn[i]
+        # move the middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / float(n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / float(n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / float(n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    # parabolic prediction out of order, use linear instead
+                    qp = q[i] + d * (q[i + d] - q[i]) / float(n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        if len(self.q) < 5:
+            # exact quantile of the few observations so far
+            return np.percentile(self.q, 100 * self.p) if self.q else np.nan
+        return self.q[2]
+
+
+class OnlineSummary(object):
+    # Running mean, variance and SEM over replicates of every season's
+    # population groups, updated one season at a time (Welford's algorithm),
+    # with optional streaming quantiles and the season each replicate fixed
+    def __init__(self, seasons, quantiles=None):
+        self.seasons = seasons
+        self.fixations = []
+        shape = (seasons + 1, len(GROUPS))
+        self.count = np.zeros(shape)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.quantiles = list(quantiles or [])
+        self.estimators = [[[P2Quantile(p) for p in self.quantiles] for g in GROUPS]
+                           for season in range(seasons + 1)]
+
+    def add(self, season, plant_populations):
+        # add one replicate's plant populations for a season
+        x = np.array([sum([plant_populations[y] for y in members]) for name, members in GROUPS], dtype=float)
+        self.count[season] += 1
+        delta = x - self.mean[season]
+        self.mean[season] += delta / self.count[season]
+        self.m2[season] += delta * (x - self.mean[season])
+        for g, estimators in enumerate(self.estimators[season]):
+            for estimator in estimators:
+                estimator.add(x[g])
+
+    def addRun(self, run):
+        # add the plant populations of every season of one replicate
+        for season, plant_populations in enumerate(run):
+            self.add(season, plant_populations)
+        self.fixations.append(fixationSeason(run))
+
+    def std(self):
+        # population standard deviation (as scipy.std)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.m2 / self.count)
+
+    def sem(self):
+        # standard error of the mean from the sample variance (as stats.sem)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.m2 / (self.count - 1) / self.count)
+
+    def converged(self, outcomes, tolerance):
+        # True once the SEM of every (group, season) outcome is within tolerance
+        names = [name for name, members in GROUPS]
+        sem = self.sem()
+        return all([sem[season, names.index(name)] <= tolerance for name, season in outcomes])
+
+    def quantileValues(self, season, g):
+        return [estimator.value() for estimator in self.estimators[season][g]]
+
+    def rows(self, params, groups=('susceptible', 'resistant'), counts=False):
+        # summary rows in 'long' table format: statistics, the share of
+        # replicates fixed by the season and their mean fixation season, any
+        # quantiles and then the number of replicates if counts
+        names = [name for name, members in GROUPS]
+        std, sem = self.std(), self.sem()
+        fixed, fixation = fixationColumns(self.fixations, self.seasons)
+        outputdata = []
+        for season in range(self.seasons + 1):
+            for name in groups:
+                g = names.index(name)
+                stderr = 0 if season == 0 else sem[season, g]
+                outputdata.append(list(params) + [season, name, self.mean[season, g], std[season, g], stderr,
+                                                  fixed[season], fixation] +
+                                  self.quantileValues(season, g) + ([int(self.count[season, g])] if counts else []))
+        return outputdata
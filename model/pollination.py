@@ -1,40 +1,93 @@
 import random  # for stochastic element of visitation
-import itertools  # for medelian crosses using Cartesian product
-import csv  # for data output prior to visualisation
+import bisect  # for locating foraging choices in the cumulative landing probabilities
+from model.trace import HourlyTrace
 from model.consts import *
 
+# genotype indices into the compact population state (PLANTTYPES order)
+RR, RS, SR, SS_I, SS_U = [PLANTTYPES.index(x) for x in ['RR', 'RS', 'SR', 'SS_i', 'SS_u']]
+# genotype order of the cumulative landing probabilities (see updateLandingProbs)
+LANDING_ORDER = [SS_I, RR, RS, SR, SS_U]
+
+
+def flowerDensity(total, greenhouse_size, season):
+    # flowers per m2 of a flower total (or array of totals) in a season of a
+    # run: whole flowers in the first season (1, or 0 outside a run) and exact
+    # after it, as in the original model, which divided its whole starting
+    # populations but the fractional populations its reproduction returned
+    if season <= 1:
+        return total // greenhouse_size * 1.0
+    return total / float(greenhouse_size)
+
 
 class PollinationSeason(object):
     # "Model of pollination over a single season with hour time derivative"
+    # State is held in lists indexed by genotype (PLANTTYPES order) with the
+    # flower total and landing probabilities updated as flowers are killed;
+    # dictionaries keyed by genotype are only built for the season results.
+    __slots__ = ['flowers', 'total', 'visits', 'crosses',
+                 'attraction', 'max_visit_rate', 'pollination_season', 'number_of_bees', 'greenhouse_size',
+                 'density', 'visit_rate', 'infected_prob', 'uninfected_prob', 'thresholds',
+                 'hour', 'season', 'trace', 'owntrace', 'rng', 'streams', 'profile']
+
     def __init__(self, plant_populations,
                  attraction=DEFAULT_ATTRACTION_INFECTED,
                  flowers_per_plant=STARTING_FLOWERS,
                  max_visit_rate=DEFAULT_MAX_VISIT_RATE,
                  pollination_season=FLOWERING_WINDOW,
                  number_of_bees=NUMBER_OF_BEES,
-                 writeresults=False):
+                 writeresults=False,
+                 rng=None,
+                 profile=None,
+                 trace=None,
+                 season=0,
+                 greenhouse_size=GREENHOUSE_SIZE,
+                 streams=None):
         # STATE VARIABLES
-        # convert plant population dictionary to flower population dictionary:
-        self.flower_populations = dict([[pair, plant_populations[pair] * flowers_per_plant] for pair in plant_populations])
+        # convert plant population dictionary to flower populations by genotype:
+        self.flowers = [plant_populations[x] * flowers_per_plant for x in PLANTTYPES]
+        self.total = sum(self.flowers)
         # initial values
         self.attraction = attraction
         self.max_visit_rate = max_visit_rate
-        self.cross_list = dict([[':'.join(x), 0] for x in itertools.product(plant_populations, repeat=2)])
-        self.seasonal_visitation = dict([pair, 0] for pair in plant_populations)
+        self.crosses = [[0] * len(PLANTTYPES) for x in PLANTTYPES]  # [male][female]
+        self.visits = [0] * len(PLANTTYPES)
         self.pollination_season = pollination_season
         self.number_of_bees = number_of_bees
-        # write results to file(s)
-        if writeresults:
-            # visitation tracking
-            self.visitsfile = open('season_visits.csv', 'wb')
-            self.visitscsv = csv.writer(self.visitsfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            self.visitscsv.writerow(['hour'] + ['SR', 'SS_u', 'SS_i', 'RR', 'RS'])
-        else:
-            self.visitscsv = self.visitsfile = None
+        self.greenhouse_size = greenhouse_size
+        self.hour = 1
+        # random.Random instance (or the random module) for foraging choices
+        self.rng = random if rng is None else rng
+        # CommonStreams to restart rng on at every hour, if any
+        self.streams = streams
+        # Profile to add phase timings and counters to, if any
+        self.profile = profile
+        # hourly visitation trace (an HourlyTrace, or anything with its record
+        # method) and the season number it is recorded under
+        self.season = season
+        self.trace = trace
+        # writeresults traces this season alone to season_visits.csv
+        self.owntrace = writeresults and trace is None
+        if self.owntrace:
+            self.trace = HourlyTrace('season_visits.csv')
+        self.updateAll()
+
+    @property
+    def flower_populations(self):
+        return dict(zip(PLANTTYPES, self.flowers))
+
+    @property
+    def seasonal_visitation(self):
+        return dict(zip(PLANTTYPES, self.visits))
+
+    @property
+    def cross_list(self):
+        return dict([[':'.join([male, female]), self.crosses[i][j]]
+                     for i, male in enumerate(PLANTTYPES)
+                     for j, female in enumerate(PLANTTYPES)])
 
     def updateDensity(self):
         # update plant density
-        self.density = float(self.totalPop() / GREENHOUSE_SIZE)
+        self.density = flowerDensity(self.total, self.greenhouse_size, self.season)
 
     def updateVisitRate(self):
         # update bee visit rate
@@ -43,7 +96,8 @@ class PollinationSeason(object):
         self.visit_rate = int(round(v))
 
     def updateInfectedProb(self):
-        infected_prop = self.infectedPop() / float(self.totalPop()) if self.infectedPop() else 0
+        infected = self.flowers[SS_I]
+        infected_prop = infected / float(self.total) if infected else 0
         uninfected_prop = 1 - infected_prop  # includes resistant and susceptible uninfected
         adjust_infected = infected_prop * self.attraction
         adjust_uninfected = uninfected_prop * (1 - self.attraction)
@@ -52,15 +106,14 @@ class PollinationSeason(object):
         self.updateLandingProbs()
 
     def updateLandingProbs(self):
-        self.ssi_prob = self.infected_prob  # SS_i
-        noninfected_pop = self.totalPop() - self.infectedPop()
-        rr_prop = self.flower_populations['RR'] / float(noninfected_pop) if self.flower_populations['RR'] else 0
-        rs_prop = self.flower_populations['RS'] / float(noninfected_pop) if self.flower_populations['RS'] else 0
-        sr_prop = self.flower_populations['SR'] / float(noninfected_pop) if self.flower_populations['SR'] else 0
-        self.rr_prob = self.infected_prob + (self.uninfected_prob * rr_prop)  # RR
-        self.rs_prob = self.rr_prob + (self.uninfected_prob * rs_prop)  # RS
-        self.sr_prob = self.rs_prob + (self.uninfected_prob * sr_prop)  # SR
-        self.ssu_prob = 1
+        # cumulative probabilities of landing on SS_i, RR, RS and SR (SS_u takes the rest)
+        noninfected_pop = float(self.total - self.flowers[SS_I])
+        threshold = self.infected_prob
+        self.thresholds = [threshold]
+        for x in LANDING_ORDER[1:-1]:
+            if self.flowers[x]:
+                threshold += self.uninfected_prob * (self.flowers[x] / noninfected_pop)
+            self.thresholds.append(threshold)
 
     def updateAll(self):
         self.updateDensity()
@@ -68,80 +121,96 @@ class PollinationSeason(object):
         self.updateInfectedProb()
 
     def resistantPop(self):
-        return sum([self.flower_populations[x] for x in ['RR', 'RS', 'SR']])
+        return self.flowers[RR] + self.flowers[RS] + self.flowers[SR]
 
     def susceptiblePop(self):
-        return sum([self.flower_populations[x] for x in ['SS_i', 'SS_u']])
+        return self.flowers[SS_I] + self.flowers[SS_U]
 
     def infectedPop(self):
-        return self.flower_populations['SS_i']
+        return self.flowers[SS_I]
 
     def uninfectedPop(self):
-        return self.flower_populations['SS_u']
+        return self.flowers[SS_U]
 
     def totalPop(self):
-        return sum(self.flower_populations.values())
+        return self.total
 
     def runOneHour(self):
-        # run one iteration of the model
-        self.updateAll()
-        visitation = dict([[pair, 0] for pair in self.flower_populations])
+        # run one iteration of the model, returning False once no visits are possible
+        profile = self.profile
         # release the bees!
         num_visits = self.visit_rate * self.number_of_bees
         if not num_visits:
             # no flowers left to visit this season
-            return
+            if profile is not None:
+                profile.countHour(0, 0)
+            return False
+        if profile is not None:
+            start = profile.clock()
+        choices = [self.foragingChoice() for x in range(num_visits)]
+        if profile is not None:
+            start = profile.time('foraging', start)
+        visitation = self.storeVisits(choices)
+        if profile is not None:
+            start = profile.time('crosses', start)
+        self.updateSeasonalVisitation(visitation)
+        self.killFlowers(visitation)
+        if profile is not None:
+            profile.time('killing', start)
+            profile.countHour(num_visits, sum(visitation))
+        return True
+
+    def storeVisits(self, choices):
+        # count an hour's visits by genotype and store crosses between
+        # consecutive visits, skipping null choices which carry no pollen
+        visitation = [0] * len(PLANTTYPES)
         lastchoice = None
-        for x in range(num_visits):
-            choice = self.foragingChoice()
+        for choice in choices:
             if choice is not None:
                 visitation[choice] += 1
-                if x and lastchoice is not None:
+                if lastchoice is not None:
                     self.storeCross(lastchoice, choice)
                 lastchoice = choice
-        self.killFlowers(visitation)
-        self.updateSeasonalVisitation(visitation)
+        return visitation
 
     def runOneSeason(self):
         # run the model for a season
         self.hour = 1
         while self.hour <= self.pollination_season:
-            self.runOneHour()
+            if self.streams is not None:
+                self.streams.reseed(self.rng, 'foraging', self.season, self.hour)
+            if not self.runOneHour():
+                # populations cannot change for the rest of the season
+                self.hour = self.pollination_season + 1
+                break
             self.hour += 1
-        if self.visitsfile:
-            self.visitsfile.close()
+        if self.owntrace:
+            self.trace.close()
+        if self.profile is not None:
+            self.profile.count('seasons')
         return [self.seasonal_visitation,
                 self.flower_populations,
                 self.cross_list]
 
     def foragingChoice(self):
-        # make probabilistic foraging choice
-        x = random.random()
-        choice = None
-        if x < self.ssi_prob:
-            choice = 'SS_i'
-        elif x < self.rr_prob:
-            choice = 'RR'
-        elif x < self.rs_prob:
-            choice = 'RS'
-        elif x < self.sr_prob:
-            choice = 'SR'
-        elif x < self.ssu_prob:
-            choice = 'SS_u'
-        return choice if self.flower_populations[choice] > 0 else None
+        # make probabilistic foraging choice, as a genotype index
+        choice = LANDING_ORDER[bisect.bisect_right(self.thresholds, self.rng.random())]
+        return choice if self.flowers[choice] > 0 else None
 
     def storeCross(self, male, female):
         # update cross count for seed model
-        self.cross_list[':'.join([male, female])] += 1
+        self.crosses[male][female] += 1
 
     def updateSeasonalVisitation(self, visitation):
         # add hourly visitation to total for selfings in seed model
-        if self.visitscsv:
-            self.visitscsv.writerow([self.hour] + [visitation[x] for x in visitation])
-        for pair in visitation:
-            self.seasonal_visitation[pair] += visitation[pair]
+        if self.trace is not None:
+            self.trace.record(self.season, self.hour, visitation)
+        for i, count in enumerate(visitation):
+            self.visits[i] += count
 
     def killFlowers(self, visitation):
-        # remove visited flowers from population
-        for pair in visitation:
-            self.flower_populations[pair] -= visitation[pair]
+        # remove visited flowers from population and update what depends on it
+        for i, count in enumerate(visitation):
+            self.flowers[i] -= count
+        self.total -= sum(visitation)
+        self.updateAll()
@@ -0,0 +1,48 @@
+from timeit import default_timer as timer  # for wall clock phase timings
+
+# phases timed, and events counted, by PollinationSeason and Reproduction
+PROFILE_PHASES = ['foraging', 'crosses', 'killing', 'seed_counts', 'mendelian_crosses', 'germination']
+PROFILE_COUNTERS = ['seasons', 'hours', 'idle_hours', 'visits', 'null_choices', 'rng_draws', 'seeds_allocated']
+# flat field order for output
+PROFILE_FIELDS = [x + '_seconds' for x in PROFILE_PHASES] + PROFILE_COUNTERS
+
+
+class Profile(object):
+    """Wall time of each simulation phase and counts of events, added to by
+    any PollinationSeason and Reproduction given one (they skip all
+    bookkeeping when not), and merged across replicates"""
+    def __init__(self):
+        self.seconds = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self.counts = dict.fromkeys(PROFILE_COUNTERS, 0)
+
+    def clock(self):
+        return timer()
+
+    def time(self, phase, start):
+        # add the time since start to a phase, returning the time now to
+        # start the next phase from
+        now = timer()
+        self.seconds[phase] += now - start
+        return now
+
+    def count(self, counter, n=1):
+        self.counts[counter] += n
+
+    def countHour(self, draws, visits):
+        # an hour of foraging with draws choices of which visits found flowers
+        self.counts['hours'] += 1
+        self.counts['rng_draws'] += draws
+        self.counts['visits'] += visits
+        self.counts['null_choices'] += draws - visits
+        if not visits:
+            self.counts['idle_hours'] += 1
+
+    def merge(self, other):
+        for x in PROFILE_PHASES:
+            self.seconds[x] += other.seconds[x]
+        for x in PROFILE_COUNTERS:
+            self.counts[x] += other.counts[x]
+
+    def values(self):
+        # every field in PROFILE_FIELDS order
+        return [self.seconds[x] for x in PROFILE_PHASES] + [self.counts[x] for x in PROFILE_COUNTERS]
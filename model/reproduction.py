@@ -1,8 +1,80 @@
-import random  # for stochastic element of visitation
 import itertools  # for medelian crosses using Cartesian product
-import math  # for floor and ceil in rounding
+import numpy as np  # for seed allocation and germination as array operations
 from model.consts import *
 
+# seed genotypes (infection status is assigned at germination)
+SEEDTYPES = ['RR', 'RS', 'SR', 'SS']
+# seed genotypes in the order germination sows them, that of the original
+# dict-based model, whose rounding depends on it
+GERMINATION_ORDER = [SEEDTYPES.index(x) for x in ['SS', 'SR', 'RR', 'RS']]
+
+
+def offspringTypes(father, mother):
+    # seed genotype indices a mendelian cross of two plant genotypes can produce
+    fallele, mallele = [x.rstrip('_iu') for x in [father, mother]]
+    offspring = set([''.join(y) for y in itertools.product(fallele, mallele)])
+    return sorted([SEEDTYPES.index(x) for x in offspring])
+
+# (father, mother) of every recorded cross, in cross_list order (PLANTTYPES by
+# PLANTTYPES), followed by the selfing of each genotype
+CROSSES = list(itertools.product(PLANTTYPES, repeat=2)) + [(x, x) for x in PLANTTYPES]
+# OFFSPRING[c, s] is 1 where cross c produces seed genotype s
+OFFSPRING = np.array([[1 if s in offspringTypes(f, m) else 0 for s in range(len(SEEDTYPES))]
+                      for f, m in CROSSES])
+NOFFSPRING = OFFSPRING.sum(axis=1)
+INFECTED_MOTHER = np.array([m == 'SS_i' for f, m in CROSSES])
+SELFING = np.arange(len(CROSSES)) >= len(PLANTTYPES) ** 2
+
+
+def fairRound(x, rng):
+    # round up with probability equal to the fractional part, so the expected
+    # value is unchanged
+    floor = np.floor(x)
+    return floor + (rng.random_sample(np.shape(x)) < x - floor)
+
+
+def allocateSeeds(counts, rng):
+    # share the whole seeds of each cross (last axis in CROSSES order) equally
+    # between its offspring genotypes, giving any remainder one seed each to
+    # offspring picked at random; returns seeds by SEEDTYPES (last axis)
+    counts = np.asarray(counts, dtype=np.int64)
+    share = counts // NOFFSPRING
+    remainder = counts - share * NOFFSPRING
+    # random ranking of each cross's offspring, non-offspring ranked last
+    keys = np.where(OFFSPRING, rng.random_sample(counts.shape + (len(SEEDTYPES),)), 2)
+    ranks = keys.argsort(axis=-1).argsort(axis=-1)
+    seeds = OFFSPRING * share[..., None] + (ranks < remainder[..., None])
+    return seeds.sum(axis=-2)
+
+
+def roundHalfUp(x):
+    # round to the nearest whole number, halves up (as python 2 round for x >= 0)
+    floor = np.floor(x)
+    return floor + (x - floor >= 0.5)
+
+
+def germinate(seed_populations, seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # sow seeds_sown seeds between the seed populations (last axis, SEEDTYPES
+    # order): each genotype in GERMINATION_ORDER takes its rounded share of
+    # the seeds left to sow, by its share of the seeds not yet sown from, so
+    # that exactly seeds_sown germinate. Then infect a share of the SS plants;
+    # returns plants by PLANTTYPES (last axis)
+    seed_populations = np.asarray(seed_populations, dtype=float)
+    plants = np.zeros(seed_populations.shape, dtype=np.int64)
+    sown = np.zeros(seed_populations.shape[:-1])
+    for k, s in enumerate(GERMINATION_ORDER):
+        count = seed_populations[..., s]
+        total = seed_populations[..., GERMINATION_ORDER[k:]].sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where((count > 0) & (total > 0), count / total, 0)
+        planted = roundHalfUp((seeds_sown - sown) * share)
+        plants[..., s] = planted
+        sown += planted
+    infected = roundHalfUp(plants[..., 3] * infection_rate).astype(np.int64)
+    byname = {'RR': plants[..., 0], 'RS': plants[..., 1], 'SR': plants[..., 2],
+              'SS_i': infected, 'SS_u': plants[..., 3] - infected}
+    return np.stack([byname[x] for x in PLANTTYPES], axis=-1)
+
 
 class Reproduction(object):
     # Model of reproduction following a single season of pollination
@@ -12,95 +84,58 @@ class Reproduction(object):
                  cross_list,
                  infected_penalty=INF_PENALTY,
                  non_buzz_penalty=NON_BUZZ_PENALTY,
-                 non_buzz_infected_penalty=NON_BUZZ_INF_PENALTY):
+                 non_buzz_infected_penalty=NON_BUZZ_INF_PENALTY,
+                 rng=None,
+                 seeds_sown=SEEDS_SOWN,
+                 infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE,
+                 profile=None):
         self.seasonal_visitation = seasonal_visitation
         self.flower_populations = flower_populations
         self.cross_list = cross_list
-        self.seed_populations = dict([[x, 0] for x in ['RR', 'RS', 'SR', 'SS']])
         self.infected_penalty = infected_penalty
         self.non_buzz_penalty = non_buzz_penalty
         self.non_buzz_infected_penalty = non_buzz_infected_penalty
+        # numpy RandomState (or the numpy.random module) for seed allocation
+        self.rng = np.random if rng is None else rng
+        self.seeds_sown = seeds_sown
+        self.infection_rate = infection_rate
+        # Profile to add phase timings and counters to, if any
+        self.profile = profile
+
+    def seedCounts(self):
+        # seeds of every cross in CROSSES order, before mendelian allocation
+        counts = np.array([self.cross_list[':'.join([f, m])] for f, m in CROSSES[:len(PLANTTYPES) ** 2]] +
+                          [max(self.flower_populations[x], 0) for x in PLANTTYPES], dtype=float)
+        # seed counts are modified for infected mothers
+        buzzed = INFECTED_MOTHER & ~SELFING
+        counts[buzzed] = np.floor(counts[buzzed] * (1 - self.infected_penalty) + 0.5)
+        # selfing seeds are modified for non-buzzing and infected mothers
+        counts[SELFING] *= self.non_buzz_penalty
+        counts[INFECTED_MOTHER & SELFING] *= self.non_buzz_infected_penalty
+        return fairRound(counts, self.rng)
 
     def updateSeedPop(self):
-        # recorded crosses
-        for parents, count in self.cross_list.items():
-            father, mother = parents.split(':')
-            # seed counts are modified for infected mothers
-            seed_count = self.seedCount(count, mother == 'SS_i')
-            # alleles disregard infection information
-            fallele, mallele = [x.rstrip('_iu') for x in [father, mother]]
-            # perform mendelian cross
-            self.mendelianCross(fallele, mallele, seed_count)
-        # selfing
-        for planttype, count in self.flower_populations.items():
-            father, mother = planttype, planttype
-            # seed counts modified for non-buzzing and infected mothers
-            seed_count = self.seedCount(count, mother == 'SS_i', buzz=False)
-            # alleles disregard infection information
-            # alleles disregard infection information
-            fallele, mallele = [x.rstrip('_iu') for x in [father, mother]]
-            # perform mendelian cross
-            self.mendelianCross(fallele, mallele, seed_count)
+        profile = self.profile
+        if profile is not None:
+            start = profile.clock()
+        counts = self.seedCounts()
+        if profile is not None:
+            start = profile.time('seed_counts', start)
+        seeds = allocateSeeds(counts, self.rng)
+        if profile is not None:
+            profile.time('mendelian_crosses', start)
+            # a draw for rounding each cross and for ranking each of its seed genotypes
+            profile.count('rng_draws', counts.size * (1 + len(SEEDTYPES)))
+            profile.count('seeds_allocated', int(seeds.sum()))
+        self.seed_populations = dict(zip(SEEDTYPES, seeds.tolist()))
 
     def generatePlantPop(self):
         self.updateSeedPop()
+        if self.profile is not None:
+            start = self.profile.clock()
         # generate plant population using germination
-        seedsassigned = 0
-        allelestoassign = self.seed_populations.keys()
-        self.plant_populations = dict([[x, 0] for x in self.seed_populations])
-        for allele, count in self.seed_populations.items():
-            remaining_seed_pop = dict([[x, self.seed_populations[x]] for x in allelestoassign])
-            seedsplanted = round((1000 - seedsassigned) * self.getSeedProp(allele, remaining_seed_pop))
-            self.plant_populations[allele] += seedsplanted
-            seedsassigned += seedsplanted
-            allelestoassign.remove(allele)
-        self.plant_populations['SS_i'] = int(round(self.plant_populations['SS'] / 2))
-        self.plant_populations['SS_u'] = self.plant_populations['SS'] - self.plant_populations['SS_i']
-        del(self.plant_populations['SS'])
+        plants = germinate([self.seed_populations[x] for x in SEEDTYPES], self.seeds_sown, self.infection_rate)
+        self.plant_populations = dict(zip(PLANTTYPES, plants.tolist()))
+        if self.profile is not None:
+            self.profile.time('germination', start)
         return self.plant_populations
-
-    def getSeedProp(self, allele, pop):
-        n = pop[allele]
-        tot = float(sum(pop.values()))
-        prop = n / tot if n and tot else 0
-        return prop
-
-    def seedCount(self, count, infected, buzz=True):
-        # modify seed increment count if the mother was infected
-        if buzz:
-            if infected:
-                return round(count - count * self.infected_penalty)
-            else:
-                return count
-        else:
-            selfcount = count * self.non_buzz_penalty
-            if infected:
-                # NOTE: infected mother penalty currently does not
-                # apply when calculating non-buzzed seed numbers...
-                # perhaps we need to apply the maternal penalty first?
-                # or does the non-buzz-infected-penalty already account for that?
-                selfcount = selfcount * self.non_buzz_infected_penalty
-            return selfcount
-
-    def mendelianCross(self, fallele, mallele, seed_count):
-        offspring = set([''.join(y) for y in itertools.product(fallele, mallele)])
-        counted = 0
-        ncounted = 0
-        for o in offspring:
-            count = int(self.randomRound(seed_count - counted, len(offspring) - ncounted))
-            self.seed_populations[o] += count
-            counted += count
-            ncounted += 1
-
-    def randomRound(self, i, n):
-        # for n offspring possibilities and i counts to share
-        # return the division of i that the current offspring
-        # will receive, fairly rounded
-        if n == 1:
-            # no need to round
-            return i
-        else:
-            # perform fair rounding
-            x = random.random()
-            c = i / float(n)
-            return math.floor(c) if x < 1 / float(n) else math.ceil(c)
@@ -0,0 +1,333 @@
+import os  # for identifying workers in progress reports
+import csv  # for data output
+import time  # for timing parameter sets
+import hashlib  # for seeding batches
+import traceback  # for passing worker errors back to the driver
+from multiprocessing import Pool, Queue  # for running parameter sets in parallel
+try:
+    import Queue as queue  # for collecting finished chunks in the driver
+except ImportError:
+    import queue
+from model.simulation import runreplicates, vectorisedEngine, ENGINES
+from model.batch import batchTrajectory
+from model.streams import RowStreams
+from model.store import resultKey, TrajectoryStore
+from model.profiling import Profile, PROFILE_FIELDS
+from model.telemetry import RunCost
+from model.consts import *
+
+# cost of a replicate season by engine, in scalar visits (about 1.2us):
+# (per visit, per simulated hour, per season for reproduction). Measured
+# at default populations: the per-visit loop costs by visits, while the
+# vectorised engine costs by hours and barely by visits, and a batch
+# shares each hour between all the rows of its chunk (here ~24 rows)
+ENGINE_COSTS = {'scalar': (1, 10, 550),
+                'vector': (0.05, 45, 950),
+                'batch': (0.06, 7, 550)}
+# engines a sweep can run with: those of a replicate (see vectorisedEngine),
+# or BatchSimulation advancing every replicate of a chunk's sets in lockstep
+SWEEP_ENGINES = ENGINES + ['batch']
+
+
+seasonlengths = {}
+
+
+def seasonLength(nbees):
+    # (hours, visits) of a season with nbees bees from the starting flowers,
+    # depleting flowers hour by hour with every visit killing one: visits
+    # grow with the number of bees until bees empty the greenhouse before
+    # the end of the flowering window, after which seasons only get shorter
+    if nbees not in seasonlengths:
+        total = STARTING_FLOWERS * SEEDS_SOWN
+        hours = visits = 0
+        while hours < FLOWERING_WINDOW:
+            density = total / float(GREENHOUSE_SIZE)
+            rate = int(round(DEFAULT_MAX_VISIT_RATE * density ** 2 / (100 ** 2 + density ** 2)))
+            hourly = min(nbees * rate, total)
+            if not hourly:
+                break
+            hours += 1
+            visits += hourly
+            total -= hourly
+        seasonlengths[nbees] = (hours, visits)
+    return seasonlengths[nbees]
+
+
+def estimateCost(params, seasons=500, repeats=3, engine='scalar'):
+    # rough cost of running a parameter set with a sweep engine (see
+    # SWEEP_ENGINES), in scalar visits
+    nbees = max(int(params[0]), 1)
+    if engine != 'batch':
+        engine = 'vector' if vectorisedEngine(nbees, engine) else 'scalar'
+    visit_cost, hour_cost, season_cost = ENGINE_COSTS[engine]
+    hours, visits = seasonLength(nbees)
+    return seasons * repeats * (visit_cost * visits + hour_cost * hours + season_cost)
+
+
+# trajectory stores opened by this worker process, by directory
+workerstores = {}
+# queue this worker process reports finished parameter sets on, if any
+workerprogress = None
+
+
+def startworker(progress):
+    # process pool initializer, giving every worker the driver's progress queue
+    global workerprogress
+    workerprogress = progress
+
+
+def batchSeeds(seed, chunk, repeats):
+    # seeds of the random streams of every row of a batch of (slot, params),
+    # each from the seed, its set's parameters and its replicate alone, so
+    # that batch results do not depend on how sets are chunked; None if unseeded
+    if seed is None:
+        return [None] * (len(chunk) * repeats)
+    names = ['%r:%r:%d' % (seed, [float(x) for x in params], k) for slot, params in chunk for k in range(repeats)]
+    return [int(hashlib.sha1(name.encode('utf-8')).hexdigest()[:8], 16) for name in names]
+
+
+def runbatchchunk(store, chunk, seasons, repeats, seed, seeds_sown, infection_rate):
+    # run a chunk of (slot, params) as one BatchSimulation, sharing out its
+    # wall time between the sets in progress reports
+    started = time.time()
+    trajectory, visits = batchTrajectory([params for slot, params in chunk], seasons, repeats,
+                                         rng=RowStreams(batchSeeds(seed, chunk, repeats)),
+                                         seeds_sown=seeds_sown, infection_rate=infection_rate)
+    ended = time.time()
+    share = (ended - started) / len(chunk)
+    for i, (slot, params) in enumerate(chunk):
+        store.writeTrajectory(slot, trajectory[:, i].transpose(1, 0, 2))
+        if workerprogress is not None:
+            workerprogress.put((os.getpid(), slot, params, started + i * share, started + (i + 1) * share,
+                                seasons * repeats, int(visits[i])))
+
+
+def runchunk(job):
+    # run a chunk of (slot, params) in a worker, writing results straight into
+    # the shared trajectory store so that only slot numbers go back to the
+    # driver; errors are returned rather than raised so that the driver is
+    # always told the chunk has finished. Each set's timing and cost is put
+    # on the progress queue as it finishes
+    (chunk, seasons, repeats, seed, directory, profiled, tracefiles, crn, engine, adaptive,
+     seeds_sown, infection_rate) = job
+    slots = [slot for slot, params in chunk]
+    try:
+        if directory not in workerstores:
+            workerstores[directory] = TrajectoryStore(directory, mode='r+')
+        store = workerstores[directory]
+        if engine == 'batch':
+            runbatchchunk(store, chunk, seasons, repeats, seed, seeds_sown, infection_rate)
+            chunk = []
+        for slot, params in chunk:
+            profile = Profile() if profiled else None
+            cost = RunCost()
+            started = time.time()
+            tolerance, max_repeats, outcomes = adaptive if adaptive is not None else (None, repeats, None)
+            store.write(slot, runreplicates(*params, seasons=seasons, repeats=repeats, seed=seed,
+                                            profile=profile, trace=tracefiles, cost=cost, crn=crn,
+                                            vectorised=vectorisedEngine(params[0], engine),
+                                            tolerance=tolerance, max_repeats=max_repeats, outcomes=outcomes,
+                                            seeds_sown=seeds_sown, infection_rate=infection_rate))
+            if profiled:
+                store.writeProfile(slot, profile)
+            if workerprogress is not None:
+                workerprogress.put((os.getpid(), slot, params, started, time.time(), cost.seasons, cost.visits))
+        store.flush()
+        return slots, None
+    except Exception:
+        return slots, traceback.format_exc()
+
+
+class SweepScheduler(object):
+    """Run parameter sets over a process pool, most expensive first"""
+    def __init__(self, nprocesses, seasons=500, repeats=3, seed=None,
+                 chunks_per_process=4, max_pending=None, profile=False, trace=None, crn=False,
+                 engine='scalar', tolerance=None, max_repeats=100, outcomes=None,
+                 seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+        self.nprocesses = nprocesses
+        self.seasons = seasons
+        self.repeats = repeats
+        self.seed = seed
+        self.chunks_per_process = chunks_per_process
+        # finished chunks waiting to be written before no more are submitted
+        self.max_pending = 2 * nprocesses if max_pending is None else max_pending
+        # record a Profile of every parameter set run in the store
+        self.profile = profile
+        # TraceFiles to write the hourly visitation of every replicate run to
+        self.trace = trace
+        # run every set on common random numbers (see runreplicates)
+        self.crn = crn
+        if crn and seed is None:
+            raise ValueError('common random numbers need a seed')
+        # engine (see SWEEP_ENGINES); with the batch engine every row has its
+        # own stream (see batchSeeds), and the per-replicate options are not available
+        if engine not in SWEEP_ENGINES:
+            raise ValueError('unknown engine %r, expected one of %s' % (engine, ', '.join(SWEEP_ENGINES)))
+        if engine == 'batch' and (profile or trace is not None or crn or tolerance is not None):
+            raise ValueError('the batch engine cannot profile, trace, use common random numbers '
+                             'or add replicates adaptively')
+        self.engine = engine
+        # given a tolerance, every set runs from repeats to max_repeats
+        # replicates until the SEM of its outcomes is within it (see
+        # runreplicates), into a store adaptive over max(repeats, max_repeats)
+        self.adaptive = None
+        self.replicates = repeats
+        if tolerance is not None:
+            outcomes = [('resistant', seasons)] if outcomes is None else outcomes
+            self.adaptive = (tolerance, max_repeats, [tuple(x) for x in outcomes])
+            self.replicates = max(repeats, max_repeats)
+        # seeds sown every season and the share of SS plants infected
+        self.seeds_sown = seeds_sown
+        self.infection_rate = infection_rate
+
+    def key(self, params):
+        # result cache key of a parameter set, for the engine it runs with
+        if self.engine == 'batch':
+            engine = 'batch'
+        else:
+            engine = 'vector' if vectorisedEngine(params[0], self.engine) else 'scalar'
+        return resultKey(params, self.seasons, self.repeats, self.seed, self.crn, engine, self.adaptive,
+                         self.seeds_sown, self.infection_rate)
+
+    def schedule(self, paramsets):
+        # order (slot, params) longest first, grouping cheap ones into chunks
+        # of about the cost a process should take on at a time
+        costed = sorted([(estimateCost(p[1], self.seasons, self.repeats, self.engine), p) for p in paramsets],
+                        key=lambda x: -x[0])
+        total = sum([c for c, p in costed])
+        chunkcost = total / float(self.nprocesses * self.chunks_per_process) if costed else 0
+        chunks = []
+        chunk = []
+        cost = 0
+        for c, params in costed:
+            if chunk and cost + c > chunkcost:
+                chunks.append(chunk)
+                chunk, cost = [], 0
+            chunk.append(params)
+            cost += c
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def run(self, store, handle=None, cache=None, progress=None):
+        # run every parameter set of a TrajectoryStore into its slot, calling
+        # handle(slot) in this process as each one finishes; sets already in
+        # the cache (a ResultCache) are copied over first and only the rest are
+        # run. Sets finished by workers are reported to progress (a
+        # SweepProgress) if given, as they finish rather than chunk by chunk
+        adaptive = self.adaptive is not None
+        if (store.seasons, store.repeats, store.adaptive) != (self.seasons, self.replicates, adaptive):
+            raise ValueError('store holds %d seasons and %s%d repeats, scheduler runs %d and %s%d'
+                             % (store.seasons, 'up to ' if store.adaptive else '', store.repeats, self.seasons,
+                                'up to ' if adaptive else '', self.replicates))
+        torun = []
+        for slot, params in enumerate(store.params.tolist()):
+            key = self.key(params)
+            trajectory = cache.get(key) if cache is not None else None
+            if trajectory is None:
+                torun.append((slot, params))
+            else:
+                store.writeTrajectory(slot, trajectory)
+                self.finish(store, slot, handle)
+        chunks = self.schedule(torun)
+        finished = queue.Queue()
+        store.flush()
+        reports = None
+        if progress is not None:
+            progress.start(len(store.params), self.nprocesses,
+                           dict([(slot, estimateCost(params, self.seasons, self.repeats, self.engine))
+                                 for slot, params in torun]))
+            reports = Queue()
+        pool = Pool(self.nprocesses, initializer=startworker, initargs=(reports,))
+        try:
+            submitted = running = 0
+            while submitted < len(chunks) or running:
+                # keep workers busy but stop once max_pending chunks are unwritten
+                while submitted < len(chunks) and running < self.max_pending:
+                    job = (chunks[submitted], self.seasons, self.repeats, self.seed, store.directory,
+                           self.profile, self.trace, self.crn, self.engine, self.adaptive,
+                           self.seeds_sown, self.infection_rate)
+                    pool.apply_async(runchunk, (job,), callback=finished.put)
+                    submitted += 1
+                    running += 1
+                try:
+                    # wake up to report progress every second (a timeout also
+                    # keeps the wait interruptible under python 2)
+                    slots, error = finished.get(True, 1.0 if reports is not None else 1e6)
+                except queue.Empty:
+                    self.report(reports, progress)
+                    continue
+                running -= 1
+                if reports is not None:
+                    self.report(reports, progress)
+                if error is not None:
+                    raise RuntimeError('parameter set slots %s failed:\n%s' % (slots, error))
+                for slot in slots:
+                    if cache is not None:
+                        params = store.params[slot].tolist()
+                        cache.put(self.key(params), store.trajectory(slot))
+                    self.finish(store, slot, handle)
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            store.flush()
+        if reports is not None:
+            self.report(reports, progress)
+            progress.report()
+
+    def report(self, reports, progress):
+        # pass sets reported finished by workers on to progress
+        while True:
+            try:
+                progress.finished(*reports.get_nowait())
+            except queue.Empty:
+                break
+
+    def finish(self, store, slot, handle):
+        store.finish(slot)
+        if handle is not None:
+            handle(slot)
+
+
+class SweepWriter(object):
+    """Write summary rows of finished parameter sets from a trajectory store,
+    and their profiles to profilename if given. Given a design (the design
+    rows' parameter sets using each slot), rows are written for every design
+    row of a slot, so a set shared by several rows is run only once"""
+    def __init__(self, filename, store, headers=None, profilename=None, design=None):
+        self.outfile = open(filename, 'wb')
+        self.outcsv = csv.writer(self.outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        if headers is not None:
+            self.outcsv.writerow(headers)
+        self.profilefile = None
+        if profilename is not None:
+            self.profilefile = open(profilename, 'wb')
+            self.profilecsv = csv.writer(self.profilefile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            if headers is not None:
+                self.profilecsv.writerow(headers[:5] + PROFILE_FIELDS)
+        self.store = store
+        self.design = design
+
+    def write(self, slot):
+        paramsets = [None] if self.design is None else self.design[slot]
+        for params in paramsets:
+            for line in self.store.summary([slot]):
+                self.outcsv.writerow(line if params is None else list(params) + line[len(params):])
+            if self.profilefile is not None:
+                for line in self.store.profileRows([slot]):
+                    self.profilecsv.writerow(line if params is None else list(params) + line[len(params):])
+
+    def close(self):
+        self.outfile.close()
+        if self.profilefile is not None:
+            self.profilefile.close()
+        self.store.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,131 @@
+import numpy as np  # for sampling designs and index estimates
+from model.consts import *
+
+# parameters marked *** in consts, with their sensitivity analysis ranges
+SENSITIVITY_RANGES = [('nbees', 1, 101),
+                      ('attr_inf', 0.5, 1.0),
+                      ('inf_penalty', 0, 1),
+                      ('nb_penalty', 0, 1),
+                      ('nb_inf_penalty', 0, 0.5)]
+
+# (degree, polynomial coefficients, initial direction numbers) of Sobol
+# dimensions 2 onwards (Joe and Kuo, 2008); the first dimension is van der Corput
+SOBOL_DIRECTIONS = [(1, 0, [1]),
+                    (2, 1, [1, 3]),
+                    (3, 1, [1, 3, 1]),
+                    (3, 2, [1, 1, 1]),
+                    (4, 1, [1, 1, 3, 3]),
+                    (4, 4, [1, 3, 5, 13]),
+                    (5, 2, [1, 1, 5, 5, 17]),
+                    (5, 4, [1, 1, 5, 5, 5]),
+                    (5, 7, [1, 1, 7, 11, 19]),
+                    (5, 11, [1, 1, 5, 1, 1]),
+                    (5, 13, [1, 1, 1, 3, 11])]
+SOBOL_BITS = 30
+
+
+def sobolSequence(n, dims, skip=1):
+    # first n points (after skipping skip, by default the origin) of the
+    # dims-dimensional Sobol sequence in [0, 1), in Gray code order
+    if dims > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError('Sobol sequence limited to %d dimensions' % (len(SOBOL_DIRECTIONS) + 1))
+    directions = np.zeros((dims, SOBOL_BITS), dtype=np.int64)
+    directions[0] = [1 << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+    for j in range(1, dims):
+        s, a, m = SOBOL_DIRECTIONS[j - 1]
+        for k in range(SOBOL_BITS):
+            if k < s:
+                directions[j, k] = m[k] << (SOBOL_BITS - 1 - k)
+            else:
+                v = directions[j, k - s] ^ (directions[j, k - s] >> s)
+                for l in range(1, s):
+                    if (a >> (s - 1 - l)) & 1:
+                        v ^= directions[j, k - l]
+                directions[j, k] = v
+    x = np.zeros(dims, dtype=np.int64)
+    points = []
+    for i in range(n + skip):
+        if i:
+            # index of the lowest zero bit of i - 1
+            c = 0
+            while (i - 1) >> c & 1:
+                c += 1
+            x = x ^ directions[:, c]
+        if i >= skip:
+            points.append(x.copy())
+    return np.array(points, dtype=float).reshape(n, dims) / (1 << SOBOL_BITS)
+
+
+def latinHypercube(n, dims, rng=None):
+    # n points in [0, 1)^dims with exactly one point in each of n equal
+    # intervals of every dimension
+    rng = np.random if rng is None else rng
+    strata = np.array([rng.permutation(n) for j in range(dims)]).T
+    return (strata + rng.random_sample((n, dims))) / n
+
+
+def scaleDesign(unit, ranges=SENSITIVITY_RANGES):
+    # parameter sets from points in the unit hypercube, with whole bees
+    lows = np.array([low for name, low, high in ranges], dtype=float)
+    highs = np.array([high for name, low, high in ranges], dtype=float)
+    params = lows + unit * (highs - lows)
+    names = [name for name, low, high in ranges]
+    if 'nbees' in names:
+        k = names.index('nbees')
+        params[:, k] = np.floor(params[:, k] + 0.5)
+    return params
+
+
+def saltelliDesign(n, ranges=SENSITIVITY_RANGES, method='sobol', rng=None):
+    # parameter sets for estimating Sobol indices from n base samples: the
+    # rows of two independent designs A and B followed by, for every
+    # parameter, A with that parameter's column taken from B (n * (d + 2) sets)
+    d = len(ranges)
+    if method == 'sobol':
+        unit = sobolSequence(n, 2 * d)
+    elif method == 'lhs':
+        unit = latinHypercube(n, 2 * d, rng)
+    else:
+        raise ValueError('unknown design method %r' % method)
+    a, b = unit[:, :d], unit[:, d:]
+    blocks = [a, b]
+    for i in range(d):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        blocks.append(ab)
+    return scaleDesign(np.vstack(blocks), ranges)
+
+
+def sobolIndices(outputs, d):
+    # first order and total Sobol indices of every parameter from model
+    # outputs over a saltelliDesign, using the estimators of Saltelli et al.
+    # (2010) for first order and Jansen (1999) for total effects
+    outputs = np.asarray(outputs, dtype=float)
+    n = len(outputs) // (d + 2)
+    fa, fb = outputs[:n], outputs[n:2 * n]
+    variance = np.concatenate([fa, fb]).var()
+    first, total = [], []
+    for i in range(d):
+        fab = outputs[(2 + i) * n:(3 + i) * n]
+        if variance > 0:
+            first.append(np.mean(fb * (fab - fa)) / variance)
+            total.append(0.5 * np.mean((fa - fab) ** 2) / variance)
+        else:
+            first.append(np.nan)
+            total.append(np.nan)
+    return np.array(first), np.array(total)
+
+
+def indexRows(store, ranges=SENSITIVITY_RANGES, season=None, slots=None):
+    # (population, parameter, first order, total) rows for the mean
+    # population groups of a finished saltelliDesign TrajectoryStore at a
+    # season (by default the last); slots gives the store slot of each
+    # design row if the store does not hold them in design order
+    season = store.seasons if season is None else season
+    slots = np.arange(len(store.params)) if slots is None else np.asarray(slots)
+    rows = []
+    for g, (population, members) in enumerate(store.GROUPS):
+        first, total = sobolIndices(store.summaries[slots, season, g, 0], len(ranges))
+        for (name, low, high), s, st in zip(ranges, first, total):
+            rows.append([population, name, s, st])
+    return rows
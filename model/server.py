@@ -0,0 +1,262 @@
+import json  # for requests and streamed results
+import threading  # for serving clients and routing worker results concurrently
+import traceback  # for passing worker errors back to clients
+from multiprocessing import Pool, Manager  # for the warm worker pool
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+    from httplib import HTTPConnection
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+    from http.client import HTTPConnection
+import numpy as np  # for per-season summaries of replicates
+from model.simulation import runreplicate, replicateSeeds
+from model.store import resultKey, TrajectoryStore
+from model.consts import *
+
+
+def seasonRows(params, counts, season):
+    # runmodel summary rows of one season from (replicates, genotypes) populations
+    rows = []
+    for name, members in TrajectoryStore.GROUPS:
+        x = counts[:, [PLANTTYPES.index(m) for m in members]].sum(axis=1).astype(float)
+        sem = np.nan if len(x) < 2 else x.std(ddof=1) / np.sqrt(len(x))
+        rows.append(list(params) + [season, name, float(x.mean()), float(x.std()), 0 if season == 0 else float(sem)])
+    return rows
+
+
+def serverreplicate(job):
+    # run one replicate in a worker, sending every season's populations (or
+    # the error) back to the server through its message queue
+    key, replicate, params, seasons, seed, messages = job
+    try:
+        runreplicate(*params, seasons=seasons, seed=seed,
+                     progress=lambda j, plantpops: messages.put((key, replicate, j, plantpops)))
+    except Exception:
+        messages.put((key, replicate, None, traceback.format_exc()))
+
+
+class ServerJob(object):
+    """Replicates of one parameter set being run by the server, shared by
+    every client asking for the same set while it runs. Summary rows of a
+    season are ready once every replicate has finished it."""
+    def __init__(self, key, params, seasons, repeats):
+        self.key = key
+        self.params = list(params)
+        self.seasons = seasons
+        self.trajectory = np.zeros((repeats, seasons + 1, len(PLANTTYPES)), dtype=np.int32)
+        self.trajectory[:, 0] = [STARTING_POPULATION[x] for x in PLANTTYPES]
+        self.reported = [0] * repeats
+        self.rows = [seasonRows(self.params, self.trajectory[:, 0], 0)]
+        self.error = None
+        self.condition = threading.Condition()
+
+    def done(self):
+        return len(self.rows) > self.seasons
+
+    def report(self, replicate, season, plant_populations):
+        with self.condition:
+            self.trajectory[replicate, season] = [plant_populations[x] for x in PLANTTYPES]
+            self.reported[replicate] = season
+            while len(self.rows) <= min(self.reported):
+                season = len(self.rows)
+                self.rows.append(seasonRows(self.params, self.trajectory[:, season], season))
+            self.condition.notify_all()
+
+    def load(self, trajectory):
+        # fill in every season from a cached (replicates, seasons + 1, genotypes) array
+        with self.condition:
+            self.trajectory[:] = trajectory
+            self.reported = [self.seasons] * len(self.reported)
+            self.rows = [seasonRows(self.params, self.trajectory[:, j], j) for j in range(self.seasons + 1)]
+            self.condition.notify_all()
+
+    def fail(self, error):
+        with self.condition:
+            self.error = error
+            self.condition.notify_all()
+
+    def wait(self, sent):
+        # summary rows of the seasons finished after the first sent, waiting
+        # for at least one unless the job is over
+        with self.condition:
+            while len(self.rows) <= sent and self.error is None and not self.done():
+                # a timeout keeps the wait interruptible under python 2
+                self.condition.wait(1.0)
+            if self.error is not None:
+                raise RuntimeError(self.error)
+            return self.rows[sent:]
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # POST /run {"params": [...], "seasons": 500, "repeats": 3, "seed": null}
+    #   streams {"season": j, "rows": [...]} lines as seasons finish
+    # POST /sweep {"paramsets": [[...], ...], "seasons": ..., "repeats": ..., "seed": ...}
+    #   streams {"params": [...], "rows": [...]} lines as parameter sets finish
+    # GET /status
+    #   parameter sets in flight
+    def do_GET(self):
+        if self.path != '/status':
+            return self.send_error(404)
+        self.sendJSON(200, self.server.simulation.status())
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+            options = dict([(k, body[k]) for k in ['seasons', 'repeats', 'seed'] if k in body])
+            if self.path == '/run':
+                jobs = [self.server.simulation.submit(body['params'], **options)]
+            elif self.path == '/sweep':
+                jobs = [self.server.simulation.submit(p, **options) for p in body['paramsets']]
+            else:
+                return self.send_error(404)
+        except (ValueError, KeyError, TypeError) as e:
+            return self.sendJSON(400, {'error': repr(e)})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        try:
+            if self.path == '/run':
+                self.streamSeasons(jobs[0])
+            else:
+                self.streamSets(jobs)
+        except RuntimeError as e:
+            self.writeLine({'error': str(e)})
+
+    def streamSeasons(self, job):
+        sent = 0
+        while sent <= job.seasons:
+            for rows in job.wait(sent):
+                self.writeLine({'season': sent, 'rows': rows})
+                sent += 1
+
+    def streamSets(self, jobs):
+        pending = list(jobs)
+        while pending:
+            finished = [job for job in pending if job.done() or job.error is not None]
+            for job in finished:
+                pending.remove(job)
+                if job.error is not None:
+                    self.writeLine({'params': job.params, 'error': job.error})
+                else:
+                    self.writeLine({'params': job.params, 'rows': [row for season in job.rows for row in season]})
+            if pending and not finished:
+                with pending[0].condition:
+                    pending[0].condition.wait(1.0)
+
+    def writeLine(self, data):
+        self.wfile.write((json.dumps(data) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+    def sendJSON(self, code, data):
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class SimulationServer(object):
+    """Local HTTP service running parameter sets on a warm worker pool.
+    Finished sets are served from a ResultCache (shared with sweeps), and a
+    request for a set already running joins it rather than running it again."""
+    def __init__(self, processes=1, cache=None, host='127.0.0.1', port=8765, seasons=500, repeats=3):
+        self.processes = processes
+        self.cache = cache
+        self.seasons = seasons
+        self.repeats = repeats
+        self.pool = Pool(processes)
+        self.manager = Manager()
+        self.messages = self.manager.Queue()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.dispatcher = threading.Thread(target=self.dispatch)
+        self.dispatcher.daemon = True
+        self.httpd = ThreadingHTTPServer((host, port), RequestHandler)
+        self.httpd.simulation = self
+
+    def submit(self, params, seasons=None, repeats=None, seed=None):
+        # the ServerJob running (or finished for) a parameter set
+        seasons = self.seasons if seasons is None else int(seasons)
+        repeats = self.repeats if repeats is None else int(repeats)
+        params = [float(x) for x in params]
+        if len(params) != 5 or seasons < 0 or repeats < 1:
+            raise ValueError('expected 5 parameters, seasons >= 0 and repeats >= 1')
+        # seeds first, so that a bad seed fails before a job is registered
+        seeds = replicateSeeds(seed, repeats)
+        key = resultKey(params, seasons, repeats, seed)
+        with self.lock:
+            if key in self.jobs:
+                return self.jobs[key]
+            job = ServerJob(key, params, seasons, repeats)
+            trajectory = self.cache.get(key) if self.cache is not None else None
+            if trajectory is not None:
+                job.load(trajectory)
+                return job
+            if not seasons:
+                return job
+            self.jobs[key] = job
+        for k, s in enumerate(seeds):
+            self.pool.apply_async(serverreplicate, ((key, k, params, seasons, s, self.messages),))
+        return job
+
+    def dispatch(self):
+        # route seasons finished by workers to their jobs, caching jobs as they finish
+        while True:
+            message = self.messages.get()
+            if message is None:
+                break
+            key, replicate, season, payload = message
+            job = self.jobs.get(key)
+            if job is None:
+                continue
+            if season is None:
+                job.fail(payload)
+            else:
+                job.report(replicate, season, payload)
+            if job.error is not None or job.done():
+                with self.lock:
+                    if job.error is None and self.cache is not None:
+                        self.cache.put(key, np.array(job.trajectory))
+                    del self.jobs[key]
+
+    def status(self):
+        with self.lock:
+            return {'processes': self.processes,
+                    'running': [{'params': job.params, 'seasons_done': len(job.rows) - 1, 'seasons': job.seasons}
+                                for job in self.jobs.values()]}
+
+    def serve(self):
+        self.dispatcher.start()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        self.messages.put(None)
+        self.pool.terminate()
+        self.pool.join()
+        self.manager.shutdown()
+        self.httpd.server_close()
+
+
+def requestLines(path, body, host='127.0.0.1', port=8765):
+    # client side: post a request to a SimulationServer, yielding each
+    # streamed line as it arrives (reading the response directly, as urllib2
+    # buffers it)
+    connection = HTTPConnection(host, port)
+    connection.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    if response.status != 200:
+        raise RuntimeError('%d %s: %s' % (response.status, response.reason, response.read()))
+    for line in iter(response.fp.readline, b''):
+        yield json.loads(line.decode('utf-8'))
+    connection.close()
@@ -0,0 +1,212 @@
+import random  # for independent, reproducible random streams per replicate
+import functools  # for passing agent options to the season model
+from multiprocessing import Pool  # for running replicates in parallel
+import numpy as np  # for seeding the vectorised foraging and reproduction
+from model.pollination import PollinationSeason
+from model.vectorpollination import VectorPollinationSeason
+from model.agentpollination import AgentPollinationSeason
+from model.reproduction import Reproduction
+from model.onlinestats import OnlineSummary
+from model.absorbing import fixedState
+from model.profiling import Profile
+from model.telemetry import RunCost
+from model.streams import CommonStreams
+from model.consts import *
+
+
+# pollination engines a replicate can run with: PollinationSeason,
+# VectorPollinationSeason, or the vector engine only with at least
+# VECTOR_MIN_BEES bees, below which the per-visit loop is faster
+ENGINES = ['scalar', 'vector', 'auto']
+VECTOR_MIN_BEES = 30
+
+
+def vectorisedEngine(nbees, engine='scalar'):
+    # whether a replicate with nbees bees runs the vectorised engine
+    if engine not in ENGINES:
+        raise ValueError('unknown engine %r, expected one of %s' % (engine, ', '.join(ENGINES)))
+    return engine == 'vector' or (engine == 'auto' and int(nbees) >= VECTOR_MIN_BEES)
+
+
+def replicateSeeds(seed, repeats):
+    # seeds for each replicate drawn from a master generator, so replicate k
+    # of a given master seed is the same however many replicates are run
+    master = random.Random(seed)
+    return [master.getrandbits(32) for i in range(repeats)]
+
+
+def runreplicate(nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty,
+                 seasons=500, seed=None, plantpops=None, vectorised=False, profile=None, trace=None,
+                 agents=None, progress=None, cost=None, crn=False, start_season=1,
+                 seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # run one replicate over a number of seasons from the starting population,
+    # returning the plant population of every season (season 0 included); once
+    # the population reaches a fixed state the remaining seasons are filled in
+    # without being simulated. Phase timings and counters are added to profile
+    # (a Profile) and hourly visitation to trace (an HourlyTrace) if given.
+    # Given agents (a dict of AgentPollinationSeason options, which may be
+    # empty) every bee carries pollen only between its own visits.
+    # progress(season, plant_populations) is called as each season finishes,
+    # and seasons simulated and their visits are added to cost (a RunCost).
+    # With crn, foraging and reproduction draw common random numbers (see
+    # CommonStreams), so runs with the same seed differ only by the parameters.
+    # Seasons are numbered from start_season, so that a run from a population
+    # reached later (starting from season 2, say) is simulated as such. Every
+    # season sows seeds_sown seeds, a share infection_rate of SS plants infected
+    plantpops = dict(STARTING_POPULATION if plantpops is None else plantpops)
+    rng = random.Random(seed)
+    # reproduction draws arrays, from a numpy stream seeded from the replicate's
+    reproduction_rng = np.random.RandomState(rng.getrandbits(32))
+    if agents is not None:
+        season_model = functools.partial(AgentPollinationSeason, **agents)
+        season_rng = np.random.RandomState(seed)
+    elif vectorised:
+        season_model, season_rng = VectorPollinationSeason, np.random.RandomState(seed)
+    else:
+        season_model, season_rng = PollinationSeason, rng
+    streams = CommonStreams(seed) if crn else None
+    run = [plantpops]
+    for j in range(1, seasons + 1):
+        # create pollination season model
+        p = season_model(plant_populations=plantpops,
+                         number_of_bees=int(nbees),
+                         attraction=float(attr_inf),
+                         rng=season_rng,
+                         profile=profile,
+                         trace=trace,
+                         season=start_season + j - 1,
+                         streams=streams)
+        # run pollination season
+        pres = p.runOneSeason()
+        if cost is not None:
+            cost.addSeason(pres[0])
+        if streams is not None:
+            # every season's seed rounding and allocation draw a fixed number
+            # of numbers, so one stream per season keeps both in step
+            streams.reseed(reproduction_rng, 'reproduction', start_season + j - 1)
+        # create reproduction model
+        r = Reproduction(*pres,
+                         infected_penalty=float(inf_penalty),
+                         non_buzz_penalty=float(nb_penalty),
+                         non_buzz_infected_penalty=float(nb_inf_penalty),
+                         seeds_sown=int(seeds_sown),
+                         infection_rate=float(infection_rate),
+                         rng=reproduction_rng,
+                         profile=profile)
+        # run reproduction
+        plantpops = r.generatePlantPop()
+        # save the data
+        run.append(plantpops)
+        if progress is not None:
+            progress(j, plantpops)
+        if fixedState(run[-2], plantpops):
+            run.extend([dict(plantpops) for k in range(j + 1, seasons + 1)])
+            if progress is not None:
+                for k in range(j + 1, seasons + 1):
+                    progress(k, run[k])
+            break
+    return run
+
+
+def replicatejob(job):
+    # unpack a (params, seasons, seed, plantpops, vectorised, agents, profiled,
+    # tracefiles, replicate, crn, seeds_sown, infection_rate) job for a process
+    # pool, returning the run, its Profile (None if not profiled) and its RunCost
+    (params, seasons, seed, plantpops, vectorised, agents, profiled, tracefiles, replicate, crn,
+     seeds_sown, infection_rate) = job
+    profile = Profile() if profiled else None
+    cost = RunCost()
+    trace = tracefiles.open(params, replicate) if tracefiles is not None else None
+    try:
+        run = runreplicate(*params, seasons=seasons, seed=seed, plantpops=plantpops, vectorised=vectorised,
+                           profile=profile, trace=trace, agents=agents, cost=cost, crn=crn,
+                           seeds_sown=seeds_sown, infection_rate=infection_rate)
+    finally:
+        if trace is not None:
+            trace.close()
+    return run, profile, cost
+
+
+def runreplicates(nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty,
+                  seasons=500, repeats=3, seed=None, processes=1, plantpops=None, vectorised=False,
+                  summary=None, keepruns=True, tolerance=None, max_repeats=100, outcomes=None,
+                  profile=None, trace=None, agents=None, cost=None, crn=False,
+                  seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # run repeats of the model over a number of seasons, each repeat starting
+    # from plantpops with its own random stream derived from seed; results are
+    # identical for a given seed whatever the number of processes. Each
+    # finished replicate is added to summary (an OnlineSummary) if given, and
+    # the populations of every replicate by season are returned if keepruns.
+    # Given a tolerance, replicates are added beyond repeats until the SEM of
+    # every (group, season) outcome (by default the final resistant count) is
+    # within it, or max_repeats have run. Phase timings and counters of every
+    # replicate are added to profile (a Profile) if given, and each replicate's
+    # hourly visitation is written to its own file of trace (a TraceFiles).
+    # agents selects per-bee foraging (see runreplicate), and the seasons
+    # simulated and visits of every replicate kept are added to cost (a RunCost).
+    # With crn (which needs a seed) replicate k of every parameter set draws
+    # the same common random numbers, for paired comparisons between sets.
+    # seeds_sown and infection_rate set the sowing of every season (see runreplicate)
+    if crn and seed is None:
+        raise ValueError('common random numbers need a seed')
+    params = [nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty]
+    if tolerance is not None:
+        if summary is None:
+            summary = OnlineSummary(seasons)
+        outcomes = [('resistant', seasons)] if outcomes is None else outcomes
+        total = max(repeats, max_repeats)
+    else:
+        total = repeats
+    jobs = [(params, seasons, s, plantpops, vectorised, agents, profile is not None, trace, k, crn,
+             seeds_sown, infection_rate)
+            for k, s in enumerate(replicateSeeds(seed, total))]
+    pool = Pool(processes) if processes > 1 else None
+    # this holds the data from multiple runs, by season
+    manyruns = [[] for j in range(seasons + 1)] if keepruns else None
+    done = 0
+    while done < total:
+        # the first repeats together, then a replicate for each process at a
+        # time; extra replicates finished past the stopping point are dropped
+        batch = jobs[done:done + (repeats if not done else max(processes, 1))]
+        if pool is not None:
+            runs = pool.imap(replicatejob, batch)
+        else:
+            runs = (replicatejob(job) for job in batch)
+        for run, runprofile, runcost in runs:
+            if profile is not None:
+                profile.merge(runprofile)
+            if cost is not None:
+                cost.merge(runcost)
+            if summary is not None:
+                summary.addRun(run)
+            if keepruns:
+                for j, plant_populations in enumerate(run):
+                    manyruns[j].append(plant_populations)
+            done += 1
+            if tolerance is not None and done >= repeats and summary.converged(outcomes, tolerance):
+                total = done
+                break
+    if pool is not None:
+        pool.close()
+        pool.join()
+    return manyruns
+
+
+def runmodel(nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty,
+             seasons=500, repeats=3, seed=None, processes=1, plantpops=None, vectorised=False,
+             keepruns=False, quantiles=None, tolerance=None, max_repeats=100, outcomes=None,
+             profile=None, trace=None, agents=None, crn=False,
+             seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # run repeats of the model (see runreplicates) returning the summary rows,
+    # with a column for each of the given quantiles (and for the number of
+    # replicates run if adaptive, given a tolerance), and the populations of
+    # every replicate by season if keepruns (otherwise None)
+    params = [nbees, attr_inf, inf_penalty, nb_penalty, nb_inf_penalty]
+    summary = OnlineSummary(seasons, quantiles)
+    manyruns = runreplicates(*params, seasons=seasons, repeats=repeats, seed=seed,
+                             processes=processes, plantpops=plantpops, vectorised=vectorised,
+                             summary=summary, keepruns=keepruns,
+                             tolerance=tolerance, max_repeats=max_repeats, outcomes=outcomes,
+                             profile=profile, trace=trace, agents=agents, crn=crn,
+                             seeds_sown=seeds_sown, infection_rate=infection_rate)
+    return summary.rows(params, counts=tolerance is not None), manyruns
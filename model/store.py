@@ -0,0 +1,220 @@
+import os  # for cache file handling
+import hashlib  # for stable keys of parameter sets
+import json  # for canonical key serialisation
+import pickle  # for storing finished parameter sets
+import tempfile  # for atomic writes
+import numpy as np  # for memory-mapped trajectory arrays
+from model.absorbing import fixationSeasons, fixationColumns
+from model.profiling import PROFILE_FIELDS
+from model.consts import *
+
+
+def resultKey(params, seasons, repeats, seed, crn=False, engine='scalar', adaptive=None,
+              seeds_sown=SEEDS_SOWN, infection_rate=SUSCEPTIBLE_PLANT_INFECTION_RATE):
+    # stable hash of everything that determines the result of a parameter set;
+    # adaptive is the (tolerance, max_repeats, outcomes) of adaptive replicates
+    key = {'params': [repr(float(x)) for x in params],
+           'seasons': int(seasons),
+           'repeats': int(repeats),
+           'seed': seed,
+           'version': MODEL_VERSION,
+           'format': 'trajectory'}
+    if crn:
+        # common random numbers give different results for the same seed
+        key['streams'] = 'common'
+    if engine != 'scalar':
+        # other engines draw different random numbers for the same seed
+        key['engine'] = engine
+    if adaptive is not None:
+        # replicates are added until the outcomes' SEMs are within tolerance
+        tolerance, max_repeats, outcomes = adaptive
+        key['adaptive'] = {'tolerance': repr(float(tolerance)), 'max_repeats': int(max_repeats),
+                           'outcomes': [[name, int(season)] for name, season in outcomes]}
+    if (seeds_sown, infection_rate) != (SEEDS_SOWN, SUSCEPTIBLE_PLANT_INFECTION_RATE):
+        # every season sows a different number of seeds or infects a different share
+        key['sowing'] = {'seeds_sown': int(seeds_sown), 'infection_rate': repr(float(infection_rate))}
+    canonical = json.dumps(key, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """Finished parameter sets stored one file each, so sweeps can resume"""
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        # stored (replicates, seasons + 1, genotypes) trajectory array or None
+        # if the set has not finished
+        try:
+            with open(self.path(key), 'rb') as infile:
+                return pickle.load(infile)
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, result):
+        # write to a temporary file first so a killed sweep never leaves a partial entry
+        handle, tmppath = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as outfile:
+            pickle.dump(result, outfile, 2)
+        os.rename(tmppath, self.path(key))
+
+
+class TrajectoryStore(object):
+    """Plant populations of every parameter set, replicate and season, kept as
+    one memory-mapped (sets, replicates, seasons + 1) .npy file per genotype,
+    with the summary statistics of each set alongside. Sweep workers open the
+    same files and write their own parameter set slots directly. In an
+    adaptive store the replicate axis holds the most replicates a set may
+    run, and the number each set used is kept alongside."""
+    # summary groups and statistics, in the order of the summary array axes
+    GROUPS = [('susceptible', ['SS_i', 'SS_u']), ('resistant', ['RR', 'RS', 'SR'])]
+    STATISTICS = ['mean', 'std', 'sem']
+
+    def __init__(self, directory, mode='r'):
+        self.directory = directory
+        with open(os.path.join(directory, 'store.json')) as infile:
+            meta = json.load(infile)
+        self.seasons = meta['seasons']
+        self.repeats = meta['repeats']
+        self.adaptive = meta.get('adaptive', False)
+        self.params = np.load(os.path.join(directory, 'params.npy'), mmap_mode=mode)
+        self.complete = np.load(os.path.join(directory, 'complete.npy'), mmap_mode=mode)
+        self.genotypes = dict([[x, np.load(os.path.join(directory, x + '.npy'), mmap_mode=mode)]
+                               for x in meta['genotypes']])
+        # (sets, seasons + 1, groups, statistics)
+        self.summaries = np.load(os.path.join(directory, 'summary.npy'), mmap_mode=mode)
+        # (sets, PROFILE_FIELDS) summed profiles of sets run with profiling
+        self.profiles = np.load(os.path.join(directory, 'profile.npy'), mmap_mode=mode)
+        # (sets,) replicates stored of each set (every one, in stores without the file)
+        if os.path.exists(os.path.join(directory, 'replicates.npy')):
+            self.replicates = np.load(os.path.join(directory, 'replicates.npy'), mmap_mode=mode)
+        else:
+            self.replicates = np.full(len(self.params), self.repeats, dtype=np.int32)
+        self.slots = {}
+        for i, p in enumerate(self.params.tolist()):
+            self.slots.setdefault(tuple(p), []).append(i)
+
+    @classmethod
+    def create(cls, directory, paramsets, seasons, repeats, adaptive=False):
+        # allocate an empty store for a sweep, replacing any previous one;
+        # adaptive stores hold up to repeats replicates of each set
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        shape = (len(paramsets), repeats, seasons + 1)
+        for x in PLANTTYPES:
+            np.lib.format.open_memmap(os.path.join(directory, x + '.npy'), mode='w+',
+                                      dtype=np.int32, shape=shape).flush()
+        np.lib.format.open_memmap(os.path.join(directory, 'summary.npy'), mode='w+', dtype=float,
+                                  shape=(len(paramsets), seasons + 1, len(cls.GROUPS),
+                                         len(cls.STATISTICS))).flush()
+        np.lib.format.open_memmap(os.path.join(directory, 'profile.npy'), mode='w+', dtype=float,
+                                  shape=(len(paramsets), len(PROFILE_FIELDS))).flush()
+        np.save(os.path.join(directory, 'params.npy'), np.array(paramsets, dtype=float).reshape(-1, 5))
+        np.save(os.path.join(directory, 'complete.npy'), np.zeros(len(paramsets), dtype=bool))
+        np.save(os.path.join(directory, 'replicates.npy'), np.zeros(len(paramsets), dtype=np.int32))
+        with open(os.path.join(directory, 'store.json'), 'w') as outfile:
+            json.dump({'seasons': seasons, 'repeats': repeats, 'genotypes': PLANTTYPES,
+                       'version': MODEL_VERSION, 'adaptive': adaptive}, outfile)
+        return cls(directory, mode='r+')
+
+    def slot(self, params):
+        # index of a parameter set in the store (the first unfinished one if
+        # the same set appears more than once)
+        slots = self.slots[tuple([float(x) for x in params])]
+        unfinished = [i for i in slots if not self.complete[i]]
+        return unfinished[0] if unfinished else slots[0]
+
+    def write(self, slot, manyruns):
+        # store the runmodel trajectories (seasons of lists of replicate populations)
+        self.writeTrajectory(slot, np.array([[[z[x] for x in PLANTTYPES] for z in counts]
+                                             for counts in manyruns]).transpose(1, 0, 2))
+
+    def writeTrajectory(self, slot, trajectory):
+        # store a (replicates, seasons + 1, genotypes) array and its summary
+        # statistics; an adaptive store takes any number of replicates up to
+        # its repeats, leaving the rest of the slot empty
+        trajectory = np.rint(trajectory).astype(np.int32)
+        n = len(trajectory)
+        if n > self.repeats or (n < self.repeats and not self.adaptive):
+            raise ValueError('%d replicates given, store holds %s%d'
+                             % (n, 'up to ' if self.adaptive else '', self.repeats))
+        for k, x in enumerate(PLANTTYPES):
+            self.genotypes[x][slot, :n] = trajectory[:, :, k]
+            self.genotypes[x][slot, n:] = 0
+        self.replicates[slot] = n
+        for g, (name, members) in enumerate(self.GROUPS):
+            counts = trajectory[:, :, [PLANTTYPES.index(x) for x in members]].sum(axis=2).astype(float)
+            sem = counts.std(axis=0, ddof=1) / np.sqrt(n) if n > 1 else np.nan
+            self.summaries[slot, :, g, 0] = counts.mean(axis=0)
+            self.summaries[slot, :, g, 1] = counts.std(axis=0)
+            self.summaries[slot, :, g, 2] = np.where(np.arange(self.seasons + 1) == 0, 0, sem)
+
+    def finish(self, slot):
+        # mark a slot as holding a complete parameter set
+        self.complete[slot] = True
+
+    def flush(self):
+        for x in PLANTTYPES:
+            self.genotypes[x].flush()
+        self.summaries.flush()
+        self.profiles.flush()
+        self.complete.flush()
+        if isinstance(self.replicates, np.memmap):
+            self.replicates.flush()
+
+    def trajectory(self, slot):
+        # (replicates, seasons + 1, genotypes) populations of one parameter set
+        n = self.replicates[slot]
+        return np.stack([self.genotypes[x][slot, :n] for x in PLANTTYPES], axis=-1)
+
+    def writeProfile(self, slot, profile):
+        self.profiles[slot] = profile.values()
+
+    def profileRows(self, slots=None):
+        # parameters followed by PROFILE_FIELDS for the given (default all
+        # finished) parameter sets; zero for sets not run with profiling
+        if slots is None:
+            slots = np.flatnonzero(self.complete)
+        return [self.params[i].tolist() + self.profiles[i].tolist() for i in slots]
+
+    def fixation(self, slot):
+        # season each replicate of a parameter set fixed, -1 if it did not
+        return fixationSeasons(self.trajectory(slot))
+
+    def pairedDifference(self, a, b, population='resistant', season=None):
+        # mean and standard error over replicates of the difference in a
+        # population group between parameter sets in slots a and b, pairing
+        # replicate k of each (as run with common random numbers) as far as
+        # both sets ran
+        season = self.seasons if season is None else season
+        members = [PLANTTYPES.index(x) for x in dict(self.GROUPS)[population]]
+        n = min(self.replicates[a], self.replicates[b])
+        differences = (self.trajectory(a)[:n, season, members].sum(axis=1)
+                       - self.trajectory(b)[:n, season, members].sum(axis=1)).astype(float)
+        sem = differences.std(ddof=1) / np.sqrt(len(differences)) if len(differences) > 1 else np.nan
+        return differences.mean(), sem
+
+    def summary(self, slots=None):
+        # runmodel summary rows for the given (default all finished) parameter
+        # sets, with the share of replicates fixed and their mean fixation
+        # season, and then the number of replicates if adaptive
+        if slots is None:
+            slots = np.flatnonzero(self.complete)
+        outputdata = []
+        for i in slots:
+            params = self.params[i].tolist()
+            summaries = self.summaries[i].tolist()
+            fixed, fixation = fixationColumns(self.fixation(i), self.seasons)
+            for season in range(self.seasons + 1):
+                for g, (name, members) in enumerate(self.GROUPS):
+                    outputdata.append(params + [season, name] + summaries[season][g] + [fixed[season], fixation] +
+                                      ([int(self.replicates[i])] if self.adaptive else []))
+        return outputdata
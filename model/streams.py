@@ -0,0 +1,49 @@
+import hashlib  # for deriving stream seeds
+import numpy as np  # for per-row streams of batches
+
+
+class CommonStreams(object):
+    """Common random numbers for one replicate: a separate stream for every
+    purpose, season and (for foraging) hour, seeded from the replicate seed
+    alone. Replicate k of every parameter set then uses the same random
+    numbers for the same purpose at the same point of the run, however many
+    draws other purposes, hours or seasons took, so differences between
+    parameter sets are not swamped by independent noise."""
+    __slots__ = ['seed']
+
+    def __init__(self, seed):
+        if seed is None:
+            raise ValueError('common random numbers need a seed')
+        self.seed = seed
+
+    def streamSeed(self, purpose, season, hour=0):
+        # 32 bit seed of one stream
+        name = '%d:%s:%d:%d' % (self.seed, purpose, season, hour)
+        return int(hashlib.sha1(name.encode('utf-8')).hexdigest()[:8], 16)
+
+    def reseed(self, rng, purpose, season, hour=0):
+        # restart a random.Random or numpy RandomState on one stream
+        rng.seed(self.streamSeed(purpose, season, hour))
+
+
+class RowStreams(object):
+    """Independent random streams for the rows of a BatchSimulation, passed
+    as its rng: row i of every draw comes from stream i, and each hour a row
+    draws only its own visits, so a row's random numbers (and so its run) do
+    not depend on which rows share its batch"""
+    __slots__ = ['streams']
+
+    def __init__(self, seeds):
+        self.streams = [np.random.RandomState(s) for s in seeds]
+
+    def random_sample(self, shape):
+        # (rows,) + shape[1:] uniform draws, one row from each stream
+        return np.array([s.random_sample(shape[1:]) for s in self.streams]).reshape(shape)
+
+    def ragged(self, counts):
+        # (rows, max(counts)) uniform draws, counts[i] of them from stream i
+        # and the rest of each row padding
+        draws = np.zeros((len(self.streams), max(counts)))
+        for i, (s, count) in enumerate(zip(self.streams, counts)):
+            draws[i, :count] = s.random_sample(count)
+        return draws
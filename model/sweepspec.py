@@ -0,0 +1,230 @@
+import os  # for telling spec formats apart
+import csv  # for data output
+import json  # for reading sweep specs
+import itertools  # for factorial designs
+import numpy as np  # for parameter ranges and sampled designs
+try:
+    import yaml  # for reading yaml sweep specs (optional)
+except ImportError:
+    yaml = None
+from model.simulation import runmodel, vectorisedEngine
+from model.scheduler import SweepScheduler, SweepWriter
+from model.sensitivity import SENSITIVITY_RANGES, saltelliDesign, indexRows
+from model.store import ResultCache, TrajectoryStore
+from model.telemetry import SweepProgress
+from model.meanfield import screenmeanfield
+from model.consts import *
+
+SUMMARY_HEADERS = PARAMETER_NAMES + ['season', 'population', 'mean', 'std', 'sem', 'fixed', 'fixation_season']
+# designs a spec can ask for
+DESIGNS = ['single', 'list', 'oat', 'factorial', 'sobol', 'lhs']
+# everything a spec can set, and what it is if not set
+SPEC_DEFAULTS = {'design': 'single',
+                 # parameter values held fixed (DEFAULT_PARAMS where not given)
+                 'defaults': {},
+                 # swept parameters: a list of values or {"from", "to", "num"}
+                 # for oat and factorial designs, {"from", "to"} for sampled ones
+                 'ranges': {},
+                 # parameter sets of a list design
+                 'paramsets': [],
+                 # base samples of sobol and lhs designs, and the seed of lhs
+                 'samples': 64,
+                 'design_seed': None,
+                 'seasons': 500,
+                 'repeats': 3,
+                 'seed': None,
+                 # common random numbers across parameter sets (needs a seed)
+                 'crn': False,
+                 # pollination engine: scalar, vector, auto (vector from VECTOR_MIN_BEES
+                 # bees) or batch (every replicate of a chunk of sets in lockstep)
+                 'engine': 'scalar',
+                 # adaptive replicates (see runreplicates): from repeats up to
+                 # max_repeats for every set, until the final resistant SEM is within tolerance
+                 'tolerance': None,
+                 'max_repeats': 100,
+                 # seeds sown every season and the share of SS plants infected
+                 'seeds_sown': SEEDS_SOWN,
+                 'infection_rate': SUSCEPTIBLE_PLANT_INFECTION_RATE,
+                 'output': 'sweep.csv',
+                 'headers': True,
+                 # trajectory store and result cache directories of sweeps
+                 'store': 'allmodeldata',
+                 'cache': 'sweep_cache',
+                 # mean-field screen run before a sweep (see screenSets), if any
+                 'screen': None,
+                 # sweep profile rows, progress log and sobol index files (none if null)
+                 'profile': None,
+                 'progress': None,
+                 'indices': None}
+
+
+def loadSpec(filename):
+    # a sweep spec from a json (or, with PyYAML, yaml) file, with every
+    # setting not given filled in from SPEC_DEFAULTS
+    with open(filename) as infile:
+        if os.path.splitext(filename)[1] in ['.yaml', '.yml']:
+            if yaml is None:
+                raise ImportError('reading yaml sweep specs needs PyYAML')
+            spec = yaml.safe_load(infile)
+        else:
+            spec = json.load(infile)
+    return checkSpec(spec)
+
+
+def checkSpec(spec):
+    unknown = set(spec) - set(SPEC_DEFAULTS)
+    if unknown:
+        raise ValueError('unknown sweep spec settings %s' % ', '.join(sorted(unknown)))
+    full = dict(SPEC_DEFAULTS)
+    full.update(spec)
+    if full['design'] not in DESIGNS:
+        raise ValueError('unknown design %r, expected one of %s' % (full['design'], ', '.join(DESIGNS)))
+    for name in list(full['defaults']) + list(full['ranges']):
+        if name not in PARAMETER_NAMES:
+            raise ValueError('unknown parameter %r' % name)
+    return full
+
+
+def rangeValues(values):
+    # values of a swept parameter: a list as given, or num evenly spaced
+    # values from "from" to "to"
+    if isinstance(values, dict):
+        return np.linspace(values['from'], values['to'], values['num']).tolist()
+    return list(values)
+
+
+def canonicalParams(params):
+    # the parameter set a simulation actually runs: whole bees (runreplicate
+    # takes int(nbees)) and values rounded to 12 significant figures, so
+    # that sets differing only by floating point noise are one set
+    return tuple([float(int(params[0]))] + [float('%.12g' % x) for x in params[1:]])
+
+
+def designRows(spec):
+    # parameter sets of every row of a spec's design, in PARAMETER_NAMES order
+    defaults = dict(DEFAULT_PARAMS)
+    defaults.update(spec['defaults'])
+    base = [defaults[x] for x in PARAMETER_NAMES]
+    design = spec['design']
+    if design == 'single':
+        return [base]
+    if design == 'list':
+        return [[float(x) for x in p] for p in spec['paramsets']]
+    if design == 'oat':
+        # one parameter at a time, the rest at their defaults
+        rows = []
+        for k, name in enumerate(PARAMETER_NAMES):
+            if name in spec['ranges']:
+                for value in rangeValues(spec['ranges'][name]):
+                    rows.append(base[:k] + [value] + base[k + 1:])
+        return rows
+    if design == 'factorial':
+        ranges = [rangeValues(spec['ranges'][x]) if x in spec['ranges'] else [defaults[x]]
+                  for x in PARAMETER_NAMES]
+        return [list(p) for p in itertools.product(*ranges)]
+    # sampled designs cover every parameter, over SENSITIVITY_RANGES unless given
+    ranges = [(name, spec['ranges'][name]['from'], spec['ranges'][name]['to']) if name in spec['ranges']
+              else (name, low, high) for name, low, high in SENSITIVITY_RANGES]
+    rng = np.random.RandomState(spec['design_seed']) if design == 'lhs' else None
+    return saltelliDesign(spec['samples'], ranges, method=design, rng=rng).tolist()
+
+
+def uniqueSets(rows):
+    # the distinct canonical parameter sets of design rows, in order of first
+    # appearance, and the index of each row's set among them
+    paramsets = []
+    index = {}
+    slots = []
+    for params in rows:
+        key = canonicalParams(params)
+        if key not in index:
+            index[key] = len(paramsets)
+            paramsets.append(list(key))
+        slots.append(index[key])
+    return paramsets, slots
+
+
+def screenSets(spec, rows, paramsets, slots, processes=1):
+    # run the deterministic mean-field model for every distinct parameter set
+    # and keep only the sets worth simulating: those whose expected mean of
+    # the screen's population ("resistant" or "susceptible") at its season
+    # (by default the last) lies between its min and max (either may be
+    # left out), or none if the screen is "only" (screening alone).
+    # Mean-field rows of every design row are written to the screen's output
+    # if it has one. Returns the design rows, distinct sets and slots kept
+    screen = spec['screen']
+    season = spec['seasons'] if screen.get('season') is None else screen['season']
+    population = screen.get('population', 'resistant')
+    low = screen.get('min', -np.inf)
+    high = screen.get('max', np.inf)
+    results = screenmeanfield(paramsets, spec['seasons'], processes, spec['seeds_sown'], spec['infection_rate'])
+    if screen.get('output') is not None:
+        with open(screen['output'], 'wb') as outfile:
+            outcsv = csv.writer(outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            if spec['headers']:
+                outcsv.writerow(SUMMARY_HEADERS)
+            for params, slot in zip(rows, slots):
+                for x in results[slot]:
+                    outcsv.writerow(list(params) + x[len(PARAMETER_NAMES):])
+    expected = [[x[7] for x in result if x[5] == season and x[6] == population][0] for result in results]
+    keep = [not screen.get('only', False) and low <= x <= high for x in expected]
+    rows = [params for params, slot in zip(rows, slots) if keep[slot]]
+    return (rows,) + uniqueSets(rows)
+
+
+def runSpec(spec, processes=1):
+    # run every design row of a spec, each distinct parameter set once, and
+    # write summary rows for every design row; returns the number of design
+    # rows, of distinct parameter sets and of those run (or copied from the
+    # cache) once screened
+    rows = designRows(spec)
+    paramsets, slots = uniqueSets(rows)
+    counts = (len(rows), len(paramsets))
+    if spec['screen'] is not None:
+        if spec['indices'] is not None and ('min' in spec['screen'] or 'max' in spec['screen']):
+            raise ValueError('sobol indices need every design row, so the screen cannot prune them')
+        rows, paramsets, slots = screenSets(spec, rows, paramsets, slots, processes)
+        if not paramsets:
+            return counts + (0,)
+    if spec['design'] == 'single' and spec['engine'] != 'batch':
+        # replicates run in parallel rather than parameter sets (batches
+        # run through the scheduler like any sweep)
+        outputdata, manyruns = runmodel(*paramsets[0], seasons=spec['seasons'], repeats=spec['repeats'],
+                                        seed=spec['seed'], processes=processes, tolerance=spec['tolerance'],
+                                        max_repeats=spec['max_repeats'], seeds_sown=spec['seeds_sown'],
+                                        infection_rate=spec['infection_rate'],
+                                        crn=spec['crn'], vectorised=vectorisedEngine(paramsets[0][0], spec['engine']))
+        with open(spec['output'], 'wb') as outfile:
+            outcsv = csv.writer(outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            if spec['headers']:
+                outcsv.writerow(SUMMARY_HEADERS + (['replicates'] if spec['tolerance'] is not None else []))
+            for x in outputdata:
+                outcsv.writerow(rows[0] + x[len(PARAMETER_NAMES):])
+        return counts + (1,)
+    # every design row using each distinct set
+    design = [[] for p in paramsets]
+    for params, slot in zip(rows, slots):
+        design[slot].append(params)
+    adaptive = spec['tolerance'] is not None
+    headers = SUMMARY_HEADERS + (['replicates'] if adaptive else [])
+    store = TrajectoryStore.create(spec['store'], paramsets, seasons=spec['seasons'], adaptive=adaptive,
+                                   repeats=max(spec['repeats'], spec['max_repeats']) if adaptive else spec['repeats'])
+    with SweepWriter(spec['output'], store, headers=headers if spec['headers'] else None,
+                     profilename=spec['profile'], design=design) as writer, \
+            SweepProgress(spec['progress']) as progress:
+        scheduler = SweepScheduler(processes, seasons=spec['seasons'], repeats=spec['repeats'], seed=spec['seed'],
+                                   profile=spec['profile'] is not None, crn=spec['crn'],
+                                   engine=spec['engine'], tolerance=spec['tolerance'],
+                                   max_repeats=spec['max_repeats'], seeds_sown=spec['seeds_sown'],
+                                   infection_rate=spec['infection_rate'])
+        scheduler.run(store, writer.write, cache=ResultCache(spec['cache']), progress=progress)
+    if spec['indices'] is not None:
+        if spec['design'] not in ['sobol', 'lhs']:
+            raise ValueError('sobol indices need a sobol or lhs design')
+        # sobol indices of the final season populations, from the design rows in order
+        with open(spec['indices'], 'wb') as outfile:
+            outcsv = csv.writer(outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            outcsv.writerow(['population', 'parameter', 'first_order', 'total'])
+            for x in indexRows(store, slots=slots):
+                outcsv.writerow(x)
+    return counts + (len(paramsets),)
@@ -0,0 +1,115 @@
+import sys  # for progress lines
+import csv  # for the progress log
+import time  # for wall clock timestamps comparable across processes
+from model.consts import *
+
+# columns of the progress log: one row per parameter set finished, with the
+# sweep totals up to it
+PROGRESS_COLUMNS = (['time', 'event', 'pid', 'slot'] + PARAMETER_NAMES +
+                    ['seconds', 'seasons', 'visits', 'done', 'total', 'processes',
+                     'sets_per_min', 'visits_per_sec_per_core', 'utilisation', 'eta_seconds'])
+
+
+class RunCost(object):
+    """Seasons simulated (not filled in after fixation) and flower visits of
+    one or more replicates"""
+    __slots__ = ['seasons', 'visits']
+
+    def __init__(self):
+        self.seasons = 0
+        self.visits = 0
+
+    def addSeason(self, visitation):
+        # a season simulated, given its visits by genotype
+        self.seasons += 1
+        self.visits += sum(visitation.values())
+
+    def merge(self, other):
+        self.seasons += other.seasons
+        self.visits += other.visits
+
+
+def formatSeconds(seconds):
+    seconds = int(round(seconds))
+    return '%d:%02d:%02d' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class SweepProgress(object):
+    """Progress of a sweep as parameter sets finish: sets done, throughput,
+    worker utilisation and the time left (from the estimated cost of the sets
+    still to run), printed every few seconds and logged to a csv of
+    PROGRESS_COLUMNS if a logname is given"""
+    def __init__(self, logname=None, every=10.0, out=sys.stdout):
+        self.every = every
+        self.out = out
+        self.logfile = None
+        if logname is not None:
+            self.logfile = open(logname, 'wb')
+            self.logcsv = csv.writer(self.logfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            self.logcsv.writerow(PROGRESS_COLUMNS)
+
+    def start(self, total, processes, costs):
+        # a sweep of total sets over processes, of which the sets with
+        # estimated costs (by slot) are to be run rather than copied from a cache
+        self.total = total
+        self.processes = processes
+        self.costs = costs
+        self.remaining = float(sum(costs.values()))
+        self.costdone = 0.0
+        self.done = total - len(costs)
+        self.run = 0
+        self.visits = 0
+        self.busy = 0.0
+        self.began = time.time()
+        self.printed = self.began
+        if self.done:
+            self.log('cached', [None] * 10)
+
+    def elapsed(self):
+        return max(time.time() - self.began, 1e-9)
+
+    def rates(self):
+        # sets per minute, visits per second per process, share of process
+        # time spent running sets, and seconds left
+        elapsed = self.elapsed()
+        eta = elapsed * self.remaining / self.costdone if self.costdone else None
+        return [self.run * 60.0 / elapsed, self.visits / (elapsed * self.processes),
+                min(self.busy / (elapsed * self.processes), 1.0), eta]
+
+    def finished(self, pid, slot, params, started, ended, seasons, visits):
+        # a set run by process pid between the started and ended timestamps
+        self.done += 1
+        self.run += 1
+        self.visits += visits
+        self.busy += ended - started
+        cost = self.costs.get(slot, 0)
+        self.costdone += cost
+        self.remaining -= cost
+        self.log('finished', [pid, slot] + list(params) + [ended - started, seasons, visits])
+        if time.time() - self.printed >= self.every:
+            self.report()
+
+    def log(self, event, fields):
+        if self.logfile is not None:
+            self.logcsv.writerow([time.time(), event] + fields + [self.done, self.total, self.processes]
+                                 + self.rates())
+
+    def report(self):
+        sets_per_min, visits_per_sec, utilisation, eta = self.rates()
+        self.printed = time.time()
+        self.out.write('%d/%d sets (%.0f%%), %.1f sets/min, %.3g visits/s per core, %.0f%% busy, '
+                       'elapsed %s, eta %s\n'
+                       % (self.done, self.total, 100.0 * self.done / max(self.total, 1), sets_per_min,
+                          visits_per_sec, 100 * utilisation, formatSeconds(self.elapsed()),
+                          '-' if eta is None else formatSeconds(eta)))
+        self.out.flush()
+
+    def close(self):
+        if self.logfile is not None:
+            self.logfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,102 @@
+import os  # for creating trace directories
+import csv  # for csv traces
+import threading  # for writing traces off the simulation thread
+try:
+    import Queue as queue  # for handing batches to the writer thread
+except ImportError:
+    import queue
+import numpy as np  # for binary traces
+from model.consts import *
+
+# columns of every trace record (visits by genotype in PLANTTYPES order)
+TRACE_COLUMNS = ['season', 'hour'] + PLANTTYPES
+# per-run trace file names, formatted with the parameters and replicate number
+TRACE_PATTERN = 'traces/{nbees:g}_{attr_inf:g}_{inf_penalty:g}_{nb_penalty:g}_{nb_inf_penalty:g}_{replicate}.trace'
+
+
+def readTrace(filename):
+    # (records, TRACE_COLUMNS) array of a binary trace
+    return np.fromfile(filename, dtype=np.int32).reshape(-1, len(TRACE_COLUMNS))
+
+
+class HourlyTrace(object):
+    """Hourly visitation of one run, sampled every kth hour of every kth
+    season and handed in batches to a background thread that writes them as
+    csv or as raw int32 records of TRACE_COLUMNS (see readTrace)"""
+    def __init__(self, filename, every=1, season_every=1, binary=False, batch=4096):
+        self.filename = filename
+        self.every = every
+        self.season_every = season_every
+        self.binary = binary
+        self.batch = batch
+        self.buffer = []
+        self.error = None
+        directory = os.path.dirname(filename)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # bounded, so the simulation waits rather than buffering without limit
+        # if the disk cannot keep up
+        self.batches = queue.Queue(maxsize=8)
+        self.writer = threading.Thread(target=self.writeBatches)
+        self.writer.daemon = True
+        self.writer.start()
+
+    def record(self, season, hour, visitation):
+        # add an hour's visits by genotype (hours count from 1)
+        if season % self.season_every or (hour - 1) % self.every:
+            return
+        self.buffer.append([season, hour] + list(visitation))
+        if len(self.buffer) >= self.batch:
+            self.batches.put(self.buffer)
+            self.buffer = []
+
+    def writeBatches(self):
+        try:
+            with open(self.filename, 'wb') as outfile:
+                if not self.binary:
+                    outcsv = csv.writer(outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+                    outcsv.writerow(TRACE_COLUMNS)
+                while True:
+                    records = self.batches.get()
+                    if records is None:
+                        break
+                    if self.binary:
+                        np.array(records, dtype=np.int32).tofile(outfile)
+                    else:
+                        outcsv.writerows(records)
+        except Exception as e:
+            self.error = e
+            # keep taking batches so the simulation is never blocked
+            while self.batches.get() is not None:
+                pass
+
+    def close(self):
+        # write out what is left and wait for the writer to finish
+        if self.buffer:
+            self.batches.put(self.buffer)
+            self.buffer = []
+        self.batches.put(None)
+        self.writer.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceFiles(object):
+    """Opens an HourlyTrace for each run, named from a pattern (TRACE_PATTERN
+    fields) so that runs in a sweep and across processes never share a file"""
+    def __init__(self, pattern=TRACE_PATTERN, every=1, season_every=1, binary=True):
+        self.pattern = pattern
+        self.every = every
+        self.season_every = season_every
+        self.binary = binary
+
+    def open(self, params, replicate):
+        fields = dict(zip(PARAMETER_NAMES, [float(x) for x in params]))
+        return HourlyTrace(self.pattern.format(replicate=replicate, **fields),
+                           every=self.every, season_every=self.season_every, binary=self.binary)
@@ -0,0 +1,56 @@
+import numpy as np  # for drawing a whole hour of foraging choices at once
+from model.pollination import PollinationSeason, LANDING_ORDER
+
+
+class VectorPollinationSeason(PollinationSeason):
+    # Pollination season drawing each hour's foraging choices as one array,
+    # statistically identical to PollinationSeason but without the per-visit loop.
+    # The array calls cost more per hour than a few visits in the loop, so it
+    # only pays off with many bees: it is slower than PollinationSeason with
+    # up to about 20 bees and several times faster above 60 (see
+    # VECTOR_MIN_BEES in model.simulation)
+    __slots__ = []
+
+    def __init__(self, plant_populations, rng=None, **kwargs):
+        # numpy RandomState (or the numpy.random module) to draw choices from
+        PollinationSeason.__init__(self, plant_populations, rng=np.random if rng is None else rng, **kwargs)
+
+    def runOneHour(self):
+        # run one iteration of the model, returning False once no visits are possible
+        profile = self.profile
+        # release the bees!
+        num_visits = self.visit_rate * self.number_of_bees
+        if not num_visits:
+            # no flowers left to visit this season
+            if profile is not None:
+                profile.countHour(0, 0)
+            return False
+        if profile is not None:
+            start = profile.clock()
+        # same ladder as foragingChoice: index of the first threshold above the draw
+        draws = self.rng.random_sample(num_visits)
+        choices = np.take(LANDING_ORDER, np.searchsorted(self.thresholds, draws, side='right'))
+        # choices of genotypes with no flowers left are null and carry no pollen
+        available = np.array(self.flowers) > 0
+        choices = choices[available[choices]]
+        if profile is not None:
+            start = profile.time('foraging', start)
+        visitation = np.bincount(choices, minlength=len(self.flowers)).tolist()
+        self.storeCrosses(choices)
+        if profile is not None:
+            start = profile.time('crosses', start)
+        self.updateSeasonalVisitation(visitation)
+        self.killFlowers(visitation)
+        if profile is not None:
+            profile.time('killing', start)
+            profile.countHour(num_visits, len(choices))
+        return True
+
+    def storeCrosses(self, choices):
+        # update cross counts for every consecutive pair of non-null choices
+        if len(choices) < 2:
+            return
+        n = len(self.flowers)
+        pairs = np.bincount(choices[:-1] * n + choices[1:], minlength=n * n)
+        for i in np.flatnonzero(pairs):
+            self.crosses[i // n][i % n] += int(pairs[i])
@@ -0,0 +1,29 @@
+#!/usr/bin/python
+# time the simulation hot paths over bee counts, population sizes and seasons
+# usage: runbenchmark.py [output] [baseline] [threshold]
+# example: runbenchmark.py benchmark.json benchmark_baseline.json 0.2
+# results are written to output as json; given a baseline written the same
+# way, benchmarks more than threshold slower are reported and the exit
+# status is 1
+
+import sys  # for taking file names as command line args and exit status
+from model.benchmark import runBenchmarks, writeResults, readResults, compareResults
+
+
+if __name__ == '__main__':
+    output = sys.argv[1] if len(sys.argv) > 1 else 'benchmark.json'
+    baseline = sys.argv[2] if len(sys.argv) > 2 else None
+    threshold = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    results = runBenchmarks()
+    for name in sorted(results):
+        rates = ', '.join(['%s %.1f' % (k, v) for k, v in sorted(results[name].items())
+                           if k.endswith('_per_second') or k.endswith('_per_hour')])
+        print "%-40s %8.4fs  %s" % (name, results[name]['seconds'], rates)
+    writeResults(results, output)
+    if baseline is not None:
+        regressions = compareResults(results, readResults(baseline), threshold)
+        for name, before, after in regressions:
+            print "REGRESSION %s: %.4fs -> %.4fs" % (name, before, after)
+        if regressions:
+            sys.exit(1)
+        print "no regressions against " + baseline
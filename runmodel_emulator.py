@@ -0,0 +1,43 @@
+#!/usr/bin/python
+# fit a gaussian process emulator to a finished sweep's trajectory store,
+# suggest where to simulate next and optionally predict a parameter set
+# usage: runmodel_emulator.py storedir [npoints] [nbees attr_inf inf_penalty nb_penalty nb_inf_penalty]
+# example: runmodel_emulator.py allmodeldata 20 37 0.8 0.42 0.5 0.2
+# the npoints parameter sets where the emulator is least certain are
+# written to emulator_next.json, a sweep spec for runsweep.py; predictions
+# (mean and sd of every season) are written to emulator_prediction.csv
+
+import csv  # for data output
+import json  # for the next sweep spec
+import sys  # for taking the store and parameters as command line args
+import numpy as np  # for cross-validation errors
+from model.emulator import GaussianProcessEmulator
+from model.store import TrajectoryStore
+from model.consts import *
+
+
+if __name__ == '__main__':
+    store = TrajectoryStore(sys.argv[1])
+    npoints = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    query = [float(x) for x in sys.argv[3:8]]
+
+    print "fitting emulator to %d parameter sets" % store.complete.sum()
+    emulator = GaussianProcessEmulator.fromStore(store).fit()
+    mean, sd = emulator.crossValidation()
+    actual = store.summaries[np.flatnonzero(store.complete), :, :, 0]
+    for g, (name, members) in enumerate(store.GROUPS):
+        rmse = np.sqrt(((mean - actual)[:, -1, g] ** 2).mean())
+        print "leave-one-out rmse of final %s population: %f" % (name, rmse)
+
+    with open('emulator_next.json', 'w') as outfile:
+        json.dump({'design': 'list', 'paramsets': emulator.suggest(npoints).tolist(),
+                   'seasons': store.seasons, 'repeats': store.repeats,
+                   'output': 'emulator_next.csv', 'store': 'allmodeldata_emulator'}, outfile, indent=4)
+
+    if query:
+        with open('emulator_prediction.csv', 'wb') as outfile:
+            outcsv = csv.writer(outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            outcsv.writerow(PARAMETER_NAMES + ['season', 'population', 'mean', 'sd'])
+            for x in emulator.rows([query]):
+                outcsv.writerow(x)
+    print "done!"
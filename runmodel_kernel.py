@@ -0,0 +1,24 @@
+#!/usr/bin/python
+# project the CMV model with the default parameters from a season transition
+# kernel, estimated once and kept in cachedir
+# usage: runmodel_kernel.py [nprocesses] [cachedir]
+# example: runmodel_kernel.py 3 kernel_cache
+
+import csv  # for data output
+import sys  # for taking number of processes and cache directory as command line args
+from model.kernel import SeasonKernel
+from model.store import ResultCache
+from model.consts import *
+
+
+if __name__ == '__main__':
+    params = [DEFAULT_PARAMS[x] for x in PARAMETER_NAMES]
+    nprocesses = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    cachedir = sys.argv[2] if len(sys.argv) > 2 else 'kernel_cache'
+    kernel = SeasonKernel(params, seed=0).build(processes=nprocesses, cache=ResultCache(cachedir))
+    distributions = kernel.project(seasons=500)
+    print "probability fixed by season 500: %f" % kernel.fixation(distributions)[-1]
+    with open('default_500_seasons_kernel.csv', 'wb') as outfile:
+        outcsv = csv.writer(outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        for x in kernel.rows(seasons=500):
+            outcsv.writerow(x)
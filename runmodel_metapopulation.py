@@ -0,0 +1,32 @@
+#!/usr/bin/python
+# run CMV model over several greenhouses sharing seed stock and pollinators,
+# with the default parameters in every house
+# usage: runmodel_metapopulation.py [nprocesses] [seed]
+# example: runmodel_metapopulation.py 4 42
+
+import csv  # for data output
+import sys  # for taking number of processes and seed as command line args
+from model.metapopulation import Greenhouse, Metapopulation
+
+
+if __name__ == '__main__':
+    nprocesses = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    # two default houses, a larger house with more bees and a house starting
+    # fully susceptible
+    houses = [Greenhouse(),
+              Greenhouse(),
+              Greenhouse(size=2000, number_of_bees=20, seeds_sown=2000,
+                         plant_populations={'RR': 1000, 'RS': 0, 'SR': 0, 'SS_i': 500, 'SS_u': 500}),
+              Greenhouse(plant_populations={'RR': 0, 'RS': 0, 'SR': 0, 'SS_i': 500, 'SS_u': 500})]
+    m = Metapopulation(houses, seed_exchange=0.1, pollen_exchange=0.01, bee_exchange=0.1,
+                       seed=seed, processes=nprocesses)
+    run = m.run(seasons=500)
+    with open('metapopulation_500_seasons.csv', 'wb') as outfile:
+        outcsv = csv.writer(outfile, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        outcsv.writerow(['house', 'season', 'population', 'count'])
+        for season, houses in enumerate(run):
+            for house, counts in enumerate(houses):
+                # aggregate susceptible and resistant
+                outcsv.writerow([house, season, 'susceptible', counts['SS_i'] + counts['SS_u']])
+                outcsv.writerow([house, season, 'resistant', counts['RR'] + counts['RS'] + counts['SR']])
@@ -0,0 +1,29 @@
+#!/usr/bin/python
+# run CMV model over a space-filling design of the parameters marked *** in
+# consts and estimate their first order and total Sobol indices
+# (sweeps/sensitivity.json)
+# usage: runmodel_sensitivity.py nprocesses [samples] [sobol|lhs] [cachedir]
+# example: runmodel_sensitivity.py 10 64 sobol sweep_cache
+# samples base points give samples * 7 design rows; finished parameter
+# sets are kept in cachedir and full trajectories are written to the
+# allmodeldata_sensitivity/ trajectory store
+
+import os  # for finding the sweep spec
+import sys  # for taking number of processes and design as command line args
+from model.sweepspec import loadSpec, runSpec
+
+
+if __name__ == '__main__':
+    nprocesses = int(sys.argv[1])  # number of processes to use
+    spec = loadSpec(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sweeps', 'sensitivity.json'))
+    if len(sys.argv) > 2:
+        spec['samples'] = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        spec['design'] = sys.argv[3]
+    spec['cache'] = sys.argv[4] if len(sys.argv) > 4 else 'sweep_cache'
+    print str(nprocesses)
+
+    print "generating %s design" % spec['design']
+    print "running..."
+    runSpec(spec, nprocesses)
+    print "done!"
@@ -0,0 +1,22 @@
+#!/usr/bin/python
+# serve CMV model runs and sweeps over http on localhost from a warm pool
+# usage: runserver.py [nprocesses] [port] [cachedir]
+# example: runserver.py 10 8765 sweep_cache
+# POST /run {"params": [10, 0.81, 0.36, 0.74, 0.09], "seasons": 500, "repeats": 3, "seed": 42}
+# streams one json line of summary rows per season as it finishes; POST
+# /sweep {"paramsets": [[...], ...], ...} streams one line per finished
+# parameter set; GET /status lists the sets running. Finished sets are kept
+# in cachedir (shared with the sweep scripts) and served from there
+
+import sys  # for taking number of processes, port and cache directory as command line args
+from model.server import SimulationServer
+from model.store import ResultCache
+
+
+if __name__ == '__main__':
+    nprocesses = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    cachedir = sys.argv[3] if len(sys.argv) > 3 else 'sweep_cache'
+    server = SimulationServer(nprocesses, cache=ResultCache(cachedir), port=port)
+    print "serving on port %d" % port
+    server.serve()
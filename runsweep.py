@@ -0,0 +1,21 @@
+#!/usr/bin/python
+# run CMV model over the design of a sweep spec (see model/sweepspec.py)
+# usage: runsweep.py spec [nprocesses]
+# example: runsweep.py sweeps/single_variate.json 10
+# specs in sweeps/ reproduce the runmodel*.py scripts; every distinct
+# parameter set of a design is run once and its results written for every
+# design row that uses it; a spec's "screen" runs the mean-field model over
+# the design first, to write its expected trajectories or prune the sets run
+
+import sys  # for taking the spec and number of processes as command line args
+from model.sweepspec import loadSpec, runSpec
+
+
+if __name__ == '__main__':
+    spec = loadSpec(sys.argv[1])
+    nprocesses = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    print str(nprocesses)
+    print "running..."
+    rows, paramsets, run = runSpec(spec, nprocesses)
+    print "%d design rows, %d distinct parameter sets, %d run" % (rows, paramsets, run)
+    print "done!"
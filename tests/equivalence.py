@@ -0,0 +1,33 @@
+import numpy as np  # for replicate statistics
+from model.simulation import runreplicates
+from model.consts import *
+
+# genotype indices of the resistant plants
+RESISTANT = [PLANTTYPES.index(x) for x in ['RR', 'RS', 'SR']]
+
+
+# resistant means and sample standard deviations of seasons 1 to 5 over 200
+# replicates of the original (baseline) model with the default parameters
+BASELINE_RESISTANT = [(671.225, 1.145), (724.115, 1.028), (742.905, 0.959), (754.17, 1.038), (763.19, 1.184)]
+BASELINE_REPLICATES = 200
+
+
+def resistantCounts(manyruns):
+    # (repeats, seasons + 1) resistant counts of runreplicates populations
+    return np.array([[sum([p[x] for x in ['RR', 'RS', 'SR']]) for p in season] for season in manyruns]).T
+
+
+def scalarResistant(params, seasons, repeats, seed):
+    # (repeats, seasons + 1) resistant counts of the reference scalar model
+    return resistantCounts(runreplicates(*params, seasons=seasons, repeats=repeats, seed=seed))
+
+
+def assertSameMean(test, a, b, z=4.0):
+    # the means of two samples of replicate outcomes agree within z standard
+    # errors of their difference (plus half a plant, for near-deterministic outcomes)
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    se = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    test.assertLessEqual(abs(a.mean() - b.mean()), z * se + 0.5,
+                         'means %f and %f differ by more than %g standard errors (%f)'
+                         % (a.mean(), b.mean(), z, se))
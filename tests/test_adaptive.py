@@ -0,0 +1,39 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.scheduler import SweepScheduler
+from model.simulation import runmodel
+from model.store import TrajectoryStore
+
+
+class AdaptiveSweepTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_keeps_replicates_used(self):
+        store = TrajectoryStore.create(self.directory, [[10, 0.81, 0.36, 0.74, 0.09]] * 2,
+                                       seasons=2, repeats=4, adaptive=True)
+        store.writeTrajectory(0, np.ones((2, 3, 5)))
+        store.writeTrajectory(1, np.arange(60).reshape(4, 3, 5))
+        self.assertEqual(store.trajectory(0).shape, (2, 3, 5))
+        self.assertEqual(list(store.replicates), [2, 4])
+        self.assertEqual(store.pairedDifference(1, 0)[0], np.mean([45 * k + 33 - 3 for k in range(2)]))
+
+    def test_sweep_matches_adaptive_runmodel(self):
+        params = [[1, 0.81, 0.36, 0.74, 0.09], [10, 0.81, 0.36, 0.74, 0.09]]
+        store = TrajectoryStore.create(self.directory, params, seasons=3, repeats=8, adaptive=True)
+        SweepScheduler(1, seasons=3, repeats=3, seed=3, tolerance=0.3, max_repeats=8).run(store)
+        rows = store.summary()
+        for p in params:
+            expected = runmodel(*p, seasons=3, repeats=3, seed=3, tolerance=0.3, max_repeats=8)[0]
+            actual = [x for x in rows if x[:5] == p]
+            self.assertEqual([x[-1] for x in actual], [x[-1] for x in expected])
+            np.testing.assert_allclose([x[7:10] for x in actual], [x[7:10] for x in expected])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import bisect
+import copy
+import unittest
+import numpy as np
+from model.agentpollination import AgentPollinationSeason
+from model.pollination import LANDING_ORDER
+from model.consts import *
+
+
+def loopHour(season, draws):
+    # one hour of per-bee foraging as an explicit loop over bees and their
+    # visits: (visitation, crosses, last, previous) after the hour
+    visitation = [0] * len(PLANTTYPES)
+    crosses = copy.deepcopy(season.crosses)
+    last = season.last.tolist()
+    previous = season.previous.tolist()
+    for bee in range(season.number_of_bees):
+        for draw in draws[bee]:
+            choice = LANDING_ORDER[bisect.bisect_right(season.thresholds, draw)]
+            if season.flowers[choice] <= 0:
+                continue
+            visitation[choice] += 1
+            if last[bee] >= 0:
+                crosses[last[bee]][choice] += 1
+            previous[bee], last[bee] = last[bee], choice
+    return visitation, crosses, last, previous
+
+
+class AgentPollinationTest(unittest.TestCase):
+    def test_matches_per_bee_loop(self):
+        populations = {'RR': 20, 'RS': 30, 'SR': 10, 'SS_i': 300, 'SS_u': 640}
+        season = AgentPollinationSeason(populations, number_of_bees=7, rng=np.random.RandomState(4), season=2)
+        for hour in range(40):
+            draws = copy.deepcopy(season.rng).random_sample((season.number_of_bees, season.visit_rate))
+            visits = list(season.visits)
+            expected = loopHour(season, draws)
+            self.assertTrue(season.runOneHour())
+            self.assertEqual([a - b for a, b in zip(season.visits, visits)], expected[0])
+            self.assertEqual(season.crosses, expected[1])
+            self.assertEqual(season.last.tolist(), expected[2])
+            self.assertEqual(season.previous.tolist(), expected[3])
+
+    def test_constancy_keeps_flowers(self):
+        # bees staying on a genotype take no more flowers than it has left
+        for constancy, carryover in [(0.5, 0), (0.95, 0.3)]:
+            season = AgentPollinationSeason(STARTING_POPULATION, number_of_bees=100, constancy=constancy,
+                                            carryover=carryover, rng=np.random.RandomState(0), season=2)
+            while season.runOneHour():
+                self.assertGreaterEqual(min(season.flowers), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
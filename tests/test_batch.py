@@ -0,0 +1,58 @@
+import itertools
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.batch import BatchSimulation, batchTrajectory
+from model.pollination import PollinationSeason
+from model.scheduler import SweepScheduler
+from model.store import TrajectoryStore
+from model.streams import RowStreams
+from model.consts import *
+from tests.equivalence import RESISTANT, scalarResistant, assertSameMean
+
+
+class BatchSimulationTest(unittest.TestCase):
+    def test_visit_rate_matches_scalar_model(self):
+        # the visit rate follows the flower density of PollinationSeason, in
+        # a first season and after it
+        for plants, season in itertools.product([1000, 1010, 1024, 997, 351, 260, 522, 623, 715], [1, 2]):
+            pops = dict(STARTING_POPULATION)
+            pops['RR'] = plants - pops['SS_i'] - pops['SS_u']
+            batch = BatchSimulation([[pops[x] for x in PLANTTYPES]], number_of_bees=1, rng=np.random.RandomState(0))
+            batch.season = season - 1
+            batch.flower_populations = batch.plant_populations * STARTING_FLOWERS
+            batch.seasonal_visitation = np.zeros_like(batch.flower_populations)
+            batch.cross_list = np.zeros((1, 5, 5), dtype=np.int64)
+            batch.runOneHour()
+            self.assertEqual(batch.visits[0], PollinationSeason(pops, number_of_bees=1, season=season).visit_rate)
+
+    def test_same_distribution_as_scalar_model(self):
+        params = [101, 0.81, 0.36, 0.74, 0.09]
+        trajectory, visits = batchTrajectory([params], seasons=8, repeats=20, rng=np.random.RandomState(1))
+        assertSameMean(self, trajectory[8, 0][:, RESISTANT].sum(axis=1), scalarResistant(params, 8, 20, 1)[:, 8])
+
+    def test_rows_independent_of_batch(self):
+        # a set run alone or batched with others has the same trajectory
+        params = [[30, 0.81, 0.36, 0.74, 0.09], [5, 0.5, 0.2, 0.7, 0.1]]
+        alone, visits = batchTrajectory(params[:1], seasons=3, repeats=2, rng=RowStreams([1, 2]))
+        batched, visits = batchTrajectory(params, seasons=3, repeats=2, rng=RowStreams([1, 2, 3, 4]))
+        self.assertTrue((alone[:, 0] == batched[:, 0]).all())
+
+    def test_sweep_independent_of_processes(self):
+        params = [[n, 0.81, 0.36, 0.74, 0.09] for n in [1, 10, 30, 60]]
+        trajectories = []
+        for processes, chunks_per_process in [(1, 1), (3, 4)]:
+            directory = tempfile.mkdtemp()
+            try:
+                store = TrajectoryStore.create(directory, params, seasons=2, repeats=2)
+                SweepScheduler(processes, seasons=2, repeats=2, seed=5, engine='batch',
+                               chunks_per_process=chunks_per_process).run(store)
+                trajectories.append([store.trajectory(slot).tolist() for slot in range(len(params))])
+            finally:
+                shutil.rmtree(directory)
+        self.assertEqual(trajectories[0], trajectories[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.consts import *
+from model.scheduler import SweepScheduler
+from model.simulation import runreplicates
+from model.store import TrajectoryStore
+from model.streams import CommonStreams
+
+# neighbouring attractions, as compared in sensitivity sweeps
+PARAMS = [[10, 0.75, 0.36, 0.74, 0.09], [10, 0.8, 0.36, 0.74, 0.09]]
+REPEATS = 30
+
+
+def resistant(manyruns, season):
+    return np.array([sum([pops[x] for x in ['RR', 'RS', 'SR']]) for pops in manyruns[season]], dtype=float)
+
+
+class CommonRandomNumbersTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_streams(self):
+        streams = CommonStreams(5)
+        seeds = [streams.streamSeed('foraging', 1, 1), streams.streamSeed('foraging', 1, 2),
+                 streams.streamSeed('foraging', 2, 1), streams.streamSeed('reproduction', 1)]
+        self.assertEqual(len(set(seeds)), 4)
+        self.assertEqual(CommonStreams(5).streamSeed('foraging', 1, 1), seeds[0])
+        rng = np.random.RandomState(0)
+        streams.reseed(rng, 'reproduction', 1)
+        self.assertEqual(rng.randint(1000), np.random.RandomState(seeds[3]).randint(1000))
+        with self.assertRaises(ValueError):
+            runreplicates(*PARAMS[0], seasons=1, repeats=1, crn=True)
+
+    def test_paired_differences(self):
+        store = TrajectoryStore.create(self.directory, PARAMS, seasons=1, repeats=REPEATS)
+        SweepScheduler(2, seasons=1, repeats=REPEATS, seed=1, crn=True).run(store)
+        # sets run by the pool are those of runreplicates
+        manyruns = runreplicates(*PARAMS[0], seasons=1, repeats=REPEATS, seed=1, crn=True)
+        self.assertEqual(store.trajectory(0)[:, 1, :3].sum(axis=1).tolist(), resistant(manyruns, 1).tolist())
+        mean, sem = store.pairedDifference(0, 1)
+        # against sets run on independent streams, the paired difference has
+        # much the smaller standard error
+        x, y = [resistant(runreplicates(*params, seasons=1, repeats=REPEATS, seed=1 + 10 * k), 1)
+                for k, params in enumerate(PARAMS)]
+        independent = np.sqrt(x.var(ddof=1) / REPEATS + y.var(ddof=1) / REPEATS)
+        self.assertLess(sem, 0.6 * independent)
+        self.assertLess(abs(mean - (x.mean() - y.mean())), 3 * independent)
+
+
+if __name__ == '__main__':
+    unittest.main()
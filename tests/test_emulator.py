@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.emulator import GaussianProcessEmulator, unitParams
+from model.sensitivity import SENSITIVITY_RANGES, sobolSequence, scaleDesign
+from model.store import TrajectoryStore
+
+
+def response(params):
+    # smooth (sets, seasons + 1, groups) mean populations of parameter sets,
+    # with susceptible and resistant adding up to 1000
+    x = unitParams(params)
+    resistant = 500 + 300 * np.sin(2 * x[:, 1]) * x[:, 2] - 100 * x[:, 0] ** 2
+    seasons = np.array([0.0, 0.5, 1.0])
+    resistant = 500 + (resistant - 500)[:, None] * seasons[None, :]
+    return np.stack([1000 - resistant, resistant], axis=2)
+
+
+class EmulatorTest(unittest.TestCase):
+    def setUp(self):
+        self.params = scaleDesign(sobolSequence(48, 5))
+        self.emulator = GaussianProcessEmulator(self.params, response(self.params)).fit()
+
+    def test_predicts_held_out_sets(self):
+        held = scaleDesign(sobolSequence(16, 5, skip=200))
+        mean, sd = self.emulator.predict(held)
+        self.assertEqual(mean.shape, (16, 3, 2))
+        truth = response(held)
+        np.testing.assert_allclose(mean, truth, atol=15)
+        # season 0 is the same for every set, and groups still add up
+        np.testing.assert_allclose(mean[:, 0], truth[:, 0], atol=1e-6)
+        np.testing.assert_allclose(mean.sum(axis=2), 1000, atol=1e-6)
+        # errors within a few predicted standard deviations
+        self.assertTrue((abs(mean - truth)[:, 1:] < 4 * sd[:, 1:] + 1e-6).all())
+
+    def test_cross_validation_is_leave_one_out(self):
+        mean, sd = self.emulator.crossValidation()
+        keep = np.arange(len(self.params)) != 5
+        refit = GaussianProcessEmulator(self.params[keep], response(self.params[keep]))
+        # same hyperparameters and standardisation, conditioned without set 5
+        refit.lengths, refit.signal, refit.noise = self.emulator.lengths, self.emulator.signal, self.emulator.noise
+        refit.offset, refit.scale = self.emulator.offset, self.emulator.scale
+        refit.y = self.emulator.y[keep]
+        single, singlesd = refit.condition().predict(self.params[5])
+        np.testing.assert_allclose(mean[5], single[0], rtol=1e-6, atol=1e-6)
+        noise = self.emulator.noise * self.emulator.scale.reshape(3, 2) ** 2
+        np.testing.assert_allclose(sd[5], np.sqrt(singlesd[0] ** 2 + noise), rtol=1e-6, atol=1e-6)
+
+    def test_suggest_and_store(self):
+        picks = self.emulator.suggest(4)
+        self.assertEqual(picks.shape, (4, 5))
+        self.assertEqual(len(set(map(tuple, picks.tolist()))), 4)
+        self.assertTrue((picks[:, 0] == np.floor(picks[:, 0])).all())
+        # the sets picked were the least certain candidates
+        before = self.emulator.predict(picks)[1][:, 2, 1].min()
+        self.assertTrue(before > np.median(self.emulator.predict(scaleDesign(sobolSequence(64, 5)))[1][:, 2, 1]))
+        directory = tempfile.mkdtemp()
+        try:
+            store = TrajectoryStore.create(directory, self.params[:3], seasons=2, repeats=1)
+            store.summaries[:3, :, :, 0] = response(self.params[:3])
+            store.complete[:2] = True
+            emulator = GaussianProcessEmulator.fromStore(store)
+            self.assertEqual(emulator.params.tolist(), self.params[:2].tolist())
+            rows = emulator.condition().rows(self.params[:1])
+            self.assertEqual(len(rows), 3 * 2)
+            self.assertEqual(rows[0][5:7], [0, 'susceptible'])
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.onlinestats import OnlineSummary
+from model.store import TrajectoryStore
+from model.consts import *
+
+
+def population(**counts):
+    pops = dict([(x, 0) for x in PLANTTYPES])
+    pops.update(counts)
+    return pops
+
+
+# one replicate fixed on RR from season 2, one still mixed at season 3
+MIXED = population(RR=500, SS_u=500)
+RUNS = [[MIXED, MIXED, population(RR=1000), population(RR=1000)],
+        [MIXED, MIXED, MIXED, MIXED]]
+
+
+class FixationColumnsTest(unittest.TestCase):
+    def check(self, rows):
+        # fixed share by season and mean fixation season, on both group rows
+        self.assertEqual([x[10] for x in rows], [0, 0, 0, 0, 0.5, 0.5, 0.5, 0.5])
+        self.assertEqual(set([x[11] for x in rows]), set([2]))
+
+    def test_runmodel_rows(self):
+        summary = OnlineSummary(3)
+        for run in RUNS:
+            summary.addRun(run)
+        self.check(summary.rows([10, 0.81, 0.36, 0.74, 0.09]))
+
+    def test_store_summary(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = TrajectoryStore.create(directory, [[10, 0.81, 0.36, 0.74, 0.09]], seasons=3, repeats=2)
+            store.write(0, zip(*RUNS))
+            store.finish(0)
+            self.check(store.summary())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_no_replicate_fixed(self):
+        summary = OnlineSummary(3)
+        summary.addRun(RUNS[1])
+        self.assertTrue(np.isnan(summary.rows([10, 0.81, 0.36, 0.74, 0.09])[0][11]))
+
+
+if __name__ == '__main__':
+    unittest.main()
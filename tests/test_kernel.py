@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from model.kernel import SeasonKernel, KERNEL_SEASON, kernelRow
+from model.simulation import runreplicate, replicateSeeds
+from model.consts import *
+
+PARAMS = [10, 0.81, 0.36, 0.74, 0.09]
+
+
+def resistant(plantpops):
+    return sum([plantpops[x] for x in ['RR', 'RS', 'SR']])
+
+
+class SeasonKernelTest(unittest.TestCase):
+    def test_rows_simulate_later_seasons(self):
+        # flower density is only floored in the first season, which changes
+        # where 10 bees leave off foraging
+        seeds = replicateSeeds(1, 5)
+        later = [runreplicate(*PARAMS, seasons=1, seed=s, start_season=KERNEL_SEASON)[1] for s in seeds]
+        first = [runreplicate(*PARAMS, seasons=1, seed=s)[1] for s in seeds]
+        self.assertEqual(kernelRow((PARAMS, STARTING_POPULATION, seeds, SEEDS_SOWN, SUSCEPTIBLE_PLANT_INFECTION_RATE)), later)
+        self.assertNotEqual(later, first)
+
+    def test_one_step_mean(self):
+        samples = 20
+        kernel = SeasonKernel(PARAMS, step=500, samples=samples, seed=1).build()
+        distributions = kernel.project(STARTING_POPULATION, seasons=1)
+        mean = kernel.moments(distributions, ['RR', 'RS', 'SR'])[0][1]
+        simulated = [resistant(runreplicate(*PARAMS, seasons=1, seed=s, start_season=KERNEL_SEASON)[1])
+                     for s in replicateSeeds(2, 40)]
+        # the kernel row is itself a sample of as many seasons
+        self.assertLessEqual(abs(np.mean(simulated) - mean), 4 * np.std(simulated, ddof=1) / np.sqrt(samples) + 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from model.meanfield import runmeanfield, screenmeanfield, meanfieldTrajectory, meanfieldjob
+from model.sweepspec import checkSpec, designRows, uniqueSets, screenSets
+from model.consts import *
+from tests.equivalence import scalarResistant
+
+
+class MeanFieldTest(unittest.TestCase):
+    def test_expected_trajectory_of_scalar_model(self):
+        # the mean-field counts lie within the replicate spread of the scalar mean
+        params = [10, 0.81, 0.36, 0.74, 0.09]
+        outputdata, manyruns = runmeanfield(*params, seasons=5)
+        expected = [x[7] for x in outputdata if x[6] == 'resistant']
+        scalar = scalarResistant(params, 5, 12, 1)
+        for season in [1, 3, 5]:
+            se = scalar[:, season].std(ddof=1) / np.sqrt(len(scalar))
+            self.assertLessEqual(abs(scalar[:, season].mean() - expected[season]), 4 * se + 0.5)
+
+    def test_batch_matches_model(self):
+        # sets out of bees, fixed early or late, and with a different sowing
+        paramsets = [[n, a, 0.36, 0.74, 0.09] for n in [0, 1, 10, 101] for a in [0.2, 0.81, 1.0]]
+        for sowing in [(1000, 0.5), (1500, 0.2)]:
+            trajectory = meanfieldTrajectory(paramsets, 12, seeds_sown=sowing[0], infection_rate=sowing[1])
+            for i, params in enumerate(paramsets):
+                expected = runmeanfield(*params, seasons=12, seeds_sown=sowing[0], infection_rate=sowing[1])[1]
+                np.testing.assert_allclose(trajectory[:, i], [[x[0][y] for y in PLANTTYPES] for x in expected],
+                                           rtol=1e-9, atol=1e-6)
+        # and screening rows, batched or not
+        batched = meanfieldjob((paramsets * 3, 3, 1000, 0.5))[:len(paramsets)]
+        single = meanfieldjob((paramsets, 3, 1000, 0.5))
+        np.testing.assert_allclose([[x[7] for x in rows] for rows in batched],
+                                   [[x[7] for x in rows] for rows in single], rtol=1e-9)
+
+    def test_screen_keeps_sets_in_range(self):
+        spec = checkSpec({'design': 'oat', 'ranges': {'nbees': [1, 10, 30]}, 'seasons': 2})
+        rows = designRows(spec)
+        paramsets, slots = uniqueSets(rows)
+        resistant = [[x[7] for x in result if x[5] == 2 and x[6] == 'resistant'][0]
+                     for result in screenmeanfield(paramsets, seasons=2)]
+        spec['screen'] = {'min': sorted(resistant)[1]}
+        kept, keptsets, keptslots = screenSets(spec, rows, paramsets, slots)
+        self.assertEqual(keptsets, [p for p, r in zip(paramsets, resistant) if r >= sorted(resistant)[1]])
+        self.assertEqual(len(kept), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from model.consts import *
+from model.metapopulation import Greenhouse, Metapopulation, exchangeMatrix, moveBees, wholeShares
+
+
+class ExchangeTest(unittest.TestCase):
+    def test_island_matrix(self):
+        matrix = exchangeMatrix(0.2, 3)
+        np.testing.assert_allclose(matrix.sum(axis=1), 1)
+        np.testing.assert_allclose(np.diag(matrix), 0.8)
+        np.testing.assert_allclose(matrix[0, 1:], 0.1)
+        self.assertEqual(exchangeMatrix(0.2, 1).tolist(), [[1]])
+
+    def test_whole_shares(self):
+        self.assertEqual(wholeShares(np.array([1.5, 1.25, 2.25]), 5).tolist(), [2, 1, 2])
+
+    def test_bees_conserved(self):
+        bees = [10, 3, 0]
+        for exchange in [0, 0.3, 1]:
+            moved = moveBees(bees, [100, 50, 0], exchange)
+            self.assertEqual(moved.sum(), 13)
+            # a house without flowers draws no bees from the others
+            self.assertEqual(moved[2], 0)
+        self.assertEqual(moveBees(bees, [100, 50, 0], 0).tolist(), bees)
+
+    def test_pollen_exchange_keeps_mothers(self):
+        meta = Metapopulation([Greenhouse(), Greenhouse()], pollen_exchange=0.25)
+        rng = np.random.RandomState(0)
+        visits = rng.randint(1, 20, size=(2, len(PLANTTYPES)))
+        crosses = rng.randint(0, 5, size=(2, len(PLANTTYPES), len(PLANTTYPES)))
+        exchanged = meta.exchangePollen(visits, crosses)
+        # every house keeps its crosses by mother; only the fathers change
+        np.testing.assert_allclose(exchanged.sum(axis=1), crosses.sum(axis=1))
+        np.testing.assert_allclose(exchanged.sum(), crosses.sum())
+
+
+class MetapopulationTest(unittest.TestCase):
+    def test_sowing_and_processes(self):
+        houses = [Greenhouse(number_of_bees=10), Greenhouse(number_of_bees=3, seeds_sown=50)]
+        runs = [Metapopulation(houses, seed_exchange=0.1, pollen_exchange=0.1, bee_exchange=0.2,
+                               seed=4, processes=processes).run(seasons=3)
+                for processes in [1, 2]]
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(len(runs[0]), 4)
+        for season in runs[0][1:]:
+            self.assertEqual(sum(season[0].values()), SEEDS_SOWN)
+            self.assertEqual(sum(season[1].values()), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from model.onlinestats import OnlineSummary, P2Quantile
+from model.consts import *
+
+
+class OnlineSummaryTest(unittest.TestCase):
+    def test_welford_matches_numpy(self):
+        # large counts with a small spread, where a naive sum of squares
+        # loses precision
+        rng = np.random.RandomState(0)
+        populations = 1e7 + rng.randint(0, 50, size=(40, 3, len(PLANTTYPES)))
+        summary = OnlineSummary(2)
+        for run in populations:
+            summary.addRun([dict(zip(PLANTTYPES, season)) for season in run])
+        resistant = populations[:, :, :3].sum(axis=2)
+        np.testing.assert_allclose(summary.mean[:, 1], resistant.mean(axis=0), rtol=1e-12)
+        np.testing.assert_allclose(summary.std()[:, 1], resistant.std(axis=0), rtol=1e-9)
+        np.testing.assert_allclose(summary.sem()[:, 1], resistant.std(axis=0, ddof=1) / np.sqrt(40), rtol=1e-9)
+        # single genotypes are kept too
+        np.testing.assert_allclose(summary.mean[:, 2], populations[:, :, 0].mean(axis=0), rtol=1e-12)
+
+    def test_p2_quantiles(self):
+        rng = np.random.RandomState(1)
+        x = rng.gamma(2.0, 100.0, size=20000)
+        for p in [0.05, 0.5, 0.9]:
+            estimator = P2Quantile(p)
+            for value in x:
+                estimator.add(value)
+            self.assertLessEqual(abs(estimator.value() - np.percentile(x, 100 * p)), 0.02 * x.std())
+        # exact while there are fewer than five observations
+        estimator = P2Quantile(0.5)
+        for value in [3, 1, 2]:
+            estimator.add(value)
+        self.assertEqual(estimator.value(), 2)
+
+    def test_rows_carry_quantiles(self):
+        summary = OnlineSummary(1, quantiles=[0.5])
+        for k in [0, 1, 5]:
+            summary.addRun([STARTING_POPULATION, dict(STARTING_POPULATION, RR=500 + k)])
+        rows = summary.rows([1, 2, 3, 4, 5])
+        resistant = [x for x in rows if x[5] == 1 and x[6] == 'resistant'][0]
+        self.assertEqual(resistant[7], 502)
+        self.assertEqual(resistant[-1], 501)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import random
+import unittest
+from model.pollination import PollinationSeason
+from model.simulation import runreplicates
+from model.consts import *
+from tests.equivalence import resistantCounts, scalarResistant, assertSameMean
+
+
+def seasonResults(pres):
+    # visitation, flowers and crosses of a season as lists in PLANTTYPES order
+    visitation, flowers, crosses = pres
+    return ([visitation[x] for x in PLANTTYPES], [flowers[x] for x in PLANTTYPES],
+            [[crosses[':'.join([a, b])] for b in PLANTTYPES] for a in PLANTTYPES])
+
+
+class PollinationSeasonTest(unittest.TestCase):
+    # seasons of the original (baseline) model, run after random.seed(seed)
+    def test_default_season_matches_baseline(self):
+        p = PollinationSeason(STARTING_POPULATION, rng=random.Random(7))
+        self.assertEqual(seasonResults(p.runOneSeason()),
+                         ([9332, 0, 0, 9311, 4657], [10668, 0, 0, 689, 5343],
+                          [[3778, 0, 0, 3402, 1866], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0],
+                           [3363, 0, 0, 4017, 1721], [1907, 0, 0, 1652, 954]]))
+
+    def test_mixed_season_matches_baseline(self):
+        pops = {'RR': 300, 'RS': 120, 'SR': 80, 'SS_i': 400, 'SS_u': 100}
+        p = PollinationSeason(pops, number_of_bees=3, attraction=0.81, rng=random.Random(11))
+        self.assertEqual(seasonResults(p.runOneSeason()),
+                         ([1716, 697, 506, 8037, 615], [10284, 4103, 2694, 7963, 3385],
+                          [[265, 99, 66, 1101, 66], [95, 31, 34, 442, 52], [57, 38, 23, 328, 27],
+                           [1113, 451, 333, 5342, 389], [87, 41, 27, 393, 31]]))
+
+    def test_vectorised_engine_same_distribution(self):
+        params = [40, 0.81, 0.36, 0.74, 0.09]
+        vector = resistantCounts(runreplicates(*params, seasons=4, repeats=20, seed=2, vectorised=True))
+        scalar = scalarResistant(params, 4, 20, 2)
+        for season in [1, 4]:
+            assertSameMean(self, vector[:, season], scalar[:, season])
+
+
+if __name__ == '__main__':
+    unittest.main()
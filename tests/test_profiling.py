@@ -0,0 +1,47 @@
+import unittest
+from model.profiling import Profile, PROFILE_FIELDS, PROFILE_PHASES
+from model.simulation import runreplicate, runreplicates, replicateSeeds
+from model.telemetry import RunCost
+
+PARAMS = [10, 0.81, 0.36, 0.74, 0.09]
+
+
+class ProfileTest(unittest.TestCase):
+    def test_counters(self):
+        profile = Profile()
+        cost = RunCost()
+        run = runreplicate(*PARAMS, seasons=3, seed=2, profile=profile, cost=cost)
+        # profiling leaves results unchanged
+        self.assertEqual(run, runreplicate(*PARAMS, seasons=3, seed=2))
+        counts = profile.counts
+        self.assertEqual(counts['seasons'], 3)
+        self.assertEqual(counts['visits'], cost.visits)
+        # 10 bees forage the whole flowering window every season
+        self.assertEqual(counts['hours'], 3 * 640)
+        self.assertEqual(counts['idle_hours'], 0)
+        self.assertTrue(counts['seeds_allocated'] > 0)
+        self.assertTrue(counts['rng_draws'] >= counts['visits'] + counts['null_choices'])
+        self.assertTrue(all([profile.seconds[x] >= 0 for x in PROFILE_PHASES]))
+        self.assertTrue(profile.seconds['foraging'] > 0)
+        self.assertEqual(len(profile.values()), len(PROFILE_FIELDS))
+
+    def test_idle_hours_end_seasons(self):
+        # many bees empty the greenhouse, ending each season with an idle hour
+        profile = Profile()
+        runreplicate(101, 0.81, 0.36, 0.74, 0.09, seasons=2, seed=2, profile=profile)
+        self.assertEqual(profile.counts['idle_hours'], 2)
+        self.assertTrue(profile.counts['hours'] < 2 * 640)
+
+    def test_merge_across_replicates(self):
+        merged = Profile()
+        runreplicates(*PARAMS, seasons=2, repeats=3, seed=5, profile=merged)
+        total = Profile()
+        for seed in replicateSeeds(5, 3):
+            single = Profile()
+            runreplicate(*PARAMS, seasons=2, seed=seed, profile=single)
+            total.merge(single)
+        self.assertEqual(merged.counts, total.counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
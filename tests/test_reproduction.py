@@ -0,0 +1,77 @@
+import itertools
+import unittest
+import numpy as np
+from model.reproduction import Reproduction, germinate
+from model.simulation import runreplicate
+from model.meanfield import runmeanfield
+from model.store import resultKey
+from model.consts import *
+from tests.equivalence import BASELINE_RESISTANT, BASELINE_REPLICATES, scalarResistant
+
+# seed populations (SEEDTYPES order) and the plants the original (baseline)
+# model germinated from them
+GERMINATIONS = [([16371, 16260, 7389, 11919], [316, 313, 142, 115, 114]),
+                ([8310, 19686, 5728, 2437], [230, 545, 158, 34, 33]),
+                ([15638, 5354, 19777, 12161], [295, 101, 374, 115, 115]),
+                ([0, 17759, 291, 8555], [0, 667, 11, 161, 161]),
+                ([14249, 0, 2994, 8279], [559, 0, 117, 162, 162]),
+                ([0, 0, 0, 1], [0, 0, 0, 500, 500]),
+                ([1, 1, 1, 1], [250, 250, 250, 125, 125]),
+                ([333, 333, 333, 1], [333, 333, 333, 1, 0]),
+                ([0, 0, 0, 0], [0, 0, 0, 0, 0])]
+
+
+def wholeShareInputs(case):
+    # crosses in multiples of 8 and flowers in multiples of 16, so that with
+    # penalties of a half every cross splits into whole seeds and neither
+    # model's random rounding comes into play
+    crosses = dict([[':'.join([PLANTTYPES[i], PLANTTYPES[j]]), 8 * ((3 * i + 5 * j + case) % 7) * (case + 1)]
+                    for i, j in itertools.product(range(5), repeat=2)])
+    flowers = dict([[x, 16 * ((7 * k + case) % 5) * (case + 2)] for k, x in enumerate(PLANTTYPES)])
+    return crosses, flowers
+
+
+class ReproductionTest(unittest.TestCase):
+    def test_germination_matches_baseline(self):
+        for seeds, plants in GERMINATIONS:
+            self.assertEqual(germinate(seeds).tolist(), plants)
+        # and the same for a batch of seed populations
+        self.assertEqual(germinate([s for s, p in GERMINATIONS]).tolist(), [p for s, p in GERMINATIONS])
+
+    def test_whole_shares_match_baseline(self):
+        expected = [[164, 236, 247, 177, 176], [159, 190, 256, 198, 197], [205, 189, 230, 188, 188]]
+        for case, plants in enumerate(expected):
+            crosses, flowers = wholeShareInputs(case)
+            r = Reproduction({}, flowers, crosses, infected_penalty=0.5, non_buzz_penalty=0.5,
+                             non_buzz_infected_penalty=0.5, rng=np.random.RandomState(case))
+            pops = r.generatePlantPop()
+            self.assertEqual([pops[x] for x in PLANTTYPES], plants)
+
+    def test_same_distribution_as_baseline(self):
+        # resistant counts of seasons 1 to 5 agree with the original model
+        # within 4 standard errors
+        repeats = 30
+        counts = scalarResistant([10, 0.81, 0.36, 0.74, 0.09], 5, repeats, 3)
+        for season, (mean, sd) in enumerate(BASELINE_RESISTANT, 1):
+            x = counts[:, season]
+            se = np.sqrt(sd ** 2 / BASELINE_REPLICATES + x.var(ddof=1) / repeats)
+            self.assertLessEqual(abs(x.mean() - mean), 4 * se,
+                                 'season %d mean %f against baseline %f' % (season, x.mean(), mean))
+
+    def test_sowing(self):
+        # every entry point sows seeds_sown seeds and infects infection_rate of SS plants
+        params = [10, 0.81, 0.36, 0.74, 0.09]
+        for run in [runreplicate(*params, seasons=2, seed=1, seeds_sown=1500, infection_rate=0.2),
+                    runmeanfield(*params, seasons=2, seeds_sown=1500, infection_rate=0.2)[1]]:
+            for pops in run[1:]:
+                pops = pops if isinstance(pops, dict) else pops[0]
+                self.assertAlmostEqual(sum(pops.values()), 1500)
+                self.assertAlmostEqual(pops['SS_i'], 0.2 * (pops['SS_i'] + pops['SS_u']), delta=0.5)
+        default = resultKey(params, 500, 3, 1)
+        self.assertEqual(resultKey(params, 500, 3, 1, seeds_sown=SEEDS_SOWN), default)
+        self.assertNotEqual(resultKey(params, 500, 3, 1, seeds_sown=1500), default)
+        self.assertNotEqual(resultKey(params, 500, 3, 1, infection_rate=0.2), default)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from model.scheduler import SweepScheduler, estimateCost, seasonLength
+
+PARAMS = [0.81, 0.36, 0.74, 0.09]
+
+
+def order(nbees, engine):
+    # bees of the parameter sets in the order the scheduler runs them
+    chunks = SweepScheduler(1, seasons=500, repeats=3, engine=engine).schedule(
+        [(i, [n] + PARAMS) for i, n in enumerate(nbees)])
+    return [params[0] for chunk in chunks for slot, params in chunk]
+
+
+class ScheduleOrderTest(unittest.TestCase):
+    def test_season_length(self):
+        # measured seasons at default populations lasted 640, 640, 130 and 26 hours
+        self.assertEqual(seasonLength(1)[0], 640)
+        self.assertEqual(seasonLength(10)[0], 640)
+        self.assertTrue(125 <= seasonLength(101)[0] <= 135)
+        self.assertTrue(24 <= seasonLength(501)[0] <= 28)
+
+    def test_scalar_order(self):
+        # the per-visit loop costs by visits, which level off once bees
+        # empty the greenhouse before the end of the flowering window
+        self.assertEqual(order([1, 501, 10], 'scalar')[0], 501)
+        self.assertEqual(order([1, 501, 10], 'scalar')[-1], 1)
+
+    def test_auto_order(self):
+        # measured ms per season: scalar 29 bees ~47, scalar 10 ~36, vector
+        # 30 ~24, scalar 1 ~13, vector 101 ~9, vector 501 ~3
+        self.assertEqual(order([501, 1, 30, 101, 10, 29], 'auto'), [29, 10, 30, 1, 101, 501])
+
+    def test_vector_order(self):
+        # the vectorised engine costs by hours simulated
+        self.assertEqual(order([501, 101, 10, 1], 'vector'), [10, 1, 101, 501])
+        self.assertTrue(estimateCost([1] + PARAMS, engine='vector') > estimateCost([501] + PARAMS, engine='vector'))
+
+    def test_batch_order(self):
+        self.assertEqual(order([501, 101, 10, 1], 'batch')[-1], 501)
+        self.assertTrue(estimateCost([501] + PARAMS, engine='batch') < estimateCost([501] + PARAMS, engine='scalar'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+from model.sensitivity import sobolSequence, latinHypercube, saltelliDesign, sobolIndices
+
+# the Ishigami function over [-pi, pi]^3, with a = 7 and b = 0.1, and its
+# analytic first order and total Sobol indices
+ISHIGAMI_RANGES = [('x1', -np.pi, np.pi), ('x2', -np.pi, np.pi), ('x3', -np.pi, np.pi)]
+ISHIGAMI_FIRST = [0.3139, 0.4424, 0.0]
+ISHIGAMI_TOTAL = [0.5576, 0.4424, 0.2437]
+
+
+def ishigami(x):
+    return np.sin(x[:, 0]) + 7 * np.sin(x[:, 1]) ** 2 + 0.1 * x[:, 2] ** 4 * np.sin(x[:, 0])
+
+
+class SensitivityTest(unittest.TestCase):
+    def test_sobol_sequence(self):
+        self.assertEqual(sobolSequence(4, 1)[:, 0].tolist(), [0.5, 0.75, 0.25, 0.375])
+        # every dyadic interval of 16 points holds exactly one point
+        points = sobolSequence(16, 4, skip=0)
+        for j in range(4):
+            self.assertEqual(sorted(np.floor(points[:, j] * 16).tolist()), range(16))
+
+    def test_latin_hypercube_strata(self):
+        points = latinHypercube(10, 3, np.random.RandomState(0))
+        for j in range(3):
+            self.assertEqual(sorted(np.floor(points[:, j] * 10).tolist()), range(10))
+
+    def test_ishigami_indices(self):
+        for method, n, tolerance in [('sobol', 4096, 0.01), ('lhs', 8192, 0.06)]:
+            design = saltelliDesign(n, ISHIGAMI_RANGES, method=method, rng=np.random.RandomState(2))
+            self.assertEqual(design.shape, (n * 5, 3))
+            first, total = sobolIndices(ishigami(design), 3)
+            np.testing.assert_allclose(first, ISHIGAMI_FIRST, atol=tolerance)
+            np.testing.assert_allclose(total, ISHIGAMI_TOTAL, atol=tolerance)
+
+    def test_additive_indices(self):
+        # y = x1 + 2 x2 over the unit square: indices 1/5 and 4/5, first order equal to total
+        design = saltelliDesign(1024, [('x1', 0, 1), ('x2', 0, 1)])
+        first, total = sobolIndices(design[:, 0] + 2 * design[:, 1], 2)
+        np.testing.assert_allclose(first, [0.2, 0.8], atol=0.02)
+        np.testing.assert_allclose(total, [0.2, 0.8], atol=0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
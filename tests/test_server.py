@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import numpy as np
+from model.consts import *
+from model.server import SimulationServer, requestLines, seasonRows
+from model.simulation import runreplicates
+from model.store import ResultCache, resultKey
+
+PARAMS = [10, 0.81, 0.36, 0.74, 0.09]
+
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = SimulationServer(processes=2, cache=ResultCache(self.directory), port=0, seasons=2, repeats=2)
+        self.port = self.server.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.httpd.shutdown()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def test_run_streams_seasons(self):
+        lines = list(requestLines('/run', {'params': PARAMS, 'seed': 3}, port=self.port))
+        self.assertEqual([x['season'] for x in lines], [0, 1, 2])
+        manyruns = runreplicates(*PARAMS, seasons=2, repeats=2, seed=3)
+        counts = np.array([[pops[x] for x in PLANTTYPES] for pops in manyruns[2]])
+        np.testing.assert_allclose(np.array([row[7:] for row in lines[2]['rows']], dtype=float),
+                                   np.array([row[7:] for row in seasonRows(PARAMS, counts, 2)], dtype=float))
+        self.assertEqual([row[6] for row in lines[2]['rows']], ['susceptible', 'resistant'])
+        # the finished set is cached once its job is retired, and served from
+        # the cache next time
+        while self.server.status()['running']:
+            time.sleep(0.01)
+        self.assertTrue(resultKey(PARAMS, 2, 2, 3) in self.server.cache)
+        self.assertEqual(list(requestLines('/run', {'params': PARAMS, 'seed': 3}, port=self.port)), lines)
+
+    def test_requests_share_a_job(self):
+        job = self.server.submit(PARAMS, seed=7)
+        self.assertTrue(self.server.submit([float(x) for x in PARAMS], seed=7) is job)
+        self.assertFalse(self.server.submit(PARAMS, seed=8) is job)
+        lines = list(requestLines('/sweep', {'paramsets': [PARAMS, PARAMS], 'seed': 7}, port=self.port))
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]['rows'], lines[1]['rows'])
+
+    def test_bad_requests(self):
+        for body in [{'params': PARAMS[:4]}, {'params': PARAMS, 'repeats': 0}, {'seed': 1},
+                     {'params': PARAMS, 'seed': 'x', 'repeats': 'two'}]:
+            with self.assertRaises(RuntimeError) as error:
+                list(requestLines('/run', body, port=self.port))
+            self.assertTrue(str(error.exception).startswith('400'))
+        # nothing was left running
+        self.assertEqual(self.server.status()['running'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.scheduler import SweepScheduler
+from model.store import ResultCache, TrajectoryStore, resultKey
+
+PARAMS = [[1, 0.81, 0.36, 0.74, 0.09], [10, 0.81, 0.36, 0.74, 0.09]]
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_get(self):
+        cache = ResultCache(os.path.join(self.directory, 'cache'))
+        key = resultKey(PARAMS[0], 2, 3, 1)
+        self.assertEqual(cache.get(key), None)
+        cache.put(key, np.arange(6).reshape(1, 3, 2))
+        self.assertTrue(key in cache)
+        self.assertEqual(cache.get(key).tolist(), [[[0, 1], [2, 3], [4, 5]]])
+        self.assertEqual([x for x in os.listdir(cache.directory) if x.endswith('.tmp')], [])
+
+    def test_failed_put_leaves_no_entry(self):
+        # a write interrupted part way (here by an unpicklable result) is
+        # never seen as a finished set
+        cache = ResultCache(self.directory)
+        key = resultKey(PARAMS[0], 2, 3, 1)
+        with self.assertRaises(Exception):
+            cache.put(key, [np.zeros(3), lambda x: x])
+        self.assertFalse(key in cache)
+        self.assertEqual(cache.get(key), None)
+
+    def test_sweep_resumes_from_cache(self):
+        cache = ResultCache(os.path.join(self.directory, 'cache'))
+        scheduler = SweepScheduler(1, seasons=2, repeats=2, seed=4)
+        # a set finished by an earlier, interrupted sweep is copied rather than run
+        finished = np.full((2, 3, 5), 7)
+        cache.put(scheduler.key(PARAMS[0]), finished)
+        store = TrajectoryStore.create(os.path.join(self.directory, 'store'), PARAMS, seasons=2, repeats=2)
+        done = []
+        scheduler.run(store, done.append, cache=cache)
+        self.assertEqual(sorted(done), [0, 1])
+        self.assertEqual(store.trajectory(0).tolist(), finished.tolist())
+        self.assertTrue(store.complete.all())
+        # and the set run is cached for the next sweep
+        self.assertEqual(cache.get(scheduler.key(PARAMS[1])).tolist(), store.trajectory(1).tolist())
+        # a reopened store holds the same results
+        reopened = TrajectoryStore(store.directory)
+        self.assertEqual(reopened.trajectory(1).tolist(), store.trajectory(1).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import csv
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from StringIO import StringIO
+from model.scheduler import SweepScheduler
+from model.store import TrajectoryStore
+from model.telemetry import SweepProgress, PROGRESS_COLUMNS, formatSeconds
+
+PARAMS = [[1, 0.81, 0.36, 0.74, 0.09], [10, 0.81, 0.36, 0.74, 0.09], [3, 0.5, 0.2, 0.7, 0.1]]
+
+
+class SweepProgressTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_eta_from_cost(self):
+        progress = SweepProgress(every=1e9, out=StringIO())
+        # one set cached, three to run of costs 1, 1 and 2
+        progress.start(4, 2, {1: 1.0, 2: 1.0, 3: 2.0})
+        self.assertEqual(progress.done, 1)
+        self.assertEqual(progress.rates()[3], None)
+        progress.began -= 10
+        now = time.time()
+        progress.finished(123, 1, PARAMS[0], now - 8, now, 5, 400)
+        sets_per_min, visits_per_sec, utilisation, eta = progress.rates()
+        # a quarter of the cost run in 10 seconds leaves 30 seconds
+        self.assertAlmostEqual(eta, 30, delta=0.5)
+        self.assertAlmostEqual(sets_per_min, 6, delta=0.1)
+        self.assertAlmostEqual(visits_per_sec, 20, delta=0.5)
+        self.assertAlmostEqual(utilisation, 0.4, delta=0.01)
+        progress.report()
+        self.assertTrue(progress.out.getvalue().startswith('2/4 sets (50%)'))
+        self.assertEqual(formatSeconds(3725), '1:02:05')
+
+    def test_sweep_log(self):
+        logname = os.path.join(self.directory, 'progress.csv')
+        store = TrajectoryStore.create(os.path.join(self.directory, 'store'), PARAMS, seasons=2, repeats=2)
+        with SweepProgress(logname, out=StringIO()) as progress:
+            SweepScheduler(2, seasons=2, repeats=2, seed=1).run(store, progress=progress)
+        with open(logname, 'rb') as infile:
+            rows = list(csv.DictReader(infile))
+        self.assertEqual(sorted(rows[0].keys()), sorted(PROGRESS_COLUMNS))
+        self.assertEqual(sorted([int(x['slot']) for x in rows]), [0, 1, 2])
+        self.assertEqual([int(x['done']) for x in rows], [1, 2, 3])
+        self.assertTrue(all([int(x['seasons']) > 0 and int(x['visits']) > 0 for x in rows]))
+        # no time left once every set is done
+        self.assertEqual(float(rows[-1]['eta_seconds']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
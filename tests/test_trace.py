@@ -0,0 +1,61 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.consts import *
+from model.simulation import runreplicate, runreplicates
+from model.telemetry import RunCost
+from model.trace import HourlyTrace, TraceFiles, TRACE_COLUMNS, readTrace
+
+PARAMS = [10, 0.81, 0.36, 0.74, 0.09]
+
+
+class TraceTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_binary_round_trip(self):
+        # batches smaller than the run, so several pass through the writer
+        cost = RunCost()
+        filename = os.path.join(self.directory, 'run.trace')
+        with HourlyTrace(filename, binary=True, batch=100) as trace:
+            run = runreplicate(*PARAMS, seasons=2, seed=3, trace=trace, cost=cost)
+        self.assertEqual(run, runreplicate(*PARAMS, seasons=2, seed=3))
+        records = readTrace(filename)
+        self.assertEqual(records.shape, (2 * 640, len(TRACE_COLUMNS)))
+        self.assertEqual(records[:, 0].tolist(), [1] * 640 + [2] * 640)
+        self.assertEqual(records[:640, 1].tolist(), range(1, 641))
+        self.assertEqual(records[:, 2:].sum(), cost.visits)
+
+    def test_csv_matches_binary(self):
+        binary = os.path.join(self.directory, 'run.trace')
+        text = os.path.join(self.directory, 'csv', 'run.csv')
+        with HourlyTrace(binary, every=3, season_every=2, binary=True) as trace:
+            runreplicate(*PARAMS, seasons=4, seed=1, trace=trace)
+        with HourlyTrace(text, every=3, season_every=2) as trace:
+            runreplicate(*PARAMS, seasons=4, seed=1, trace=trace)
+        with open(text, 'rb') as infile:
+            rows = list(csv.reader(infile))
+        self.assertEqual(rows[0], TRACE_COLUMNS)
+        records = readTrace(binary)
+        self.assertEqual([[int(x) for x in row] for row in rows[1:]], records.tolist())
+        # every third hour of every second season
+        self.assertEqual(sorted(set(records[:, 0])), [2, 4])
+        self.assertTrue(((records[:, 1] - 1) % 3 == 0).all())
+
+    def test_trace_files_per_replicate(self):
+        pattern = os.path.join(self.directory, '{nbees:g}_{replicate}.trace')
+        runreplicates(*PARAMS, seasons=2, repeats=3, seed=2, processes=2, trace=TraceFiles(pattern))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['10_0.trace', '10_1.trace', '10_2.trace'])
+        traces = [readTrace(pattern.format(nbees=10, replicate=k)) for k in range(3)]
+        self.assertTrue(all([len(x) == 2 * 640 for x in traces]))
+        self.assertFalse(np.array_equal(traces[0], traces[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
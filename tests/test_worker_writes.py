@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from model.consts import *
+from model.scheduler import SweepScheduler, runchunk
+from model.simulation import runreplicates
+from model.store import TrajectoryStore
+
+PARAMS = [[1, 0.81, 0.36, 0.74, 0.09], [10, 0.81, 0.36, 0.74, 0.09], [3, 0.5, 0.2, 0.7, 0.1]]
+
+
+def expected(params, seasons, repeats, seed):
+    # (replicates, seasons + 1, genotypes) populations of runreplicates
+    manyruns = runreplicates(*params, seasons=seasons, repeats=repeats, seed=seed)
+    return [[[pops[x] for x in PLANTTYPES] for pops in season] for season in manyruns]
+
+
+class WorkerWriteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_chunk_returns_only_slots(self):
+        # a worker writes its sets into the store files and hands back only
+        # their slot numbers
+        store = TrajectoryStore.create(self.directory, PARAMS, seasons=2, repeats=2)
+        job = ([(2, PARAMS[2]), (0, PARAMS[0])], 2, 2, 5, self.directory, False, None, False, 'scalar', None,
+               SEEDS_SOWN, SUSCEPTIBLE_PLANT_INFECTION_RATE)
+        self.assertEqual(runchunk(job), ([2, 0], None))
+        reader = TrajectoryStore(self.directory)
+        for slot in [0, 2]:
+            self.assertEqual(reader.trajectory(slot).transpose(1, 0, 2).tolist(),
+                             expected(PARAMS[slot], 2, 2, 5))
+        self.assertEqual(reader.trajectory(1).sum(), 0)
+
+    def test_pool_writes_every_set(self):
+        store = TrajectoryStore.create(self.directory, PARAMS, seasons=2, repeats=2)
+        SweepScheduler(2, seasons=2, repeats=2, seed=5, chunks_per_process=2).run(store)
+        for slot, params in enumerate(PARAMS):
+            self.assertEqual(store.trajectory(slot).transpose(1, 0, 2).tolist(), expected(params, 2, 2, 5))
+            np.testing.assert_allclose(store.summaries[slot, 2, 1, 0],
+                                       np.mean([sum(x[:3]) for x in expected(params, 2, 2, 5)[2]]))
+
+
+if __name__ == '__main__':
+    unittest.main()